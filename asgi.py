@@ -1,17 +1,35 @@
+import os
+import sys
+import tempfile
+
 import uvicorn
 
-from ctms.config import Settings
+from ctms.config import Settings, pool_sizes_per_worker
 
 settings = Settings()
 
 
+def configure_workers():
+    """Set up the environment shared by the workers, before the application is imported."""
+    pool_size, max_overflow = pool_sizes_per_worker(settings)
+    os.environ["CTMS_DB_POOL_SIZE"] = str(pool_size)
+    os.environ["CTMS_DB_MAX_OVERFLOW"] = str(max_overflow)
+    if settings.workers > 1 and not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # The metrics of all workers are aggregated through files in this directory.
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="ctms-metrics-")
+
+
 if __name__ == "__main__":
-    server = uvicorn.Server(
-        uvicorn.Config(
-            "ctms.app:app",
-            host=settings.host,
-            port=settings.port,
-            log_config=None,
-        )
-    )
-    server.run()
+    configure_workers()
+    from ctms.workers import WorkerManager, uvicorn_config  # noqa: PLC0415, imports the app settings
+
+    if settings.workers > 1:
+        from ctms.metrics import prepare_multiprocess_dir  # noqa: PLC0415
+
+        prepare_multiprocess_dir(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+        from ctms.app import app  # noqa: PLC0415, preloaded before forking
+
+        sys.exit(WorkerManager(settings, app).run())
+    else:
+        server = uvicorn.Server(uvicorn_config(settings, "ctms.app:app"))
+        server.run()
@@ -1,6 +1,6 @@
+import asyncio
 import logging
-import time
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 import sentry_sdk
 import uvicorn
@@ -9,22 +9,25 @@ from dockerflow.fastapi.middleware import (
     MozlogRequestSummaryLogger,
     RequestIdMiddleware,
 )
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
 from sentry_sdk.integrations.logging import ignore_logger
-from starlette.routing import Match
 
-from .auth import auth_info_context
+from .auth_generation import auth_generation_watcher
 from .config import Settings, get_version
-from .database import SessionLocal
+from .database import SessionLocal, async_engine, async_replica_engines
+from .db_stats import db_stats_collector
+from .last_access import last_access_tracker
 from .log import CONFIG as LOG_CONFIG
 from .metrics import (
     METRICS_REGISTRY,
-    emit_response_metrics,
+    MetricsMiddleware,
     get_metrics,
     init_metrics,
     init_metrics_labels,
+    mark_process_dead,
     set_metrics,
 )
+from .replicas import replica_router
 from .routers import contacts, platform
 
 logging.config.dictConfig(LOG_CONFIG)
@@ -44,7 +47,34 @@ ignore_logger("uvicorn.error")
 async def lifespan(app: FastAPI):
     set_metrics(init_metrics(METRICS_REGISTRY))
     init_metrics_labels(SessionLocal(), app, get_metrics())
+    last_access_flusher = asyncio.create_task(last_access_tracker.run(settings.api_client_last_access_flush_interval_in_seconds))
+    db_stats_refresher = asyncio.create_task(db_stats_collector.run(settings.db_stats_interval_in_seconds))
+    auth_generation_checker = asyncio.create_task(auth_generation_watcher.run(settings.auth_generation_check_interval_in_seconds))
+    replica_lag_checker = None
+    if replica_router:
+        replica_lag_checker = asyncio.create_task(replica_router.run(settings.db_replica_lag_check_interval_in_seconds))
     yield
+    last_access_flusher.cancel()
+    with suppress(asyncio.CancelledError):
+        await last_access_flusher
+    db_stats_refresher.cancel()
+    with suppress(asyncio.CancelledError):
+        await db_stats_refresher
+    auth_generation_checker.cancel()
+    with suppress(asyncio.CancelledError):
+        await auth_generation_checker
+    if replica_lag_checker is not None:
+        replica_lag_checker.cancel()
+        with suppress(asyncio.CancelledError):
+            await replica_lag_checker
+    # Write the access times collected since the last flush. Errors are
+    # logged, so that the shutdown goes on.
+    await last_access_tracker.flush_in_thread()
+    if async_engine is not None:
+        await async_engine.dispose()
+    for replica_engine in async_replica_engines:
+        await replica_engine.dispose()
+    mark_process_dead()
 
 
 app = FastAPI(
@@ -59,38 +89,7 @@ app.include_router(contacts.router)
 
 app.add_middleware(MozlogRequestSummaryLogger)
 app.add_middleware(RequestIdMiddleware)
-
-
-@app.middleware("http")
-async def send_metrics(request: Request, call_next):
-    """Add timing and per-request logging context."""
-    # Determine the path template, like "/ctms/{email_id}"
-    path_template = None
-    for route in request.app.routes:
-        match, _ = route.matches(request.scope)
-        if match == Match.FULL:
-            path_template = str(route.path)
-            break
-
-    start_time = time.monotonic()
-    response = None
-    try:
-        response = await call_next(request)
-    finally:
-        duration = time.monotonic() - start_time
-        duration_s = round(duration, 3)
-        auth_info = auth_info_context.get()
-
-        emit_response_metrics(
-            path_template=path_template,
-            method=request.method,
-            duration_s=duration_s,
-            status_code=response.status_code if response else 500,
-            client_id=auth_info.get("client_id"),
-            metrics=get_metrics(),
-        )
-
-    return response
+app.add_middleware(MetricsMiddleware)
 
 
 if __name__ == "__main__":
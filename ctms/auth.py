@@ -7,6 +7,8 @@ header. A JWT token is returned that expires after a short time. To renew,
 the client POSTs to /token again.
 """
 
+import hashlib
+import hmac
 from contextvars import ContextVar
 from datetime import UTC, datetime, timedelta
 
@@ -37,6 +39,15 @@ def hash_password(plain_password):
     return pwd_context.hash(plain_password)
 
 
+def credentials_digest(client_id: str, client_secret: str, secret_key: str) -> bytes:
+    """Return a keyed hash of client credentials, fast enough to compute on every request.
+
+    It is used to recognize credentials that were already verified against
+    their (deliberately slow) argon2 hash.
+    """
+    return hmac.new(secret_key.encode(), f"{client_id}:{client_secret}".encode(), hashlib.sha256).digest()
+
+
 def create_access_token(
     data: dict,
     expires_delta: timedelta,
@@ -51,20 +62,39 @@ def create_access_token(
     return encoded_jwt
 
 
-def get_subject_from_token(token: str, secret_key: str):
-    """Get the parts of a valid token subject.
+def decode_token_subject(token: str, secret_key: str) -> tuple[str, str, int] | None:
+    """Get the parts of a valid token subject, and its expiration.
 
-    Returns (namespace, identity) if the token is valid
-    Returns (None, None) if the token is expired or invalid, or the payload is invalid.
+    Returns (namespace, identity, exp) if the token is valid, exp being a UNIX timestamp.
+    Returns None if the token is expired or invalid, or the payload is invalid.
     """
     try:
         payload = jwt.decode(token, secret_key, algorithms=["HS256"])
     except jwt.InvalidTokenError:
-        return None, None
+        return None
     sub = payload["sub"]
     if ":" not in sub:
+        return None
+    namespace, name = sub.split(":", 1)
+    return namespace, name, payload["exp"]
+
+
+def get_subject_from_token(token: str, secret_key: str):
+    """Get the parts of a valid token subject.
+
+    Returns (namespace, identity) if the token is valid
+    Returns (None, None) if the token is expired or invalid, or the payload is invalid.
+    """
+    subject = decode_token_subject(token, secret_key)
+    if subject is None:
         return None, None
-    return sub.split(":", 1)
+    namespace, name, _ = subject
+    return namespace, name
+
+
+def token_digest(token: str) -> bytes:
+    """Return a short digest of a token, to use as a cache key instead of the token itself."""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
 
 
 class OAuth2ClientCredentialsRequestForm:
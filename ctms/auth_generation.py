@@ -0,0 +1,73 @@
+"""Follow the auth generation of the database in the background, so that requests do not query it."""
+
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+
+from sqlalchemy.orm import Session
+
+from ctms.config import Settings
+from ctms.crud import get_auth_generation
+from ctms.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+settings = Settings()
+
+
+class AuthGenerationWatcher:
+    """
+    Keep the last auth generation read from the database.
+
+    The database bumps the generation when API clients, roles or permissions
+    change (see ``ctms.crud.get_auth_generation()``), and the cached ones are
+    only used for the generation they were read at. Reading it on a fixed
+    interval instead of on every request means that a change is noticed after
+    ``interval`` seconds at most, plus the duration of the query.
+
+    The generation is unknown (None) until it is read, and again when it was
+    not read for ``max_age`` seconds, for example when the database is
+    unreachable. The caches are not used then.
+    """
+
+    def __init__(self, max_age: float, timer: Callable[[], float] = time.monotonic):
+        self.max_age = max_age
+        self.timer = timer
+        self._generation: int | None = None
+        self._read_at = 0.0
+
+    def clear(self) -> None:
+        """Forget the last generation."""
+        self._generation = None
+
+    def current(self) -> int | None:
+        """Return the last generation, or None if it is unknown or too old."""
+        generation = self._generation
+        if generation is None or self.timer() - self._read_at > self.max_age:
+            return None
+        return generation
+
+    def refresh(self, db: Session) -> int:
+        """Read the generation, and keep it as the current one."""
+        generation = get_auth_generation(db)
+        self._generation, self._read_at = generation, self.timer()
+        return generation
+
+    def refresh_in_session(self) -> int:
+        """Read the generation in a new database session."""
+        with SessionLocal() as db:
+            return self.refresh(db)
+
+    async def run(self, interval: float) -> None:
+        """Read the generation every ``interval`` seconds, until cancelled."""
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh_in_session)
+            except Exception as exc:
+                logger.exception(exc)
+            await asyncio.sleep(interval)
+
+
+# A refresh that fails or hangs stops the use of the caches after two intervals.
+auth_generation_watcher = AuthGenerationWatcher(max_age=2 * settings.auth_generation_check_interval_in_seconds)
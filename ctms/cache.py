@@ -0,0 +1,308 @@
+"""Caches for data read on every request."""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable
+from typing import Any, NamedTuple, Protocol
+
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+
+from ctms.config import CONTACT_CACHE_INVALIDATION_TTL, Settings
+
+settings = Settings()
+
+
+class TTLCache:
+    """
+    A bounded, thread-safe mapping whose entries expire after a delay.
+
+    Once ``maxsize`` entries are stored, adding a new key evicts the least
+    recently used one. Expired entries are dropped when they are read.
+
+    Sync FastAPI endpoints and dependencies run in a threadpool, hence the lock.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, timer: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Any | None:
+        """Return the value stored for ``key``, or None if absent or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self.timer():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> int:
+        """Store ``value`` for ``key``, and return the number of evicted entries."""
+        if self.maxsize <= 0:
+            return 0
+        with self._lock:
+            return self._set(key, value, ttl)
+
+    def add(self, key: Hashable, value: Any, ttl: float | None = None) -> int:
+        """Store ``value`` for ``key`` unless it has an unexpired entry, and return the number of evicted entries."""
+        if self.maxsize <= 0:
+            return 0
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > self.timer():
+                return 0
+            return self._set(key, value, ttl)
+
+    def _set(self, key: Hashable, value: Any, ttl: float | None) -> int:
+        expires_at = self.timer() + (self.ttl if ttl is None else ttl)
+        evicted = 0
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            evicted += 1
+        return evicted
+
+    def pop(self, key: Hashable) -> None:
+        """Forget the entry for ``key``, if any."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Forget all entries."""
+        with self._lock:
+            self._data.clear()
+
+
+class VersionedTTLCache(TTLCache):
+    """
+    A TTLCache whose entries are only served for the version they were read at.
+
+    The version is kept by the source of the values, and read by callers before
+    they use the cache, so that a change made by any process invalidates all the
+    entries at once. Callers pass the version read before the value to ``set()``,
+    so that a value computed concurrently with a change is never served.
+    """
+
+    def get(self, key: Hashable, *, version: int) -> Any | None:
+        entry = super().get(key)
+        if entry is None:
+            return None
+        stored_version, value = entry
+        if stored_version != version:
+            return None
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None, *, version: int) -> int:
+        return super().set(key, (version, value), ttl=ttl)
+
+
+# Authenticated API clients, by client_id, for the auth generation they were
+# read at (see ``ctms.crud.get_auth_generation()``).
+api_client_cache = VersionedTTLCache(
+    maxsize=settings.api_client_cache_max_size,
+    ttl=settings.api_client_cache_ttl_in_seconds,
+)
+
+
+# Effective permissions of API clients, by client_id, for the auth generation
+# they were read at.
+permissions_cache = VersionedTTLCache(
+    maxsize=settings.api_client_cache_max_size,
+    ttl=settings.api_client_cache_ttl_in_seconds,
+)
+
+
+# Successfully verified client credentials, by client_id.
+verified_credentials_cache = TTLCache(
+    maxsize=settings.verified_credentials_cache_max_size,
+    ttl=settings.verified_credentials_cache_ttl_in_seconds,
+)
+
+
+def invalidate_verified_credentials(client_id: str) -> None:
+    """Forget the verified credentials of an API client, after its secret changed."""
+    verified_credentials_cache.pop(client_id)
+
+
+# Decoded access tokens (namespace, name, exp), by token digest.
+# Entries expire with the token, see ``ctms.dependencies.get_token_subject()``.
+# They only save the signature check: the API client named by the token is
+# still checked on each request, so a disabled or deleted client is rejected.
+token_cache = TTLCache(
+    maxsize=settings.token_cache_max_size,
+    ttl=settings.token_expiration.total_seconds(),
+)
+
+
+class ContactCacheBackend(Protocol):
+    """Storage of the contact cache, with bytes keys and values."""
+
+    def get(self, key: str) -> bytes | None: ...
+
+    def set(self, key: str, value: bytes, ttl: float | None = None) -> int: ...
+
+    def add(self, key: str, value: bytes, ttl: float | None = None) -> int: ...
+
+
+class LocalContactCacheBackend:
+    """
+    Store contacts in a bounded LRU cache, in this process.
+
+    Writes made by other processes are not seen until the entries expire.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, timer: Callable[[], float] = time.monotonic):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl, timer=timer)
+
+    def get(self, key: str) -> bytes | None:
+        return self.cache.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float | None = None) -> int:
+        return self.cache.set(key, value, ttl=ttl)
+
+    def add(self, key: str, value: bytes, ttl: float | None = None) -> int:
+        return self.cache.add(key, value, ttl=ttl)
+
+
+class RedisContactCacheBackend:
+    """
+    Store contacts in a shared Redis server, so that writes invalidate them for all processes.
+
+    ``client`` is a ``redis.Redis`` instance, or any object with the same ``get()``
+    and ``set()`` methods. ``async_client`` is the ``redis.asyncio.Redis``
+    equivalent, used by the calls made within ``AsyncSession.run_sync()`` (see
+    ``ctms.database.run_db()``): they run on the event loop, and await it
+    through the greenlet of SQLAlchemy instead of blocking the loop.
+    """
+
+    def __init__(self, client: Any, ttl: float, prefix: str = "ctms:contact:", async_client: Any = None):
+        self.client = client
+        self.async_client = async_client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        if self.async_client is not None and in_greenlet():
+            return await_only(getattr(self.async_client, method)(*args, **kwargs))
+        return getattr(self.client, method)(*args, **kwargs)
+
+    def get(self, key: str) -> bytes | None:
+        return self._call("get", self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: float | None = None) -> int:
+        self._call("set", self.prefix + key, value, ex=max(1, round(self.ttl if ttl is None else ttl)))
+        return 0
+
+    def add(self, key: str, value: bytes, ttl: float | None = None) -> int:
+        self._call("set", self.prefix + key, value, ex=max(1, round(self.ttl if ttl is None else ttl)), nx=True)
+        return 0
+
+
+class CachedContact(NamedTuple):
+    """A contact serialized as a ``CTMSResponse``, with its ETag and unique identifiers."""
+
+    email_id: str
+    content: bytes
+    etag: str
+    identifiers: dict[str, str]
+
+    def encode(self) -> bytes:
+        # The serialized contact has no line breaks.
+        header = json.dumps({"email_id": self.email_id, "etag": self.etag, "identifiers": self.identifiers})
+        return header.encode() + b"\n" + self.content
+
+    @classmethod
+    def decode(cls, value: bytes) -> "CachedContact":
+        header, content = value.split(b"\n", 1)
+        return cls(content=content, **json.loads(header))
+
+
+class ContactCache:
+    """
+    Read-through cache of serialized contacts, by email_id, and by their unique alternate IDs.
+
+    Alternate IDs point to an email_id, and are checked against the identifiers
+    of the cached contact, so that they do not need to be invalidated when they
+    change.
+
+    When a contact is written, its entry is replaced by an empty marker for a
+    few seconds, and contacts are only cached where there is no entry. This
+    prevents a request that read the contact before the write from caching it
+    after the invalidation.
+    """
+
+    INVALIDATION_TTL = CONTACT_CACHE_INVALIDATION_TTL
+
+    def __init__(self, backend: ContactCacheBackend | None = None):
+        self.backend = backend
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def get(self, email_id: Any) -> CachedContact | None:
+        """Return the cached contact, or None."""
+        if self.backend is None:
+            return None
+        value = self.backend.get(f"email_id:{email_id}")
+        return CachedContact.decode(value) if value else None
+
+    def get_by_alternate_id(self, kind: str, value: str) -> CachedContact | None:
+        """Return the cached contact with this unique identifier, or None."""
+        if self.backend is None:
+            return None
+        email_id = self.backend.get(f"{kind}:{value}")
+        if email_id is None:
+            return None
+        contact = self.get(email_id.decode() if isinstance(email_id, bytes) else email_id)
+        if contact is None or contact.identifiers.get(kind) != value:
+            return None
+        return contact
+
+    def add(self, contact: CachedContact) -> int:
+        """Cache a contact read from the database, unless it was written recently, and return the number of evictions."""
+        if self.backend is None:
+            return 0
+        evicted = self.backend.add(f"email_id:{contact.email_id}", contact.encode())
+        for kind, value in contact.identifiers.items():
+            evicted += self.backend.set(f"{kind}:{value}", contact.email_id.encode())
+        return evicted
+
+    def invalidate(self, email_ids: Iterable[Any]) -> None:
+        """Forget the cached contacts, after they were written or deleted."""
+        if self.backend is None:
+            return
+        for email_id in email_ids:
+            self.backend.set(f"email_id:{email_id}", b"", ttl=self.INVALIDATION_TTL)
+
+
+def contact_cache_backend_factory(settings: Settings) -> ContactCacheBackend | None:
+    if settings.contact_cache_backend == "local":
+        return LocalContactCacheBackend(maxsize=settings.contact_cache_max_size, ttl=settings.contact_cache_ttl_in_seconds)
+    if settings.contact_cache_backend == "redis":
+        # Optional dependency, only required with this backend.
+        import redis  # noqa: PLC0415
+        import redis.asyncio  # noqa: PLC0415
+
+        return RedisContactCacheBackend(
+            redis.Redis.from_url(settings.contact_cache_url),
+            ttl=settings.contact_cache_ttl_in_seconds,
+            async_client=redis.asyncio.Redis.from_url(settings.contact_cache_url) if settings.db_async else None,
+        )
+    return None
+
+
+# Serialized contacts, by email_id and unique alternate IDs.
+contact_cache = ContactCache(contact_cache_backend_factory(settings))
@@ -3,15 +3,30 @@ from datetime import timedelta
 from enum import Enum
 from functools import lru_cache
 from pathlib import Path
-from typing import Annotated
+from typing import Annotated, Literal
 
-from pydantic import AfterValidator, Field, PostgresDsn
+from pydantic import AfterValidator, Field, PostgresDsn, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from ctms.schemas.common import AnyUrlString
+from ctms.schemas.waitlist import BUILTIN_WAITLIST_FIELDS_SCHEMAS
 
 PostgresDsnStr = Annotated[PostgresDsn, AfterValidator(str)]
 
+# How long the contact cache remembers that a contact was written, in seconds.
+CONTACT_CACHE_INVALIDATION_TTL = 10
+
+
+def check_configurable_waitlists(rules: dict[str, dict[str, int]]) -> dict[str, dict[str, int]]:
+    """Reject the fields of built-in waitlists, which have their own schemas."""
+    builtin = sorted(BUILTIN_WAITLIST_FIELDS_SCHEMAS.keys() & rules.keys())
+    if builtin:
+        raise ValueError(f"The fields of built-in waitlists cannot be configured: {', '.join(builtin)}")
+    return rules
+
+
+WaitlistFields = Annotated[dict[str, dict[str, int]], AfterValidator(check_configurable_waitlists)]
+
 
 @lru_cache
 def get_version():
@@ -35,14 +50,49 @@ class LogLevel(str, Enum):
     DEBUG = "DEBUG"
 
 
+class WaitlistFieldsSettings(BaseSettings):
+    """The ``CTMS_WAITLIST_FIELDS`` setting alone, so that the schemas can be used without configuring the application."""
+
+    waitlist_fields: WaitlistFields = {}
+
+    model_config = SettingsConfigDict(env_prefix="ctms_")
+
+
 class Settings(BaseSettings):
     db_url: PostgresDsnStr
     db_pool_size: int = 5  # Default value from sqlalchemy
     db_max_overflow: int = 10  # Default value from sqlalchemy
     db_pool_timeout_in_seconds: int = 30  # Default value from sqlalchemy
     db_pool_recycle_in_seconds: int = 900  # 15 minutes
+    db_async: bool = False
+    db_replica_urls: list[PostgresDsnStr] = []
+    db_replica_max_lag_in_seconds: float = 5
+    db_replica_read_your_writes_in_seconds: float = 10
+    db_replica_lag_check_interval_in_seconds: float = 5
+    db_connection_budget: int | None = None
+    db_slow_query_threshold_in_ms: int | None = None
+    db_slow_query_explain_rate: float = Field(default=0.0, ge=0, le=1)
+    db_slow_query_explain_analyze: bool = False
+    db_application_name_per_route: bool = False
     secret_key: str
     token_expiration: timedelta = timedelta(minutes=60)
+    api_client_cache_ttl_in_seconds: int = 60
+    api_client_cache_max_size: int = 1000
+    auth_generation_check_interval_in_seconds: float = 2
+    api_client_last_access_flush_interval_in_seconds: int = 30
+    db_stats_interval_in_seconds: int = 30
+    db_stats_max_age_in_seconds: int = 120
+    password_verification_max_workers: int = 2
+    verified_credentials_cache_ttl_in_seconds: int = 300
+    verified_credentials_cache_max_size: int = 1000
+    token_cache_max_size: int = 10000
+    lookup_max_identifiers: int = 1000
+    batch_max_operations: int = 500
+    waitlist_fields: WaitlistFields = {}
+    contact_cache_backend: Literal["local", "redis"] | None = None
+    contact_cache_url: str | None = None
+    contact_cache_ttl_in_seconds: int = 60
+    contact_cache_max_size: int = 10000
     server_prefix: str = "http://localhost:8000"
     use_mozlog: bool = True
     log_sqlalchemy: bool = False
@@ -53,7 +103,49 @@ class Settings(BaseSettings):
     sentry_dsn: AnyUrlString | None = Field(default=None, alias="SENTRY_DSN")
     host: str = Field(default="0.0.0.0", alias="HOST")
     port: int = Field(default=8000, alias="PORT")
+    workers: int = 1
+    worker_max_requests: int | None = None
+    worker_max_requests_jitter: int = 0
+    worker_max_rss_in_mb: int | None = None
+    worker_shutdown_timeout_in_seconds: int = 30
+    uvicorn_loop: Literal["auto", "asyncio", "uvloop"] = "auto"
+    uvicorn_http: Literal["auto", "h11", "httptools"] = "auto"
 
     prometheus_pushgateway_url: str | None = None
 
     model_config = SettingsConfigDict(env_prefix="ctms_")
+
+    @model_validator(mode="after")
+    def check_contact_cache(self):
+        """Reject the per-process contact cache with several workers, since writes only invalidate it in one of them."""
+        if self.contact_cache_backend == "local" and self.workers > 1:
+            raise ValueError("The local contact cache cannot be used with several workers, use the redis one")
+        return self
+
+    @model_validator(mode="after")
+    def check_replica_max_lag(self):
+        """Reject replicas lagging for longer than written contacts are kept out of the contact cache."""
+        if self.contact_cache_backend and self.db_replica_urls and self.db_replica_max_lag_in_seconds >= CONTACT_CACHE_INVALIDATION_TTL:
+            raise ValueError(
+                f"The replica max lag must be under {CONTACT_CACHE_INVALIDATION_TTL} seconds with the contact cache, "
+                "so that lagging replicas cannot cache stale contacts"
+            )
+        return self
+
+
+def pool_sizes_per_worker(settings: Settings) -> tuple[int, int]:
+    """
+    Return the ``pool_size`` and ``max_overflow`` of each worker, to stay within the connection budget.
+
+    Each worker opens a pool on the primary database, and a second one in async
+    mode. The connections allowed to a worker are split between them, keeping the
+    configured ``pool_size`` when possible, and leaving the rest as overflow.
+    """
+    if settings.db_connection_budget is None:
+        return settings.db_pool_size, settings.db_max_overflow
+    pools = 2 if settings.db_async else 1
+    per_pool = settings.db_connection_budget // (settings.workers * pools)
+    if per_pool < 1:
+        raise ValueError(f"A budget of {settings.db_connection_budget} database connections is too small for {settings.workers} workers")
+    pool_size = min(settings.db_pool_size, per_pool)
+    return pool_size, per_pool - pool_size
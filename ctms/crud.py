@@ -2,30 +2,38 @@ from __future__ import annotations
 
 import logging
 import uuid
-from collections.abc import Callable
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator
 from datetime import UTC, datetime
+from operator import attrgetter
 from typing import Any, cast
 
 from pydantic import UUID4
-from sqlalchemy import asc, or_, text
+from sqlalchemy import DateTime, Row, Select, String, asc, column, delete, event, or_, select, text, tuple_, union_all, update, values
 from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload, load_only, selectinload
 from sqlalchemy.sql import func
 
 from .auth import hash_password
+from .cache import contact_cache, invalidate_verified_credentials
 from .models import (
     AmoAccount,
     ApiClient,
+    ApiClientRoles,
+    AuthGeneration,
     Base,
     Email,
     FirefoxAccount,
     MozillaFoundationContact,
     Newsletter,
+    Roles,
     Waitlist,
 )
 from .schemas import (
     AddOnsInSchema,
+    ApiClientPrincipal,
     ApiClientSchema,
+    ContactFieldset,
     ContactInSchema,
     ContactPutSchema,
     ContactSchema,
@@ -72,6 +80,60 @@ def count_total_contacts(db: Session) -> int:
     return int(result)
 
 
+def get_table_estimates(db: Session, table_names: Iterable[str]) -> dict[str, int | None]:
+    """Return the approximate number of rows of the tables, from the PostgreSQL catalog.
+
+    Like ``count_total_contacts()``, this relies on the estimates refreshed by VACUUM
+    and ANALYZE. Tables that were never analyzed are estimated as None.
+    """
+    table_names = list(table_names)
+    rows = db.execute(
+        text("SELECT relname, reltuples FROM pg_class WHERE relkind = 'r' AND relname = ANY(:names)"),
+        {"names": table_names},
+    ).all()
+    estimates: dict[str, int | None] = dict.fromkeys(table_names)
+    for name, reltuples in rows:
+        estimates[name] = int(reltuples) if reltuples >= 0 else None
+    return estimates
+
+
+def get_newsletter_estimates(db: Session) -> dict[str, int]:
+    """Return the approximate number of subscriptions of each newsletter, from the PostgreSQL statistics.
+
+    ANALYZE samples the most common newsletter names and their frequencies. Multiplied
+    by the estimated size of the table, they give the subscriptions of the main
+    newsletters without scanning it. Unsubscribed rows are counted too, and rare
+    newsletters are missing.
+    """
+    row = db.execute(
+        text(
+            "SELECT s.most_common_vals::text::text[], s.most_common_freqs, c.reltuples"
+            " FROM pg_stats s JOIN pg_class c ON c.relname = s.tablename AND c.relkind = 'r'"
+            " WHERE s.schemaname = current_schema() AND s.tablename = :table AND s.attname = 'name'"
+        ),
+        {"table": Newsletter.__tablename__},
+    ).one_or_none()
+    if row is None or row[0] is None or row[2] < 0:
+        return {}
+    names, freqs, reltuples = row
+    return {name: round(freq * reltuples) for name, freq in zip(names, freqs, strict=True)}
+
+
+def get_replication_lag(db: Session) -> float | None:
+    """Return how far behind its primary a replica is, in seconds, 0 for a primary, or None if unknown.
+
+    A replica that replayed everything it received is not lagging, even if its last
+    replayed transaction is old, since nothing was written on the primary since then.
+    """
+    result = db.execute(
+        text(
+            "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+            " ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+        )
+    ).scalar()
+    return None if result is None else max(0.0, float(result))
+
+
 def get_amo_by_email_id(db: Session, email_id: UUID4):
     return db.query(AmoAccount).filter(AmoAccount.email_id == email_id).one_or_none()
 
@@ -92,30 +154,97 @@ def get_waitlists_by_email_id(db: Session, email_id: UUID4):
     return db.query(Waitlist).filter(Waitlist.email_id == email_id).all()
 
 
-def _contact_base_query(db):
+def _contact_load_options(fieldset: ContactFieldset | None = None, versioned: bool = False):
+    """
+    Return the loader options that fetch related contact data, or only the parts of the fieldset.
+
+    With ``versioned``, the related rows outside of the fieldset are loaded too,
+    with only their ``update_timestamp``, so that ``email_version()`` can be computed.
+    """
+    loaders = {
+        "amo": joinedload(Email.amo),
+        "fxa": joinedload(Email.fxa),
+        "mofo": joinedload(Email.mofo),
+        "newsletters": selectinload(Email.newsletters),
+        "waitlists": selectinload(Email.waitlists),
+    }
+    if fieldset is None:
+        return tuple(loaders.values())
+    options = [loader for group, loader in loaders.items() if group in fieldset.include]
+    if versioned:
+        version_loaders = {
+            "amo": joinedload(Email.amo).load_only(AmoAccount.update_timestamp),
+            "fxa": joinedload(Email.fxa).load_only(FirefoxAccount.update_timestamp),
+            "mofo": joinedload(Email.mofo).load_only(MozillaFoundationContact.update_timestamp),
+            "newsletters": selectinload(Email.newsletters).load_only(Newsletter.update_timestamp),
+            "waitlists": selectinload(Email.waitlists).load_only(Waitlist.update_timestamp),
+        }
+        options.extend(loader for group, loader in version_loaders.items() if group not in fieldset.include)
+    if fieldset.fields is not None:
+        options.append(load_only(*(getattr(Email, name) for name in fieldset.email_fields)))
+    return tuple(options)
+
+
+def _contact_base_query(db, fieldset: ContactFieldset | None = None, versioned: bool = False):
     """Return a query that will fetch related contact data, ready to filter."""
-    return (
-        db.query(Email)
-        .options(joinedload(Email.amo))
-        .options(joinedload(Email.fxa))
-        .options(joinedload(Email.mofo))
-        .options(selectinload(Email.newsletters))
-        .options(selectinload(Email.waitlists))
-    )
+    return db.query(Email).options(*_contact_load_options(fieldset, versioned))
+
+
+# Like ``selectinload()``, look up identifiers in chunks to keep statements small.
+LOOKUP_CHUNK_SIZE = 500
+
+
+def _chunked(values: list, size: int = LOOKUP_CHUNK_SIZE) -> Iterator[list]:
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
 
 
 def get_all_contacts_from_ids(db, email_ids):
     """Fetch all contacts that have the specified IDs."""
     bulk_contacts = _contact_base_query(db)
-    return bulk_contacts.filter(Email.email_id.in_(email_ids)).all()
+    return [email for chunk in _chunked(list(email_ids)) for email in bulk_contacts.filter(Email.email_id.in_(chunk)).all()]
+
+
+def lookup_email_ids(
+    db: Session,
+    email_ids: Iterable[UUID4] = (),
+    basket_tokens: Iterable[UUID4] = (),
+    fxa_ids: Iterable[str] = (),
+    primary_emails: Iterable[str] = (),
+    mofo_email_ids: Iterable[str] = (),
+) -> dict[str, dict[str, UUID4]]:
+    """
+    Resolve identifiers to the email_id of their contact.
+
+    Each kind of identifier is looked up with one ``IN`` query per chunk, on
+    its unique index. Return the found identifiers by kind, as strings, with
+    primary emails in lower case.
+    """
+    lookups = (
+        ("email_ids", Email.email_id, Email.email_id, email_ids),
+        ("basket_tokens", Email.basket_token, Email.email_id, (str(token) for token in basket_tokens)),
+        ("fxa_ids", FirefoxAccount.fxa_id, FirefoxAccount.email_id, fxa_ids),
+        ("primary_emails", func.lower(Email.primary_email), Email.email_id, (email.lower() for email in primary_emails)),
+        ("mofo_email_ids", MozillaFoundationContact.mofo_email_id, MozillaFoundationContact.email_id, mofo_email_ids),
+    )
+    found: dict[str, dict[str, UUID4]] = {}
+    for kind, key_column, email_id_column, keys in lookups:
+        found[kind] = {}
+        for chunk in _chunked(list(dict.fromkeys(keys))):
+            rows = db.execute(select(key_column, email_id_column).where(key_column.in_(chunk)))
+            found[kind].update((str(key), email_id) for key, email_id in rows)
+    return found
 
 
 def get_bulk_query(start_time, end_time, after_email_uuid, mofo_relevant):
-    filters = [
-        Email.update_timestamp >= start_time,
-        Email.update_timestamp < end_time,
-        Email.email_id != after_email_uuid,
-    ]
+    if after_email_uuid is None:
+        filters = [Email.update_timestamp >= start_time]
+    else:
+        # Resume strictly after the last contact of the previous page, which was
+        # updated at ``start_time``. The row-value comparison lets PostgreSQL seek
+        # directly in the ``bulk_read_index``.
+        filters = [tuple_(Email.update_timestamp, Email.email_id) > tuple_(start_time, after_email_uuid)]
+    filters.append(Email.update_timestamp < end_time)
     if mofo_relevant is False:
         filters.append(
             or_(
@@ -128,15 +257,14 @@ def get_bulk_query(start_time, end_time, after_email_uuid, mofo_relevant):
     return filters
 
 
-def get_bulk_contacts(
-    db: Session,
+def get_bulk_statement(
     start_time: datetime,
     end_time: datetime,
-    limit: int,
     mofo_relevant: bool | None = None,
     after_email_id: str | None = None,
-):
-    """Get all the data for a bulk batched set of contacts."""
+    fieldset: ContactFieldset | None = None,
+) -> Select:
+    """Return the statement selecting contacts in a time range, in update order."""
     after_email_uuid = None
     if after_email_id is not None:
         after_email_uuid = uuid.UUID(after_email_id)
@@ -146,20 +274,98 @@ def get_bulk_contacts(
         after_email_uuid=after_email_uuid,
         mofo_relevant=mofo_relevant,
     )
-    bulk_contacts = _contact_base_query(db)
-    for query_filter in filter_list:
-        bulk_contacts = bulk_contacts.filter(query_filter)
+    return select(Email).options(*_contact_load_options(fieldset)).where(*filter_list).order_by(asc(Email.update_timestamp), asc(Email.email_id))
+
 
-    bulk_contacts = bulk_contacts.order_by(asc(Email.update_timestamp), asc(Email.email_id)).limit(limit).all()
+def get_bulk_emails(
+    db: Session,
+    start_time: datetime,
+    end_time: datetime,
+    limit: int,
+    mofo_relevant: bool | None = None,
+    after_email_id: str | None = None,
+    fieldset: ContactFieldset | None = None,
+) -> list[Email]:
+    """Get a bulk batched set of emails, with the related data of the fieldset."""
+    statement = get_bulk_statement(
+        start_time=start_time,
+        end_time=end_time,
+        mofo_relevant=mofo_relevant,
+        after_email_id=after_email_id,
+        fieldset=fieldset,
+    )
+    return list(db.scalars(statement.limit(limit)).all())
+
+
+def get_bulk_contacts(
+    db: Session,
+    start_time: datetime,
+    end_time: datetime,
+    limit: int,
+    mofo_relevant: bool | None = None,
+    after_email_id: str | None = None,
+):
+    """Get all the data for a bulk batched set of contacts."""
+    bulk_contacts = get_bulk_emails(
+        db,
+        start_time=start_time,
+        end_time=end_time,
+        limit=limit,
+        mofo_relevant=mofo_relevant,
+        after_email_id=after_email_id,
+    )
 
     return [ContactSchema.from_email(email) for email in bulk_contacts]
 
 
-def get_email(db: Session, email_id: UUID4) -> Email | None:
-    """Get an Email and all related data."""
+def iter_bulk_contacts(
+    db: Session,
+    start_time: datetime,
+    end_time: datetime,
+    mofo_relevant: bool | None = None,
+    after_email_id: str | None = None,
+    batch_size: int = 1000,
+) -> Iterator[ContactSchema]:
+    """
+    Iterate over all the contacts of a time range, reading them in batches.
+
+    Rows are fetched through a server-side cursor, and the related data is loaded
+    for each batch, so that memory usage does not depend on the size of the range.
+    """
+    statement = get_bulk_statement(
+        start_time=start_time,
+        end_time=end_time,
+        mofo_relevant=mofo_relevant,
+        after_email_id=after_email_id,
+    )
+    for email in db.scalars(statement.execution_options(yield_per=batch_size)):
+        yield ContactSchema.from_email(email)
+
+
+async def aiter_bulk_contacts(
+    db: AsyncSession,
+    start_time: datetime,
+    end_time: datetime,
+    mofo_relevant: bool | None = None,
+    after_email_id: str | None = None,
+    batch_size: int = 1000,
+) -> AsyncIterator[ContactSchema]:
+    """Same as ``iter_bulk_contacts()``, with an async session."""
+    statement = get_bulk_statement(
+        start_time=start_time,
+        end_time=end_time,
+        mofo_relevant=mofo_relevant,
+        after_email_id=after_email_id,
+    )
+    async for email in await db.stream_scalars(statement.execution_options(yield_per=batch_size)):
+        yield ContactSchema.from_email(email)
+
+
+def get_email(db: Session, email_id: UUID4, fieldset: ContactFieldset | None = None, versioned: bool = False) -> Email | None:
+    """Get an Email and all related data, or only the parts of the fieldset (see ``_contact_load_options()``)."""
     return cast(
         Email | None,
-        _contact_base_query(db).filter(Email.email_id == email_id).one_or_none(),
+        _contact_base_query(db, fieldset, versioned).filter(Email.email_id == email_id).one_or_none(),
     )
 
 
@@ -171,8 +377,18 @@ def get_contact_by_email_id(db: Session, email_id: UUID4) -> ContactSchema | Non
     return ContactSchema.from_email(email)
 
 
-def get_contacts_by_any_id(
-    db: Session,
+def get_contacts_by_any_id(db: Session, **ids) -> list[ContactSchema]:
+    """
+    Get all the data for multiple contacts by ID as a list of Contacts.
+
+    Newsletters are retrieved in batches of 500 email_ids, so it will be two
+    queries for most calls.
+    """
+    return [ContactSchema.from_email(email) for email in get_emails_by_any_id(db, **ids)]
+
+
+def _filter_by_any_id(
+    statement,
     email_id: UUID4 | None = None,
     primary_email: str | None = None,
     basket_token: UUID4 | None = None,
@@ -182,13 +398,8 @@ def get_contacts_by_any_id(
     amo_user_id: str | None = None,
     fxa_id: str | None = None,
     fxa_primary_email: str | None = None,
-) -> list[ContactSchema]:
-    """
-    Get all the data for multiple contacts by ID as a list of Contacts.
-
-    Newsletters are retrieved in batches of 500 email_ids, so it will be two
-    queries for most calls.
-    """
+):
+    """Filter a query on emails to the ones matching all the IDs."""
     assert any(
         (
             email_id,
@@ -202,7 +413,6 @@ def get_contacts_by_any_id(
             fxa_primary_email,
         )
     )
-    statement = _contact_base_query(db)
     if email_id is not None:
         statement = statement.filter(Email.email_id == email_id)
     if primary_email is not None:
@@ -221,8 +431,59 @@ def get_contacts_by_any_id(
         statement = statement.join(Email.fxa).filter(FirefoxAccount.fxa_id == fxa_id)
     if fxa_primary_email is not None:
         statement = statement.join(Email.fxa).filter_by(fxa_primary_email_insensitive_comparator=fxa_primary_email)
-    emails = cast(list[Email], statement.all())
-    return [ContactSchema.from_email(email) for email in emails]
+    return statement
+
+
+def get_emails_by_any_id(db: Session, fieldset: ContactFieldset | None = None, versioned: bool = False, **ids) -> list[Email]:
+    """Get the emails matching all the IDs, with the related data of the fieldset (see ``_contact_load_options()``)."""
+    return cast(list[Email], _filter_by_any_id(_contact_base_query(db, fieldset, versioned), **ids).all())
+
+
+# The tables of a contact, all with an ``email_id`` and an ``update_timestamp``.
+CONTACT_MODELS: tuple[type[Base], ...] = (Email, AmoAccount, FirefoxAccount, MozillaFoundationContact, Newsletter, Waitlist)
+
+
+def get_contact_versions(db: Session, email_ids: Iterable[UUID4] | Select) -> list[Row]:
+    """
+    Return the version of contacts, as ``(email_id, last update, number of rows)`` rows.
+
+    Only the ``email_id`` and ``update_timestamp`` columns of each table are
+    read, with one statement, to tell whether contacts changed without loading
+    them. Deleted related rows are noticed through the number of rows.
+    ``email_ids`` is a list, or a statement selecting them.
+    """
+    rows = union_all(*(select(model.email_id, model.update_timestamp).where(model.email_id.in_(email_ids)) for model in CONTACT_MODELS)).subquery()
+    stmt = select(rows.c.email_id, func.max(rows.c.update_timestamp), func.count()).group_by(rows.c.email_id)
+    return list(db.execute(stmt))
+
+
+def get_contact_versions_by_any_id(db: Session, **ids) -> list[Row]:
+    """Same as ``get_contact_versions()``, for the contacts matching all the IDs."""
+    email_ids = _filter_by_any_id(db.query(Email), **ids).with_entities(Email.email_id).cte("email_ids")
+    return get_contact_versions(db, select(email_ids.c.email_id))
+
+
+def _invalidate_cached_contacts(db: Session, email_ids: Iterable[UUID4]) -> None:
+    """Forget the cached contacts once the session commits."""
+    db.info.setdefault("written_email_ids", set()).update(email_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_contacts(session: Session) -> None:
+    email_ids = session.info.pop("written_email_ids", None)
+    if email_ids:
+        contact_cache.invalidate(email_ids)
+
+
+def lock_email(db: Session, email_id: UUID4) -> None:
+    """Lock the email row of a contact, if it exists, until the end of the transaction."""
+    db.execute(select(Email.email_id).where(Email.email_id == email_id).with_for_update())
+
+
+def lock_emails(db: Session, email_ids: Iterable[UUID4]) -> None:
+    """Lock the email rows of the contacts that exist, in email_id order, until the end of the transaction."""
+    for chunk in _chunked(sorted(email_ids)):
+        db.execute(select(Email.email_id).where(Email.email_id.in_(chunk)).order_by(Email.email_id).with_for_update())
 
 
 def create_amo(db: Session, email_id: UUID4, amo: AddOnsInSchema) -> AmoAccount | None:
@@ -233,30 +494,31 @@ def create_amo(db: Session, email_id: UUID4, amo: AddOnsInSchema) -> AmoAccount
     return db_amo
 
 
-def create_or_update_amo(db: Session, email_id: UUID4, amo: AddOnsInSchema | None):
+def create_or_update_amo(db: Session, email_id: UUID4, amo: AddOnsInSchema | None) -> Row | None:
     if not amo or amo.is_default():
         db.query(AmoAccount).filter(AmoAccount.email_id == email_id).delete()
-        return
+        return None
 
     # Providing update timestamp
     updated_amo = UpdatedAddOnsInSchema(**amo.model_dump())
     stmt = insert(AmoAccount).values(email_id=email_id, **updated_amo.model_dump())
     stmt = stmt.on_conflict_do_update(index_elements=[AmoAccount.email_id], set_=updated_amo.model_dump())
-    db.execute(stmt)
+    return db.execute(stmt.returning(*AmoAccount.__table__.columns)).one()
 
 
-def create_email(db: Session, email: EmailInSchema):
+def create_email(db: Session, email: EmailInSchema) -> Email:
     db_email = Email(**email.model_dump())
     db.add(db_email)
+    return db_email
 
 
-def create_or_update_email(db: Session, email: EmailPutSchema):
+def create_or_update_email(db: Session, email: EmailPutSchema) -> Row:
     # Providing update timestamp
     updated_email = UpdatedEmailPutSchema(**email.model_dump())
 
     stmt = insert(Email).values(**updated_email.model_dump())
     stmt = stmt.on_conflict_do_update(index_elements=[Email.email_id], set_=updated_email.model_dump())
-    db.execute(stmt)
+    return db.execute(stmt.returning(*Email.__table__.columns)).one()
 
 
 def create_fxa(db: Session, email_id: UUID4, fxa: FirefoxAccountsInSchema) -> FirefoxAccount | None:
@@ -267,16 +529,16 @@ def create_fxa(db: Session, email_id: UUID4, fxa: FirefoxAccountsInSchema) -> Fi
     return db_fxa
 
 
-def create_or_update_fxa(db: Session, email_id: UUID4, fxa: FirefoxAccountsInSchema | None):
+def create_or_update_fxa(db: Session, email_id: UUID4, fxa: FirefoxAccountsInSchema | None) -> Row | None:
     if not fxa or fxa.is_default():
         (db.query(FirefoxAccount).filter(FirefoxAccount.email_id == email_id).delete())
-        return
+        return None
     # Providing update timestamp
     updated_fxa = UpdatedFirefoxAccountsInSchema(**fxa.model_dump())
 
     stmt = insert(FirefoxAccount).values(email_id=email_id, **updated_fxa.model_dump())
     stmt = stmt.on_conflict_do_update(index_elements=[FirefoxAccount.email_id], set_=updated_fxa.model_dump())
-    db.execute(stmt)
+    return db.execute(stmt.returning(*FirefoxAccount.__table__.columns)).one()
 
 
 def create_mofo(db: Session, email_id: UUID4, mofo: MozillaFoundationInSchema) -> MozillaFoundationContact | None:
@@ -287,13 +549,13 @@ def create_mofo(db: Session, email_id: UUID4, mofo: MozillaFoundationInSchema) -
     return db_mofo
 
 
-def create_or_update_mofo(db: Session, email_id: UUID4, mofo: MozillaFoundationInSchema | None):
+def create_or_update_mofo(db: Session, email_id: UUID4, mofo: MozillaFoundationInSchema | None) -> Row | None:
     if not mofo or mofo.is_default():
         (db.query(MozillaFoundationContact).filter(MozillaFoundationContact.email_id == email_id).delete())
-        return
+        return None
     stmt = insert(MozillaFoundationContact).values(email_id=email_id, **mofo.model_dump())
     stmt = stmt.on_conflict_do_update(index_elements=[MozillaFoundationContact.email_id], set_=mofo.model_dump())
-    db.execute(stmt)
+    return db.execute(stmt.returning(*MozillaFoundationContact.__table__.columns)).one()
 
 
 def create_newsletter(db: Session, email_id: UUID4, newsletter: NewsletterInSchema) -> Newsletter | None:
@@ -304,7 +566,7 @@ def create_newsletter(db: Session, email_id: UUID4, newsletter: NewsletterInSche
     return db_newsletter
 
 
-def create_or_update_newsletters(db: Session, email_id: UUID4, newsletters: list[NewsletterInSchema]):
+def create_or_update_newsletters(db: Session, email_id: UUID4, newsletters: list[NewsletterInSchema]) -> list[Row]:
     # Start by deleting the existing newsletters that are not specified as input.
     # We delete instead of set subscribed=False, because we want an idempotent
     # round-trip of PUT/GET at the API level.
@@ -326,7 +588,8 @@ def create_or_update_newsletters(db: Session, email_id: UUID4, newsletters: list
             },
         )
 
-        db.execute(stmt)
+        return sorted(db.execute(stmt.returning(*Newsletter.__table__.columns)), key=lambda row: row.name)
+    return []
 
 
 def create_waitlist(db: Session, email_id: UUID4, waitlist: WaitlistInSchema) -> Waitlist | None:
@@ -337,7 +600,7 @@ def create_waitlist(db: Session, email_id: UUID4, waitlist: WaitlistInSchema) ->
     return db_waitlist
 
 
-def create_or_update_waitlists(db: Session, email_id: UUID4, waitlists: list[WaitlistInSchema]):
+def create_or_update_waitlists(db: Session, email_id: UUID4, waitlists: list[WaitlistInSchema]) -> list[Row]:
     # Start by deleting the existing waitlists that are not specified as input.
     # We delete instead of set subscribed=False, because we want an idempotent
     # round-trip of PUT/GET at the API level.
@@ -360,7 +623,8 @@ def create_or_update_waitlists(db: Session, email_id: UUID4, waitlists: list[Wai
             },
         )
 
-        db.execute(stmt)
+        return sorted(db.execute(stmt.returning(*Waitlist.__table__.columns)), key=lambda row: row.name)
+    return []
 
 
 def create_contact(
@@ -368,33 +632,80 @@ def create_contact(
     email_id: UUID4,
     contact: ContactInSchema,
     metrics: dict | None,
-):
-    create_email(db, contact.email)
-    if contact.amo:
-        create_amo(db, email_id, contact.amo)
-    if contact.fxa:
-        create_fxa(db, email_id, contact.fxa)
-    if contact.mofo:
-        create_mofo(db, email_id, contact.mofo)
+) -> Email:
+    """
+    Add a new contact to the session, and return it.
+
+    All its relationships are set, so that once flushed (with the generated
+    columns fetched via ``RETURNING``), it can be serialized without queries.
+    """
+    _invalidate_cached_contacts(db, [email_id])
+    db_email = create_email(db, contact.email)
+    db_email.amo = create_amo(db, email_id, contact.amo) if contact.amo else None
+    db_email.fxa = create_fxa(db, email_id, contact.fxa) if contact.fxa else None
+    db_email.mofo = create_mofo(db, email_id, contact.mofo) if contact.mofo else None
+
+    newsletters = (create_newsletter(db, email_id, newsletter) for newsletter in contact.newsletters)
+    db_email.newsletters = [newsletter for newsletter in newsletters if newsletter is not None]
+
+    waitlists = (create_waitlist(db, email_id, waitlist) for waitlist in contact.waitlists)
+    db_email.waitlists = [waitlist for waitlist in waitlists if waitlist is not None]
+    return db_email
 
-    for newsletter in contact.newsletters:
-        create_newsletter(db, email_id, newsletter)
 
-    for waitlist in contact.waitlists:
-        create_waitlist(db, email_id, waitlist)
+def create_contact_if_absent(
+    db: Session,
+    email_id: UUID4,
+    contact: ContactInSchema,
+    metrics: dict | None,
+) -> ContactSchema | None:
+    """
+    Create a contact, unless one exists with this email_id, and return it.
+
+    The email row is inserted with ``ON CONFLICT DO NOTHING``, so that the
+    common case of a new contact does not pay for a read first. If the
+    contact already exists, nothing is written and ``None`` is returned.
+    Conflicts on other unique columns still raise an ``IntegrityError``.
+    """
+    stmt = insert(Email).values(**contact.email.model_dump())
+    stmt = stmt.on_conflict_do_nothing(index_elements=[Email.email_id])
+    email = db.execute(stmt.returning(*Email.__table__.columns)).one_or_none()
+    if email is None:
+        return None
 
+    _invalidate_cached_contacts(db, [email_id])
+    amo = create_amo(db, email_id, contact.amo) if contact.amo else None
+    fxa = create_fxa(db, email_id, contact.fxa) if contact.fxa else None
+    mofo = create_mofo(db, email_id, contact.mofo) if contact.mofo else None
+    newsletters = [create_newsletter(db, email_id, newsletter) for newsletter in contact.newsletters]
+    waitlists = [create_waitlist(db, email_id, waitlist) for waitlist in contact.waitlists]
+    # Fetch the generated columns of the child rows.
+    db.flush()
+    return ContactSchema(
+        email=email,
+        amo=amo,
+        fxa=fxa,
+        mofo=mofo,
+        newsletters=sorted(filter(None, newsletters), key=attrgetter("name")),
+        waitlists=sorted(filter(None, waitlists), key=attrgetter("name")),
+    )
 
-def create_or_update_contact(db: Session, email_id: UUID4, contact: ContactPutSchema, metrics: dict | None):
-    create_or_update_email(db, contact.email)
-    create_or_update_amo(db, email_id, contact.amo)
-    create_or_update_fxa(db, email_id, contact.fxa)
-    create_or_update_mofo(db, email_id, contact.mofo)
 
-    create_or_update_newsletters(db, email_id, contact.newsletters)
-    create_or_update_waitlists(db, email_id, contact.waitlists)
+def create_or_update_contact(db: Session, email_id: UUID4, contact: ContactPutSchema, metrics: dict | None) -> ContactSchema:
+    """Create or replace a contact, and return it as written, from the ``RETURNING`` clauses of the upserts."""
+    _invalidate_cached_contacts(db, [email_id])
+    return ContactSchema(
+        email=create_or_update_email(db, contact.email),
+        amo=create_or_update_amo(db, email_id, contact.amo),
+        fxa=create_or_update_fxa(db, email_id, contact.fxa),
+        mofo=create_or_update_mofo(db, email_id, contact.mofo),
+        newsletters=create_or_update_newsletters(db, email_id, contact.newsletters),
+        waitlists=create_or_update_waitlists(db, email_id, contact.waitlists),
+    )
 
 
 def delete_contact(db: Session, email_id: UUID4):
+    _invalidate_cached_contacts(db, [email_id])
     db.query(AmoAccount).filter(AmoAccount.email_id == email_id).delete()
     db.query(MozillaFoundationContact).filter(MozillaFoundationContact.email_id == email_id).delete()
     db.query(Newsletter).filter(Newsletter.email_id == email_id).delete()
@@ -416,6 +727,7 @@ def update_contact(  # noqa: PLR0912
 ) -> None:
     """Update an existing contact using a sparse update dictionary"""
     email_id = email.email_id
+    _invalidate_cached_contacts(db, [email_id])
 
     if "email" in update_data:
         _update_orm(email, update_data["email"])
@@ -478,6 +790,175 @@ def update_contact(  # noqa: PLR0912
     _update_orm(email, {"update_timestamp": datetime.now(UTC)})
 
 
+# The 1:1 groups of a contact: model, input schema, and schema to write (with
+# an update timestamp, like the single contact upserts).
+BATCH_GROUPS: dict[str, tuple[type[Base], type[Any], type[Any]]] = {
+    "amo": (AmoAccount, AddOnsInSchema, UpdatedAddOnsInSchema),
+    "fxa": (FirefoxAccount, FirefoxAccountsInSchema, UpdatedFirefoxAccountsInSchema),
+    "mofo": (MozillaFoundationContact, MozillaFoundationInSchema, MozillaFoundationInSchema),
+}
+# The 1:N collections of a contact: model, input schema, and unique constraint on (email_id, name).
+BATCH_COLLECTIONS: dict[str, tuple[type[Base], type[Any], str]] = {
+    "newsletters": (Newsletter, NewsletterInSchema, "uix_email_name"),
+    "waitlists": (Waitlist, WaitlistInSchema, "uix_wl_email_name"),
+}
+
+
+def _upsert_rows(db: Session, model: type[Base], rows: list[dict], conflict_keys: list[str], **set_extra) -> None:
+    """Insert the rows, or update them on conflict, with one multi-row statement per chunk."""
+    for chunk in _chunked(rows):
+        stmt = insert(model).values(chunk)
+        set_ = {key: stmt.excluded[key] for key in chunk[0] if key not in conflict_keys}
+        stmt = stmt.on_conflict_do_update(index_elements=conflict_keys, set_={**set_, **set_extra})
+        db.execute(stmt)
+
+
+class ContactBatch:
+    """
+    Accumulate the writes of many contacts, and apply them with a few
+    set-based statements per table, whatever the number of contacts.
+
+    Contacts are created with ``create()`` like ``create_contact_if_absent()``,
+    replaced with ``put()`` like ``create_or_update_contact()`` does, or
+    partially updated with ``patch()`` like ``update_contact()``. A contact can
+    only be added once per batch.
+    """
+
+    def __init__(self):
+        self.emails: dict[UUID4, dict] = {}
+        self.group_rows: dict[str, dict[UUID4, dict]] = {group: {} for group in BATCH_GROUPS}
+        self.group_deletes: dict[str, set[UUID4]] = {group: set() for group in BATCH_GROUPS}
+        self.collection_rows: dict[str, dict[tuple[UUID4, str], dict]] = {name: {} for name in BATCH_COLLECTIONS}
+        # Names to keep, by replaced contact. The others are deleted.
+        self.collection_kept: dict[str, dict[UUID4, list[str]]] = {name: {} for name in BATCH_COLLECTIONS}
+        self.collection_unsubscribed: dict[str, set[UUID4]] = {name: set() for name in BATCH_COLLECTIONS}
+        self.created: set[UUID4] = set()
+        # Contacts to create that existed when applied, and were not written.
+        self.conflicts: set[UUID4] = set()
+
+    def __len__(self) -> int:
+        return len(self.emails)
+
+    def put(self, contact: ContactPutSchema) -> None:
+        """Add a contact to create or replace."""
+        email_id = contact.email.email_id
+        self.emails[email_id] = UpdatedEmailPutSchema(**contact.email.model_dump()).model_dump()
+        for group, (_, _, write_schema) in BATCH_GROUPS.items():
+            value = getattr(contact, group)
+            if not value or value.is_default():
+                self.group_deletes[group].add(email_id)
+            else:
+                self.group_rows[group][email_id] = {"email_id": email_id, **write_schema(**value.model_dump()).model_dump()}
+        for name in BATCH_COLLECTIONS:
+            items = getattr(contact, name)
+            self.collection_kept[name][email_id] = [item.name for item in items if not item.is_default()]
+            for item in items:
+                self.collection_rows[name][email_id, item.name] = {"email_id": email_id, **item.model_dump()}
+
+    def create(self, contact: ContactPutSchema) -> None:
+        """Add a contact to create, unless one exists with its email_id when applied."""
+        self.put(contact)
+        self.created.add(contact.email.email_id)
+
+    def discard(self, email_ids: set[UUID4]) -> None:
+        """Forget the writes of these contacts."""
+        for email_id in email_ids:
+            self.emails.pop(email_id, None)
+            for group in BATCH_GROUPS:
+                self.group_rows[group].pop(email_id, None)
+                self.group_deletes[group].discard(email_id)
+            for name in BATCH_COLLECTIONS:
+                self.collection_kept[name].pop(email_id, None)
+                self.collection_unsubscribed[name].discard(email_id)
+        for name in BATCH_COLLECTIONS:
+            rows = self.collection_rows[name]
+            for key in [key for key in rows if key[0] in email_ids]:
+                del rows[key]
+
+    def patch(self, email: Email, update_data: dict) -> None:  # noqa: PLR0912
+        """Add an existing contact, loaded with its related data, to update with a sparse update dictionary."""
+        email_id = email.email_id
+        email_data = {**EmailPutSchema.model_validate(email).model_dump(), **update_data.get("email", {})}
+        # On any PATCH event, the central/email table's time is updated as well.
+        self.emails[email_id] = UpdatedEmailPutSchema(**email_data).model_dump()
+
+        for group, (_, in_schema, write_schema) in BATCH_GROUPS.items():
+            if group not in update_data:
+                continue
+            existing = getattr(email, group)
+            if update_data[group] == "DELETE":
+                self.group_deletes[group].add(email_id)
+                continue
+            if existing is None:
+                value = in_schema(**update_data[group])
+            else:
+                value = in_schema(**{**in_schema.model_validate(existing).model_dump(), **update_data[group]})
+            if value.is_default():
+                self.group_deletes[group].add(email_id)
+            else:
+                self.group_rows[group][email_id] = {"email_id": email_id, **write_schema(**value.model_dump()).model_dump()}
+
+        for name, (_, in_schema, _) in BATCH_COLLECTIONS.items():
+            if name not in update_data:
+                continue
+            if update_data[name] == "UNSUBSCRIBE":
+                self.collection_unsubscribed[name].add(email_id)
+                continue
+            existing = {item.name: item for item in getattr(email, name)}
+            for item_update in update_data[name]:
+                item_name = item_update["name"]
+                if item_name in existing:
+                    value = in_schema(**{**in_schema.model_validate(existing[item_name]).model_dump(), **item_update})
+                elif item_update.get("subscribed", True):
+                    value = in_schema(**item_update)
+                else:
+                    continue
+                self.collection_rows[name][email_id, item_name] = {"email_id": email_id, **value.model_dump()}
+
+    def apply(self, db: Session) -> None:
+        """Execute the accumulated writes, without committing."""
+        _invalidate_cached_contacts(db, self.emails)
+        # Created contacts are inserted first, with ``ON CONFLICT DO NOTHING``, so
+        # that a contact created concurrently since it was checked is not replaced.
+        inserted = set()
+        for chunk in _chunked([self.emails[email_id] for email_id in self.created]):
+            stmt = insert(Email).values(chunk).on_conflict_do_nothing(index_elements=[Email.email_id])
+            inserted.update(db.execute(stmt.returning(Email.email_id)).scalars())
+        self.conflicts = self.created - inserted
+        self.discard(self.conflicts)
+        _upsert_rows(db, Email, [row for email_id, row in self.emails.items() if email_id not in self.created], ["email_id"])
+
+        for group, (model, _, _) in BATCH_GROUPS.items():
+            for chunk in _chunked(list(self.group_deletes[group])):
+                db.execute(delete(model).where(model.email_id.in_(chunk)))
+            _upsert_rows(db, model, list(self.group_rows[group].values()), ["email_id"])
+
+        for name, (model, _, _) in BATCH_COLLECTIONS.items():
+            # We delete instead of set subscribed=False, because we want an idempotent
+            # round-trip of PUT/GET at the API level.
+            for chunk in _chunked(list(self.collection_kept[name].items())):
+                kept = [(email_id, item_name) for email_id, names in chunk for item_name in names]
+                db.execute(
+                    delete(model).where(
+                        model.email_id.in_([email_id for email_id, _ in chunk]),
+                        tuple_(model.email_id, model.name).not_in(kept),
+                    )
+                )
+            for chunk in _chunked(list(self.collection_unsubscribed[name])):
+                db.execute(
+                    update(model)
+                    .where(model.email_id.in_(chunk), model.subscribed.isnot(False))
+                    .values(subscribed=False, update_timestamp=func.now())
+                )
+            _upsert_rows(
+                db,
+                model,
+                list(self.collection_rows[name].values()),
+                ["email_id", "name"],
+                update_timestamp=text("statement_timestamp()"),
+            )
+
+
 def create_api_client(db: Session, api_client: ApiClientSchema, secret):
     hashed_secret = hash_password(secret)
     db_api_client = ApiClient(hashed_secret=hashed_secret, **api_client.model_dump())
@@ -488,19 +969,67 @@ def get_api_client_by_id(db: Session, client_id: str):
     return db.query(ApiClient).filter(ApiClient.client_id == client_id).one_or_none()
 
 
+def get_api_client_principal(db: Session, client_id: str) -> ApiClientPrincipal | None:
+    """Return the fields of an API client needed to authorize requests, in one query."""
+    row = (
+        db.query(
+            ApiClient.client_id,
+            ApiClient.email,
+            ApiClient.enabled,
+            func.array_agg(Roles.name).filter(Roles.name.isnot(None)),
+        )
+        .outerjoin(ApiClientRoles, ApiClientRoles.api_client_id == ApiClient.client_id)
+        .outerjoin(Roles, Roles.id == ApiClientRoles.role_id)
+        .filter(ApiClient.client_id == client_id)
+        .group_by(ApiClient.client_id)
+        .one_or_none()
+    )
+    if row is None:
+        return None
+    client_id, email, enabled, roles = row
+    return ApiClientPrincipal(client_id=client_id, email=email, enabled=enabled, roles=frozenset(roles or []))
+
+
+def get_auth_generation(db: Session) -> int:
+    """
+    Return the auth generation, bumped by the database when API clients, roles or permissions change.
+
+    Cached API clients and permissions are only used for the generation they were read at.
+    """
+    return db.execute(select(AuthGeneration.generation).where(AuthGeneration.id == 1)).scalar_one_or_none() or 0
+
+
 def get_active_api_client_ids(db: Session) -> list[str]:
     rows = db.query(ApiClient).filter(ApiClient.enabled.is_(True)).options(load_only(ApiClient.client_id)).order_by(ApiClient.client_id).all()
     return [row.client_id for row in rows]
 
 
-def update_api_client_last_access(db: Session, api_client: ApiClient):
-    api_client.last_access = func.now()
-    db.add(api_client)
+def update_api_clients_last_access(db: Session, last_accesses: dict[str, datetime]):
+    """Set the last access time of several API clients in one statement.
+
+    Times are only moved forward, since concurrent processes may flush
+    their own (older) access times later.
+    """
+    if not last_accesses:
+        return
+    accesses = values(
+        column("client_id", String),
+        column("last_access", DateTime(timezone=True)),
+        name="accesses",
+    ).data(list(last_accesses.items()))
+    stmt = (
+        update(ApiClient)
+        .where(ApiClient.client_id == accesses.c.client_id)
+        .values(last_access=func.greatest(ApiClient.last_access, accesses.c.last_access))
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(stmt)
 
 
 def update_api_client_secret(db: Session, api_client: ApiClient, secret):
     api_client.hashed_secret = hash_password(secret)
     db.add(api_client)
+    invalidate_verified_credentials(api_client.client_id)
 
 
 def get_contacts_from_newsletter(dbsession, newsletter_name):
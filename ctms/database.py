@@ -1,21 +1,195 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker
+import time
+from collections.abc import Callable
+from contextvars import ContextVar
+from typing import Any
+
+from sqlalchemy import Engine, create_engine, event, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+from starlette.concurrency import run_in_threadpool
 
 from .config import Settings
+from .slow_queries import SlowQueryLog
+
+# The application_name of the connections, followed by the path template of the
+# route that runs the statements. Postgres truncates it to 63 bytes.
+APPLICATION_NAME = "ctms"
+APPLICATION_NAME_MAX_LENGTH = 63
+
+
+class QueryStats:
+    """
+    Accumulate the SQL statements executed in a context: their count, duration, and rows.
+
+    The metrics middleware opens one for each request. It is also a context manager,
+    to check the statements of a block of code::
+
+        with QueryStats() as stats:
+            ...
+        assert stats.statements <= 3
+
+    Statements are also counted by the enclosing ``QueryStats``, if any. The ASGI
+    ``scope`` of the request, once routed, gives the path template of its statements.
+    """
+
+    def __init__(self, scope: dict[str, Any] | None = None):
+        self.scope = scope
+        self.statements = 0
+        self.duration_s = 0.0
+        self.rows = 0
+        self._parent: QueryStats | None = None
+        self._token = None
+
+    def __enter__(self) -> "QueryStats":
+        self._parent = query_stats_context.get()
+        self._token = query_stats_context.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        query_stats_context.reset(self._token)
+
+    @property
+    def path_template(self) -> str | None:
+        """Return the path template of the route running the statements, like "/ctms/{email_id}"."""
+        stats: QueryStats | None = self
+        while stats is not None:
+            route = stats.scope.get("route") if stats.scope is not None else None
+            if route is not None:
+                return route.path_format
+            stats = stats._parent
+        return None
+
+    def record(self, duration_s: float, rows: int) -> None:
+        stats: QueryStats | None = self
+        while stats is not None:
+            stats.statements += 1
+            stats.duration_s += duration_s
+            stats.rows += max(rows, 0)
+            stats = stats._parent
+
+
+query_stats_context: ContextVar[QueryStats | None] = ContextVar("query_stats_context", default=None)
+
+
+def application_name(path_template: str | None) -> str:
+    """Return the application_name of the connections running the statements of a route."""
+    if path_template is None:
+        return APPLICATION_NAME
+    return f"{APPLICATION_NAME} {path_template}"[:APPLICATION_NAME_MAX_LENGTH]
+
+
+def _set_application_name(conn, cursor, path_template: str | None) -> None:
+    """Name the connection after the route, so that ``pg_stat_activity`` and ``pg_stat_statements`` show it."""
+    name = application_name(path_template)
+    if conn.info.get("application_name") == name:
+        return
+    placeholder = "$1" if conn.dialect.paramstyle == "numeric_dollar" else "%s"
+    cursor.execute(f"SELECT set_config('application_name', {placeholder}, false)", (name,))
+    conn.info["application_name"] = name
+
+
+def _forget_application_name(conn, *args) -> None:
+    # A rolled back transaction (or savepoint) also reverts the application_name that it set.
+    conn.info.pop("application_name", None)
+
 
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if settings.db_application_name_per_route:
+        stats = query_stats_context.get()
+        _set_application_name(conn, cursor, stats.path_template if stats is not None else None)
+    conn.info["query_start_time"] = time.perf_counter()
 
-def engine_factory(settings):
-    return create_engine(
-        settings.db_url,
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_time = conn.info.pop("query_start_time", None)
+    if start_time is None:
+        return
+    duration_s = time.perf_counter() - start_time
+    stats = query_stats_context.get()
+    if stats is not None:
+        stats.record(duration_s, cursor.rowcount)
+    if slow_query_log:
+        slow_query_log.check(conn, statement, parameters, duration_s, stats.path_template if stats is not None else None)
+
+
+def instrument_engine(engine: Engine) -> Engine:
+    """
+    Instrument the statements of the engine.
+
+    They are counted in the current ``QueryStats``, logged when slower than
+    ``db_slow_query_threshold_in_ms``, and, with ``db_application_name_per_route``,
+    run with the path template of the route in the ``application_name``.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "rollback", _forget_application_name)
+    event.listen(engine, "rollback_savepoint", _forget_application_name)
+    return engine
+
+
+def engine_factory(settings, url: str | None = None):
+    """Return an engine on the primary database, or on ``url`` (a replica) with the same pool settings."""
+    new_engine = create_engine(
+        url or settings.db_url,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_in_seconds,
+        pool_recycle=settings.db_pool_recycle_in_seconds,
+        echo=settings.log_sqlalchemy,
+    )
+    return instrument_engine(new_engine)
+
+
+def async_engine_factory(settings, url: str | None = None):
+    """Return an engine on the same database, using the asyncpg driver."""
+    new_engine = create_async_engine(
+        make_url(url or settings.db_url).set(drivername="postgresql+asyncpg"),
         pool_size=settings.db_pool_size,
         max_overflow=settings.db_max_overflow,
         pool_timeout=settings.db_pool_timeout_in_seconds,
         pool_recycle=settings.db_pool_recycle_in_seconds,
         echo=settings.log_sqlalchemy,
     )
+    instrument_engine(new_engine.sync_engine)
+    return new_engine
+
 
+async def run_db(db: Session | AsyncSession, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Call ``fn(session, *args, **kwargs)`` without blocking the event loop.
 
-engine = engine_factory(Settings())
+    The functions of ``ctms.crud`` take a sync ``Session``. With an ``AsyncSession``,
+    they run on its async connection via ``AsyncSession.run_sync()``, otherwise
+    in the threadpool, like sync endpoints do.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+settings = Settings()
+slow_query_log = SlowQueryLog(
+    settings.db_slow_query_threshold_in_ms / 1000 if settings.db_slow_query_threshold_in_ms is not None else None,
+    explain_rate=settings.db_slow_query_explain_rate,
+    analyze=settings.db_slow_query_explain_analyze,
+)
+engine = engine_factory(settings)
 SessionLocal = sessionmaker(autoflush=False, bind=engine)
 # Used for testing
 ScopedSessionLocal = scoped_session(SessionLocal)
+# Only created in async mode, since it requires the asyncpg driver.
+async_engine = async_engine_factory(settings) if settings.db_async else None
+AsyncSessionLocal = async_sessionmaker(autoflush=False, bind=async_engine)
+
+# Read replicas, in the order of the ``db_replica_urls`` setting.
+replica_engines = [engine_factory(settings, url) for url in settings.db_replica_urls]
+ReplicaSessionLocals = [sessionmaker(autoflush=False, bind=replica_engine) for replica_engine in replica_engines]
+async_replica_engines = [async_engine_factory(settings, url) for url in settings.db_replica_urls] if settings.db_async else []
+AsyncReplicaSessionLocals = [async_sessionmaker(autoflush=False, bind=replica_engine) for replica_engine in async_replica_engines]
+
+
+def dispose_engines_after_fork() -> None:
+    """In a forked worker, drop the pooled connections inherited from the parent, without closing them for it."""
+    async_engines = [async_engine, *async_replica_engines] if async_engine is not None else []
+    for inherited in [engine, *replica_engines, *(each.sync_engine for each in async_engines)]:
+        inherited.dispose(close=False)
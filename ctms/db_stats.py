@@ -0,0 +1,84 @@
+"""Collect the database statistics of the heartbeat and metrics in the background."""
+
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+from typing import NamedTuple
+
+from sqlalchemy.orm import Session
+
+from ctms.crud import count_total_contacts, get_newsletter_estimates, get_table_estimates, ping
+from ctms.database import SessionLocal
+from ctms.metrics import emit_db_stats_metrics, get_metrics
+from ctms.models import AmoAccount, Email, FirefoxAccount, MozillaFoundationContact, Newsletter, Waitlist
+
+logger = logging.getLogger(__name__)
+
+ESTIMATED_TABLES = [model.__tablename__ for model in (Email, Newsletter, Waitlist, FirefoxAccount, AmoAccount, MozillaFoundationContact)]
+
+
+class DatabaseStats(NamedTuple):
+    """A snapshot of the database statistics."""
+
+    alive: bool
+    contacts: int | None
+    table_estimates: dict[str, int | None]
+    newsletter_estimates: dict[str, int]
+    collected_at: float
+
+
+class DatabaseStatsCollector:
+    """
+    Keep the last snapshot of the database statistics.
+
+    The heartbeat is probed every few seconds by each load balancer. Instead of
+    pinging and querying the catalog on every probe, it serves the snapshot that
+    is refreshed on a fixed interval, and reports it when it gets stale.
+    """
+
+    def __init__(self, timer: Callable[[], float] = time.monotonic):
+        self.timer = timer
+        self.snapshot: DatabaseStats | None = None
+
+    def clear(self) -> None:
+        """Forget the last snapshot."""
+        self.snapshot = None
+
+    def age(self) -> float | None:
+        """Return the age of the last snapshot in seconds, or None if there is none."""
+        snapshot = self.snapshot
+        return None if snapshot is None else self.timer() - snapshot.collected_at
+
+    def collect(self, db: Session) -> DatabaseStats:
+        """Collect the statistics, store them as the last snapshot, and emit them as metrics."""
+        if not ping(db):
+            snapshot = DatabaseStats(False, None, {}, {}, self.timer())
+        else:
+            snapshot = DatabaseStats(
+                alive=True,
+                contacts=count_total_contacts(db),
+                table_estimates=get_table_estimates(db, ESTIMATED_TABLES),
+                newsletter_estimates=get_newsletter_estimates(db),
+                collected_at=self.timer(),
+            )
+            emit_db_stats_metrics(snapshot.contacts, snapshot.table_estimates, snapshot.newsletter_estimates, get_metrics())
+        self.snapshot = snapshot
+        return snapshot
+
+    def collect_in_session(self) -> DatabaseStats:
+        """Collect the statistics in a new database session."""
+        with SessionLocal() as db:
+            return self.collect(db)
+
+    async def run(self, interval: float) -> None:
+        """Collect the statistics every ``interval`` seconds, until cancelled."""
+        while True:
+            try:
+                await asyncio.to_thread(self.collect_in_session)
+            except Exception as exc:
+                logger.exception(exc)
+            await asyncio.sleep(interval)
+
+
+db_stats_collector = DatabaseStatsCollector()
@@ -1,15 +1,20 @@
+import time
 from datetime import timedelta
 from functools import lru_cache
 
 from fastapi import Depends, HTTPException, Request
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from ctms.auth import auth_info_context, get_subject_from_token
+from ctms.auth import auth_info_context, decode_token_subject, token_digest
+from ctms.auth_generation import auth_generation_watcher
+from ctms.cache import api_client_cache, token_cache
 from ctms.config import Settings
-from ctms.crud import get_api_client_by_id, update_api_client_last_access
-from ctms.database import SessionLocal
-from ctms.metrics import oauth2_scheme
-from ctms.schemas import ApiClientSchema
+from ctms.crud import get_api_client_principal
+from ctms.database import AsyncReplicaSessionLocals, AsyncSessionLocal, ReplicaSessionLocals, SessionLocal, run_db
+from ctms.last_access import last_access_tracker
+from ctms.metrics import emit_cache_metrics, emit_read_routing_metrics, get_metrics, oauth2_scheme
+from ctms.replicas import replica_router
+from ctms.schemas import ApiClientPrincipal, ApiClientSchema
 
 
 @lru_cache
@@ -17,7 +22,7 @@ def get_settings() -> Settings:
     return Settings()
 
 
-def get_db():  # pragma: no cover
+def get_sync_db():  # pragma: no cover
     db = SessionLocal()
     try:
         yield db
@@ -25,6 +30,15 @@ def get_db():  # pragma: no cover
         db.close()
 
 
+async def get_async_db():  # pragma: no cover
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Endpoints use ``ctms.database.run_db()`` to work with either kind of session.
+get_db = get_async_db if get_settings().db_async else get_sync_db
+
+
 def get_token_settings(
     settings: Settings = Depends(get_settings),
 ) -> dict[str, str | timedelta]:
@@ -34,18 +48,69 @@ def get_token_settings(
     }
 
 
-def get_api_client(
+def get_token_subject(token: str, secret_key: str) -> tuple[str | None, str | None]:
+    """Get the parts of a valid token subject, decoding each token only once.
+
+    Returns (namespace, identity) if the token is valid
+    Returns (None, None) if the token is expired or invalid, or the payload is invalid.
+    """
+    digest = token_digest(token)
+    subject = token_cache.get(digest)
+    if subject is not None:
+        emit_cache_metrics("token", hits=1, metrics=get_metrics())
+        namespace, name, _ = subject
+        return namespace, name
+
+    subject = decode_token_subject(token, secret_key)
+    if subject is None:
+        return None, None
+    namespace, name, exp = subject
+    # Keep the decoded token until it expires.
+    evictions = token_cache.set(digest, subject, ttl=min(exp - time.time(), token_cache.ttl))
+    emit_cache_metrics("token", misses=1, evictions=evictions, metrics=get_metrics())
+    return namespace, name
+
+
+async def get_current_auth_generation() -> int | None:
+    """
+    Return the auth generation, read in the background by ``ctms.auth_generation``.
+
+    API clients and permissions changed by another process (like ``ctms-cli``)
+    bump it, which invalidates them in the caches of this process. It is None
+    when unknown, and the caches are not used then.
+    """
+    return auth_generation_watcher.current()
+
+
+def load_api_client_principal(client_id: str) -> ApiClientPrincipal | None:
+    with SessionLocal() as db:
+        return get_api_client_principal(db, client_id)
+
+
+async def read_api_client_principal(client_id: str) -> ApiClientPrincipal | None:
+    """
+    Read an API client from the primary, in a session closed before the endpoint runs.
+
+    Endpoints that read from a replica then hold no connection to the primary.
+    """
+    if get_settings().db_async:
+        async with AsyncSessionLocal() as db:
+            return await run_db(db, get_api_client_principal, client_id)
+    return await run_in_threadpool(load_api_client_principal, client_id)
+
+
+async def get_api_client(
     request: Request,
     token: str = Depends(oauth2_scheme),
     token_settings=Depends(get_token_settings),
-    db: Session = Depends(get_db),
-):
+    auth_generation: int | None = Depends(get_current_auth_generation),
+) -> ApiClientPrincipal:
     credentials_exception = HTTPException(
         status_code=401,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    namespace, name = get_subject_from_token(
+    namespace, name = get_token_subject(
         token,
         secret_key=token_settings["secret_key"],
     )
@@ -63,18 +128,24 @@ def get_api_client(
         auth_info["auth_fail"] = "Bad namespace"
         raise credentials_exception
 
-    api_client = get_api_client_by_id(db, name)
-    if not api_client:
-        auth_info["auth_fail"] = "No client record"
-        raise credentials_exception
+    api_client = None if auth_generation is None else api_client_cache.get(name, version=auth_generation)
+    if api_client is not None:
+        emit_cache_metrics("api_client", hits=1, metrics=get_metrics())
+    else:
+        api_client = await read_api_client_principal(name)
+        if not api_client:
+            auth_info["auth_fail"] = "No client record"
+            raise credentials_exception
+        evictions = 0 if auth_generation is None else api_client_cache.set(name, api_client, version=auth_generation)
+        emit_cache_metrics("api_client", misses=1, evictions=evictions, metrics=get_metrics())
 
-    # Track last usage of API client.
-    update_api_client_last_access(db, api_client)
+    # Track last usage of API client, written in batches by a background task.
+    last_access_tracker.touch(name)
 
     return api_client
 
 
-def get_enabled_api_client(request: Request, api_client: ApiClientSchema = Depends(get_api_client)):
+async def get_enabled_api_client(request: Request, api_client: ApiClientSchema = Depends(get_api_client)):
     auth_info = auth_info_context.get()
     auth_info.clear()
     if not auth_info.get("client_id"):
@@ -97,3 +168,32 @@ async def get_json(request: Request) -> dict:
     """
     the_json: dict = await request.json()
     return the_json
+
+
+def read_session_factory(client_id: str | None, primary, replicas):
+    """Return the session factory of the database that serves the reads of the API client."""
+    index, reason = replica_router.choose(client_id)
+    emit_read_routing_metrics("primary" if index is None else "replica", reason, metrics=get_metrics())
+    return primary if index is None else replicas[index]
+
+
+def get_sync_read_db(api_client: ApiClientSchema = Depends(get_enabled_api_client)):  # pragma: no cover
+    db = read_session_factory(api_client.client_id, SessionLocal, ReplicaSessionLocals)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(api_client: ApiClientSchema = Depends(get_enabled_api_client)):  # pragma: no cover
+    async with read_session_factory(api_client.client_id, AsyncSessionLocal, AsyncReplicaSessionLocals)() as db:
+        yield db
+
+
+# Read-only endpoints use the replicas, when configured.
+if not replica_router:
+    get_read_db = get_db
+elif get_settings().db_async:
+    get_read_db = get_async_read_db
+else:
+    get_read_db = get_sync_read_db
@@ -0,0 +1,81 @@
+"""Track API clients usage in memory, and write it to the database in batches."""
+
+import asyncio
+import logging
+import threading
+from datetime import UTC, datetime
+
+from sqlalchemy.orm import Session
+
+from ctms.crud import update_api_clients_last_access
+from ctms.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class LastAccessTracker:
+    """
+    Coalesce the last access time of API clients between flushes.
+
+    Authenticated requests only touch a dictionary in memory. The accumulated
+    times are written with a single UPDATE statement when flushed, so that
+    requests never write (or lock) the ``api_client`` rows.
+    """
+
+    def __init__(self):
+        self._pending: dict[str, datetime] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def touch(self, client_id: str, when: datetime | None = None) -> None:
+        """Record a usage of the API client."""
+        when = when or datetime.now(UTC)
+        with self._lock:
+            previous = self._pending.get(client_id)
+            if previous is None or previous < when:
+                self._pending[client_id] = when
+
+    def clear(self) -> None:
+        """Forget the pending access times, without writing them."""
+        with self._lock:
+            self._pending.clear()
+
+    def flush(self, db: Session) -> int:
+        """Write the pending access times, and return the number of API clients updated."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            update_api_clients_last_access(db, pending)
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Put them back, to retry on the next flush.
+            for client_id, when in pending.items():
+                self.touch(client_id, when)
+            raise
+        return len(pending)
+
+    def flush_in_session(self) -> int:
+        """Flush the pending access times in a new database session."""
+        with SessionLocal() as db:
+            return self.flush(db)
+
+    async def flush_in_thread(self) -> None:
+        """Flush the pending access times without blocking the event loop, logging errors instead of raising them."""
+        try:
+            await asyncio.to_thread(self.flush_in_session)
+        except Exception as exc:
+            logger.exception(exc)
+
+    async def run(self, interval: float) -> None:
+        """Flush the pending access times every ``interval`` seconds, until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush_in_thread()
+
+
+last_access_tracker = LastAccessTracker()
@@ -5,6 +5,7 @@ import sys
 
 from ctms.auth import auth_info_context
 from ctms.config import Settings
+from ctms.database import query_stats_context
 
 settings = Settings()
 
@@ -22,6 +23,19 @@ class AuthInfoLogFilter(logging.Filter):
         return True
 
 
+class QueryStatsLogFilter(logging.Filter):
+    """Logging filter to attach the SQL statements of the request to its summary"""
+
+    def filter(self, record: "logging.LogRecord") -> bool:
+        query_stats = query_stats_context.get()
+        if record.name == "request.summary" and query_stats is not None:
+            record.db_statements = query_stats.statements
+            # In milliseconds, like the request duration ``t``.
+            record.db_time = round(query_stats.duration_s * 1000)
+            record.db_rows = query_stats.rows
+        return True
+
+
 CONFIG = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -32,6 +46,9 @@ CONFIG = {
         "auth_info": {
             "()": "ctms.log.AuthInfoLogFilter",
         },
+        "query_stats": {
+            "()": "ctms.log.QueryStatsLogFilter",
+        },
     },
     "formatters": {
         "mozlog_json": {
@@ -47,7 +64,7 @@ CONFIG = {
         "console": {
             "level": settings.logging_level.name,
             "class": "logging.StreamHandler",
-            "filters": ["request_id", "auth_info"],
+            "filters": ["request_id", "auth_info", "query_stats"],
             "formatter": "mozlog_json" if settings.use_mozlog else "text",
             "stream": sys.stdout,
         },
@@ -1,17 +1,21 @@
 """Prometheus metrics for instrumentation and monitoring."""
 
+import os
+import time
 from itertools import product
 from typing import Any, cast
 
 from fastapi import FastAPI
 from fastapi.security import HTTPBasic
-from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, multiprocess
 from prometheus_client.utils import INF
 from sqlalchemy.orm import Session
-from starlette.routing import Route
+from starlette.routing import Match, Route
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from ctms.auth import OAuth2ClientCredentials
+from ctms.auth import OAuth2ClientCredentials, auth_info_context
 from ctms.crud import get_active_api_client_ids
+from ctms.database import QueryStats
 
 METRICS_PARAMS: dict[str, tuple[type[Counter] | type[Histogram] | type[Gauge], dict]] = {
     "requests": (
@@ -49,11 +53,98 @@ METRICS_PARAMS: dict[str, tuple[type[Counter] | type[Histogram] | type[Gauge], d
             ],
         },
     ),
+    "request_db_statements": (
+        Histogram,
+        {
+            "name": "ctms_request_db_statements",
+            "documentation": "Histogram of the SQL statements executed per request, by path",
+            "labelnames": ["path_template"],
+            "buckets": (0, 1, 2, 3, 5, 10, 20, 50, 100, INF),
+        },
+    ),
+    "request_db_duration": (
+        Histogram,
+        {
+            "name": "ctms_request_db_duration_seconds",
+            "documentation": "Histogram of the time spent executing SQL statements per request, by path (in seconds)",
+            "labelnames": ["path_template"],
+            "buckets": (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, INF),
+        },
+    ),
+    "request_db_rows": (
+        Histogram,
+        {
+            "name": "ctms_request_db_rows",
+            "documentation": "Histogram of the rows returned or affected by SQL statements per request, by path",
+            "labelnames": ["path_template"],
+            "buckets": (0, 1, 10, 100, 1000, 10000, INF),
+        },
+    ),
     "contacts": (
         Gauge,
         {
             "name": "ctms_contacts_total",
             "documentation": "Total count of contacts in the database",
+            "multiprocess_mode": "mostrecent",
+        },
+    ),
+    "table_rows": (
+        Gauge,
+        {
+            "name": "ctms_db_table_rows_estimate",
+            "documentation": "Estimated count of rows in the contact tables, from the database catalog",
+            "labelnames": ["table"],
+            "multiprocess_mode": "mostrecent",
+        },
+    ),
+    "newsletter_subscriptions": (
+        Gauge,
+        {
+            "name": "ctms_newsletter_subscriptions_estimate",
+            "documentation": "Estimated count of subscriptions of the most common newsletters, from the database statistics",
+            "labelnames": ["newsletter"],
+            "multiprocess_mode": "mostrecent",
+        },
+    ),
+    "db_stats_age": (
+        Gauge,
+        {
+            "name": "ctms_db_stats_age_seconds",
+            "documentation": "Age of the last collected database statistics (in seconds), -1 if none were collected",
+            "multiprocess_mode": "mostrecent",
+        },
+    ),
+    "password_verifications_pending": (
+        Gauge,
+        {
+            "name": "ctms_password_verifications_pending",
+            "documentation": "Queue depth of the password verification executor, counting waiting and running verifications",
+            "multiprocess_mode": "livesum",
+        },
+    ),
+    "cache": (
+        Counter,
+        {
+            "name": "ctms_cache_events_total",
+            "documentation": "Total count of in-process cache hits, misses, and evictions by cache name.",
+            "labelnames": ["cache", "event"],
+        },
+    ),
+    "db_read_routing": (
+        Counter,
+        {
+            "name": "ctms_db_read_routing_total",
+            "documentation": "Total count of database sessions for reads, by target (primary or replica) and reason.",
+            "labelnames": ["target", "reason"],
+        },
+    ),
+    "db_replica_lag": (
+        Gauge,
+        {
+            "name": "ctms_db_replica_lag_seconds",
+            "documentation": "Replication lag of the read replicas (in seconds), -1 if it could not be measured",
+            "labelnames": ["replica"],
+            "multiprocess_mode": "mostrecent",
         },
     ),
 }
@@ -73,6 +164,38 @@ def get_metrics_registry() -> CollectorRegistry:
     return METRICS_REGISTRY
 
 
+def multiprocess_enabled() -> bool:
+    """Return whether the metrics are shared by several worker processes.
+
+    prometheus_client then writes the values in files of the directory named by
+    ``PROMETHEUS_MULTIPROC_DIR``, which must be set before any worker starts.
+    """
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def get_exposition_registry() -> CollectorRegistry:
+    """Return the registry to serve on /metrics, aggregating all the workers in multiprocess mode."""
+    if not multiprocess_enabled():
+        return get_metrics_registry()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def prepare_multiprocess_dir(path: str) -> None:
+    """Empty the metrics directory of a previous run, before starting the workers."""
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+
+
+def mark_process_dead(pid: int | None = None) -> None:
+    """Remove the live gauges of a stopped worker from the aggregated metrics."""
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
 def get_metrics() -> Any:
     return METRICS
 
@@ -81,22 +204,49 @@ oauth2_scheme = OAuth2ClientCredentials(tokenUrl="token")
 token_scheme = HTTPBasic(auto_error=False)
 
 
-def init_metrics(registry: CollectorRegistry) -> dict[str, Counter | Histogram | Gauge]:
+class LabelChildren(dict):
+    """
+    The children of a labelled metric, by the tuple of their label values.
+
+    Each child is bound with ``labels()`` on first use, and then found with a
+    single dictionary lookup, without the validation and locking of ``labels()``.
+    """
+
+    def __init__(self, metric: Counter | Histogram | Gauge):
+        super().__init__()
+        self.metric = metric
+
+    def __missing__(self, values: tuple) -> Any:
+        child = self[values] = self.metric.labels(*values)
+        return child
+
+    def bind(self, *values: Any) -> Any:
+        """Return the child for the label values, binding it if needed."""
+        return self[values]
+
+
+# The metrics emitted for every response, with their children bound in advance.
+RESPONSE_METRICS = ("requests", "requests_duration", "api_requests", "request_db_statements", "request_db_duration", "request_db_rows")
+
+
+def init_metrics(registry: CollectorRegistry) -> dict[str, Any]:
     """Initialize the metrics with the registry."""
-    metrics = {}
+    metrics: dict[str, Any] = {}
     for name, init_bits in METRICS_PARAMS.items():
         metric_type, params = init_bits
         metrics[name] = metric_type(registry=registry, **params)
+    for name in RESPONSE_METRICS:
+        metrics[f"{name}_children"] = LabelChildren(metrics[name])
     return metrics
 
 
-def init_metrics_labels(dbsession: Session, app: FastAPI, metrics: dict[str, Counter | Histogram]) -> None:
+def init_metrics_labels(dbsession: Session, app: FastAPI, metrics: dict[str, Any]) -> None:
     """Create the initial metric combinations."""
     openapi = app.openapi()
     client_ids = get_active_api_client_ids(dbsession) or ["none"]
-    request_metric = metrics["requests"]
-    timing_metric = metrics["requests_duration"]
-    api_request_metric = metrics["api_requests"]
+    request_children = metrics["requests_children"]
+    timing_children = metrics["requests_duration_children"]
+    api_request_children = metrics["api_requests_children"]
     for route in app.routes:
         assert isinstance(route, Route)
         route = cast(Route, route)  # Route defines.methods and .path_format
@@ -120,15 +270,15 @@ def init_metrics_labels(dbsession: Session, app: FastAPI, metrics: dict[str, Cou
         for combo in product(methods, status_codes):
             method, status_code = combo
             status_code_family = str(status_code)[0] + "xx"
-            request_metric.labels(method, path, status_code, status_code_family)
+            request_children.bind(method, path, status_code, status_code_family)
         for time_combo in product(methods, status_code_families):
             method, status_code_family = time_combo
-            timing_metric.labels(method, path, status_code_family)
+            timing_children.bind(method, path, status_code_family)
         if is_api:
             for api_combo in product(methods, status_code_families):
                 method, status_code_family = api_combo
                 for client_id in client_ids:
-                    api_request_metric.labels(method, path, client_id, status_code_family)
+                    api_request_children.bind(method, path, client_id, status_code_family)
 
 
 def emit_response_metrics(
@@ -137,7 +287,7 @@ def emit_response_metrics(
     duration_s: float,
     status_code: int,
     client_id: str | None,
-    metrics: dict[str, Counter | Histogram],
+    metrics: dict[str, Any],
 ) -> None:
     """Emit metrics for a response."""
     if not metrics:
@@ -150,26 +300,152 @@ def emit_response_metrics(
 
     status_code_family = str(status_code)[0] + "xx"
 
-    counter = cast(Counter, metrics["requests"])
-    counter.labels(
-        method=method,
-        path_template=path_template,
-        status_code=status_code,
-        status_code_family=status_code_family,
-    ).inc()
-
-    histogram = cast(Histogram, metrics["requests_duration"])
-    histogram.labels(
-        method=method,
-        path_template=path_template,
-        status_code_family=status_code_family,
-    ).observe(duration_s)
-
+    metrics["requests_children"][(method, path_template, status_code, status_code_family)].inc()
+    metrics["requests_duration_children"][(method, path_template, status_code_family)].observe(duration_s)
     if client_id:
-        counter = cast(Counter, metrics["api_requests"])
-        counter.labels(
-            method=method,
-            path_template=path_template,
-            client_id=client_id,
-            status_code_family=status_code_family,
-        ).inc()
+        metrics["api_requests_children"][(method, path_template, client_id, status_code_family)].inc()
+
+
+def emit_query_metrics(path_template: str | None, query_stats: QueryStats, metrics: dict[str, Any]) -> None:
+    """Emit metrics for the SQL statements executed by a request."""
+    if not metrics or not path_template:
+        return
+
+    key = (path_template,)
+    metrics["request_db_statements_children"][key].observe(query_stats.statements)
+    metrics["request_db_duration_children"][key].observe(query_stats.duration_s)
+    metrics["request_db_rows_children"][key].observe(query_stats.rows)
+
+
+class MetricsMiddleware:
+    """
+    Emit the response metrics of HTTP requests.
+
+    This is a pure ASGI middleware: unlike ``@app.middleware("http")``, it does
+    not run the application in a separate task nor wrap the response body in a
+    stream. The path template is read from the route that the router matched,
+    instead of matching every route again.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._static_paths: dict[tuple[str, str], str] | None = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start_time = time.monotonic()
+        with QueryStats(scope) as query_stats:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                duration_s = round(time.monotonic() - start_time, 3)
+                path_template = self.path_template(scope)
+                metrics = get_metrics()
+                emit_response_metrics(
+                    path_template=path_template,
+                    method=scope["method"],
+                    duration_s=duration_s,
+                    status_code=status_code,
+                    client_id=auth_info_context.get().get("client_id"),
+                    metrics=metrics,
+                )
+                emit_query_metrics(path_template, query_stats, metrics)
+
+    def path_template(self, scope: Scope) -> str | None:
+        """Return the path template of the route that handled the request, like "/ctms/{email_id}"."""
+        method = scope["method"]
+        # The FastAPI routes store themselves in the scope when they match.
+        route = scope.get("route")
+        if route is not None and method in route.methods:
+            return route.path_format
+        # The other routes (like the docs) have no parameters: find them by path.
+        if self._static_paths is None:
+            self._static_paths = {
+                (route_method, route.path_format): route.path_format
+                for route in scope["app"].routes
+                if isinstance(route, Route) and not route.param_convertors
+                for route_method in route.methods or ()
+            }
+        path_template = self._static_paths.get((method, scope["path"]))
+        if path_template is None and route is None:
+            # Not matched by the router (like a 404), or under a root path.
+            for candidate in scope["app"].routes:
+                match, _ = candidate.matches(scope)
+                if match == Match.FULL:
+                    return str(candidate.path)
+        return path_template
+
+
+def emit_cache_metrics(
+    cache: str,
+    metrics: dict[str, Counter | Histogram] | None,
+    hits: int = 0,
+    misses: int = 0,
+    evictions: int = 0,
+) -> None:
+    """Emit metrics for lookups in an in-process cache."""
+    if not metrics:
+        return
+
+    counter = cast(Counter, metrics["cache"])
+    for event, count in (("hit", hits), ("miss", misses), ("eviction", evictions)):
+        if count:
+            counter.labels(cache=cache, event=event).inc(count)
+
+
+def emit_read_routing_metrics(target: str, reason: str, metrics: dict[str, Counter | Histogram] | None) -> None:
+    """Emit metrics for the choice of the database that serves reads."""
+    if not metrics:
+        return
+
+    counter = cast(Counter, metrics["db_read_routing"])
+    counter.labels(target=target, reason=reason).inc()
+
+
+def emit_replica_lag_metrics(lags: dict[str, float | None], metrics: dict[str, Counter | Histogram | Gauge] | None) -> None:
+    """Emit the last measured lag of each read replica."""
+    if not metrics:
+        return
+
+    gauge = cast(Gauge, metrics["db_replica_lag"])
+    for replica, lag in lags.items():
+        gauge.labels(replica=replica).set(-1 if lag is None else lag)
+
+
+def emit_db_stats_metrics(
+    contacts: int,
+    table_estimates: dict[str, int | None],
+    newsletter_estimates: dict[str, int],
+    metrics: dict[str, Counter | Histogram | Gauge] | None,
+) -> None:
+    """Emit the database statistics collected in the background."""
+    if not metrics:
+        return
+
+    cast(Gauge, metrics["contacts"]).set(contacts)
+    table_gauge = cast(Gauge, metrics["table_rows"])
+    for table, estimate in table_estimates.items():
+        if estimate is not None:
+            table_gauge.labels(table=table).set(estimate)
+    newsletter_gauge = cast(Gauge, metrics["newsletter_subscriptions"])
+    for newsletter, estimate in newsletter_estimates.items():
+        newsletter_gauge.labels(newsletter=newsletter).set(estimate)
+
+
+def emit_db_stats_age(age: float | None, metrics: dict[str, Counter | Histogram | Gauge] | None) -> None:
+    """Emit the age of the last database statistics, when they are scraped."""
+    if not metrics:
+        return
+
+    cast(Gauge, metrics["db_stats_age"]).set(-1 if age is None else age)
@@ -1,9 +1,11 @@
+from datetime import datetime
 from uuid import UUID as UUID4
 
 from sqlalchemy import (
     JSON,
     TIMESTAMP,
     UUID,
+    BigInteger,
     Boolean,
     Date,
     DateTime,
@@ -12,6 +14,7 @@ from sqlalchemy import (
     Integer,
     String,
     Text,
+    TypeDecorator,
     UniqueConstraint,
 )
 from sqlalchemy.ext.declarative import declared_attr
@@ -24,6 +27,36 @@ class Base(DeclarativeBase):
     pass
 
 
+class UUIDString(TypeDecorator):
+    """
+    A UUID stored as a string.
+
+    UUID objects are converted when bound, since asyncpg (unlike psycopg2)
+    only accepts strings for text columns.
+    """
+
+    impl = String
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else str(value)
+
+
+class Timestamp(TypeDecorator):
+    """
+    A timestamp with time zone.
+
+    Schemas dump timestamps as ISO 8601 strings, which are converted when bound,
+    since asyncpg (unlike psycopg2) only accepts datetimes for timestamp columns.
+    """
+
+    impl = TIMESTAMP(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
 class CaseInsensitiveComparator(Comparator):
     def __eq__(self, other):
         return func.lower(self.__clause_element__()) == func.lower(other)
@@ -33,7 +66,7 @@ class TimestampMixin:
     @declared_attr
     def create_timestamp(cls):
         return mapped_column(
-            TIMESTAMP(timezone=True),
+            Timestamp,
             nullable=False,
             server_default=func.now(),
         )
@@ -41,7 +74,7 @@ class TimestampMixin:
     @declared_attr
     def update_timestamp(cls):
         return mapped_column(
-            TIMESTAMP(timezone=True),
+            Timestamp,
             nullable=False,
             server_default=func.now(),
             # server_onupdate would be nice to use here, but it's not supported
@@ -56,7 +89,7 @@ class Email(Base, TimestampMixin):
 
     email_id = mapped_column(UUID, primary_key=True, server_default="uuid_generate_v4()")
     primary_email = mapped_column(String(255), unique=True, nullable=False)
-    basket_token = mapped_column(String(255), unique=True)
+    basket_token = mapped_column(UUIDString(255), unique=True)
     sfdc_id = mapped_column(String(255), index=True)
     first_name = mapped_column(String(255))
     last_name = mapped_column(String(255))
@@ -95,6 +128,7 @@ class Email(Base, TimestampMixin):
 
 class Newsletter(Base, TimestampMixin):
     __tablename__ = "newsletters"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = mapped_column(Integer, primary_key=True)
     email_id: Mapped[UUID4] = mapped_column(UUID(as_uuid=True), ForeignKey(Email.email_id), nullable=False)
@@ -112,6 +146,7 @@ class Newsletter(Base, TimestampMixin):
 
 class Waitlist(Base, TimestampMixin):
     __tablename__ = "waitlists"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = mapped_column(Integer, primary_key=True)
     email_id: Mapped[UUID4] = mapped_column(UUID(as_uuid=True), ForeignKey(Email.email_id), nullable=False)
@@ -128,6 +163,7 @@ class Waitlist(Base, TimestampMixin):
 
 class FirefoxAccount(Base, TimestampMixin):
     __tablename__ = "fxa"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = mapped_column(Integer, primary_key=True)
     fxa_id = mapped_column(String(255), unique=True)
@@ -157,6 +193,7 @@ class FirefoxAccount(Base, TimestampMixin):
 
 class AmoAccount(Base, TimestampMixin):
     __tablename__ = "amo"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = mapped_column(Integer, primary_key=True)
     email_id = mapped_column(UUID(as_uuid=True), ForeignKey(Email.email_id), unique=True, nullable=False)
@@ -191,6 +228,7 @@ class ApiClient(Base, TimestampMixin):
 
 class MozillaFoundationContact(Base, TimestampMixin):
     __tablename__ = "mofo"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = mapped_column(Integer, primary_key=True)
     email_id = mapped_column(UUID(as_uuid=True), ForeignKey(Email.email_id), unique=True, nullable=False)
@@ -249,3 +287,18 @@ class ApiClientRoles(Base):
     # Relationships
     api_client = relationship("ApiClient", back_populates="roles")
     role = relationship("Roles", back_populates="api_clients")
+
+
+class AuthGeneration(Base):
+    """
+    A counter bumped by the database whenever API clients, roles or permissions change.
+
+    It has a single row. The API processes read it on each request, to discard
+    their cached API clients and permissions when it changed, whichever process
+    (like ``ctms-cli``) made the change.
+    """
+
+    __tablename__ = "auth_generation"
+
+    id = mapped_column(Integer, primary_key=True)
+    generation = mapped_column(BigInteger, nullable=False, server_default="0")
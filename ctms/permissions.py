@@ -1,16 +1,93 @@
-from typing import Annotated
+from collections.abc import Iterable
+from typing import Annotated, NamedTuple
 
 from fastapi import Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy.sql import exists
 
-from ctms.dependencies import get_db, get_enabled_api_client
+from ctms.cache import permissions_cache
+from ctms.crud import get_auth_generation
+from ctms.database import run_db
+from ctms.dependencies import get_current_auth_generation, get_db, get_enabled_api_client
+from ctms.metrics import emit_cache_metrics, get_metrics
 from ctms.models import ApiClientRoles, Permissions, RolePermissions, Roles
 from ctms.schemas import ApiClientSchema
 
 ADMIN_ROLE_NAME = "admin"  # Define the admin role name globally
 
 
+class ClientPermissions(NamedTuple):
+    """The effective permissions of an api_client, through all its roles."""
+
+    permissions: frozenset[str]
+    is_admin: bool
+
+    def allows_any(self, permission_names: Iterable[str]) -> bool:
+        """Return True if at least one of the permissions is granted, or if admin."""
+        return self.is_admin or not self.permissions.isdisjoint(permission_names)
+
+
+def get_client_permissions(db: Session, api_client_id: str) -> ClientPermissions:
+    """
+    Load the roles and permissions of an api_client, in a single query.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        api_client_id (str): The client_id of the api_client.
+
+    Returns:
+        ClientPermissions: The permission names and whether the api_client is an admin.
+    """
+    rows = db.execute(
+        select(Roles.name, Permissions.name)
+        .select_from(ApiClientRoles)
+        .join(Roles, Roles.id == ApiClientRoles.role_id)
+        .outerjoin(RolePermissions, RolePermissions.role_id == Roles.id)
+        .outerjoin(Permissions, Permissions.id == RolePermissions.permission_id)
+        .where(ApiClientRoles.api_client_id == api_client_id)
+    ).all()
+    return ClientPermissions(
+        permissions=frozenset(permission for _, permission in rows if permission is not None),
+        is_admin=any(role == ADMIN_ROLE_NAME for role, _ in rows),
+    )
+
+
+def get_permissions_from_cache(api_client_id: str, auth_generation: int | None) -> ClientPermissions | None:
+    """Return the cached permissions of an api_client for this auth generation, or None if unknown."""
+    if auth_generation is None:
+        return None
+    client_permissions = permissions_cache.get(api_client_id, version=auth_generation)
+    if client_permissions is not None:
+        emit_cache_metrics("permissions", hits=1, metrics=get_metrics())
+    return client_permissions
+
+
+def load_client_permissions(db: Session, api_client_id: str, auth_generation: int | None) -> ClientPermissions:
+    """Load the permissions of an api_client, and cache them for this auth generation, if known."""
+    client_permissions = get_client_permissions(db, api_client_id)
+    evictions = 0 if auth_generation is None else permissions_cache.set(api_client_id, client_permissions, version=auth_generation)
+    emit_cache_metrics("permissions", misses=1, evictions=evictions, metrics=get_metrics())
+    return client_permissions
+
+
+def get_cached_client_permissions(db: Session, api_client_id: str) -> ClientPermissions:
+    """
+    Return the permissions of an api_client, from the cache when possible.
+
+    Cached permissions are only used at the auth generation they were read at
+    (see ``ctms.crud.get_auth_generation()``), which the database bumps when
+    roles or permissions are changed by any process. Entries expire after
+    ``CTMS_API_CLIENT_CACHE_TTL_IN_SECONDS`` otherwise.
+    """
+    # Read the generation first, so that a concurrent change discards this entry.
+    auth_generation = get_auth_generation(db)
+    client_permissions = get_permissions_from_cache(api_client_id, auth_generation)
+    if client_permissions is None:
+        client_permissions = load_client_permissions(db, api_client_id, auth_generation)
+    return client_permissions
+
+
 def has_permission(db: Session, api_client_id: str, permission_name: str) -> bool:
     """
     Check if an api_client has a specific permission.
@@ -23,14 +100,7 @@ def has_permission(db: Session, api_client_id: str, permission_name: str) -> boo
     Returns:
         bool: True if the api_client has the specified permission, False otherwise.
     """
-    perm = db.query(
-        exists()
-        .where(Permissions.name == permission_name)
-        .where(Permissions.id == RolePermissions.permission_id)
-        .where(RolePermissions.role_id == ApiClientRoles.role_id)
-        .where(ApiClientRoles.api_client_id == api_client_id)
-    ).scalar()
-    return bool(perm)
+    return permission_name in get_cached_client_permissions(db, api_client_id).permissions
 
 
 def has_any_permission(db: Session, api_client_id: str, permission_names: list[str]) -> bool:
@@ -46,27 +116,7 @@ def has_any_permission(db: Session, api_client_id: str, permission_names: list[s
         bool: True if the api_client has at least one of the specified permissions or is an admin.
 
     """
-    # First, check if the api_client has the admin role, which has all permissions.
-    is_admin = db.query(
-        exists()
-        .where(Roles.name == ADMIN_ROLE_NAME)
-        .where(Roles.id == ApiClientRoles.role_id)
-        .where(ApiClientRoles.api_client_id == api_client_id)
-    ).scalar()  # fmt: skip
-
-    if is_admin:
-        return True
-
-    # Check if the user has at least one of the requested permissions
-    has_perm = db.query(
-        exists()
-        .where(Permissions.name.in_(permission_names))
-        .where(Permissions.id == RolePermissions.permission_id)
-        .where(RolePermissions.role_id == ApiClientRoles.role_id)
-        .where(ApiClientRoles.api_client_id == api_client_id)
-    ).scalar()
-
-    return bool(has_perm)
+    return get_cached_client_permissions(db, api_client_id).allows_any(permission_names)
 
 
 def with_permission(*permission_names: str):
@@ -81,11 +131,16 @@ def with_permission(*permission_names: str):
         FastAPI dependency function.
     """
 
-    def dependency(
-        db: Annotated[Session, Depends(get_db)],
+    async def dependency(
+        db: Annotated[Session | AsyncSession, Depends(get_db)],
         api_client: Annotated[ApiClientSchema, Depends(get_enabled_api_client)],
+        auth_generation: Annotated[int | None, Depends(get_current_auth_generation)],
     ):
-        if not has_any_permission(db, api_client.client_id, list(permission_names)):
+        # Only use the threadpool to load the permissions on a cache miss.
+        client_permissions = get_permissions_from_cache(api_client.client_id, auth_generation)
+        if client_permissions is None:
+            client_permissions = await run_db(db, load_client_permissions, api_client.client_id, auth_generation)
+        if not client_permissions.allows_any(permission_names):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Permission(s) required: {', '.join(permission_names)}",
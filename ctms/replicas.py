@@ -0,0 +1,113 @@
+"""Route reads to the database replicas, unless they lag or the client just wrote."""
+
+import asyncio
+import itertools
+import logging
+import mmap
+import time
+import zlib
+from collections.abc import Callable
+
+from sqlalchemy import make_url
+from sqlalchemy.orm import sessionmaker
+
+from ctms.config import Settings
+from ctms.crud import get_replication_lag
+from ctms.database import ReplicaSessionLocals
+from ctms.metrics import emit_replica_lag_metrics, get_metrics
+
+logger = logging.getLogger(__name__)
+
+settings = Settings()
+
+
+class ReplicaRouter:
+    """
+    Choose the database that serves the reads of an API client.
+
+    Reads go to a replica whose last measured lag is under ``max_lag``, in
+    turns. They go to the primary when all replicas lag (or could not be
+    measured yet), and for ``read_your_writes`` seconds after the client wrote,
+    so that it reads its own writes.
+
+    The time of the last write of each client is kept in memory shared with the
+    workers forked after the router is created (see ``ctms.workers``), in one of
+    ``write_slots`` slots by hash of its client_id. Clients that share a slot
+    read from the primary after each other's writes, which is only slower.
+    Writes served by other servers are not known.
+    """
+
+    def __init__(
+        self,
+        replicas: list[tuple[str, sessionmaker]],
+        max_lag: float,
+        read_your_writes: float,
+        timer: Callable[[], float] = time.monotonic,
+        write_slots: int = 4096,
+    ):
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.read_your_writes = read_your_writes
+        # The monotonic clock is shared by all processes.
+        self.timer = timer
+        self.lags: list[float | None] = [None] * len(replicas)
+        self._shared = mmap.mmap(-1, write_slots * 8)
+        self._last_writes = memoryview(self._shared).cast("d")
+        self._turns = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def _slot(self, client_id: str) -> int:
+        return zlib.crc32(client_id.encode()) % len(self._last_writes)
+
+    def record_write(self, client_id: str) -> None:
+        """Record that the API client wrote, to read from the primary for a while, in all workers."""
+        self._last_writes[self._slot(client_id)] = self.timer()
+
+    def clear(self) -> None:
+        """Forget the recorded writes."""
+        self._shared[:] = bytes(len(self._shared))
+
+    def choose(self, client_id: str | None) -> tuple[int | None, str]:
+        """Return the index of the replica to read from, or None for the primary, and the reason."""
+        if client_id is not None:
+            last_write = self._last_writes[self._slot(client_id)]
+            # Slots without writes are zero.
+            if last_write and self.timer() - last_write < self.read_your_writes:
+                return None, "recent_write"
+        available = [index for index, lag in enumerate(self.lags) if lag is not None and lag <= self.max_lag]
+        if not available:
+            return None, "lag"
+        return available[next(self._turns) % len(available)], "replica"
+
+    def measure_lags(self) -> dict[str, float | None]:
+        """Measure the lag of each replica, None if it is unreachable, and return them by name."""
+        for index, (_, session_factory) in enumerate(self.replicas):
+            try:
+                with session_factory() as db:
+                    self.lags[index] = get_replication_lag(db)
+            except Exception as exc:
+                logger.exception(exc)
+                self.lags[index] = None
+        return {name: lag for (name, _), lag in zip(self.replicas, self.lags, strict=True)}
+
+    async def run(self, interval: float) -> None:
+        """Measure the lag of the replicas every ``interval`` seconds, until cancelled."""
+        while True:
+            lags = await asyncio.to_thread(self.measure_lags)
+            emit_replica_lag_metrics(lags, get_metrics())
+            await asyncio.sleep(interval)
+
+
+def replica_name(url: str) -> str:
+    """Return a name for a replica, without credentials."""
+    parsed = make_url(url)
+    return f"{parsed.host}:{parsed.port or 5432}/{parsed.database}"
+
+
+replica_router = ReplicaRouter(
+    replicas=[(replica_name(url), session_factory) for url, session_factory in zip(settings.db_replica_urls, ReplicaSessionLocals, strict=True)],
+    max_lag=settings.db_replica_max_lag_in_seconds,
+    read_your_writes=settings.db_replica_read_your_writes_in_seconds,
+)
@@ -1,42 +1,81 @@
+import hashlib
 import json
+from collections.abc import AsyncIterator, Iterable, Iterator
 from datetime import datetime
 from typing import Annotated, Literal
+from urllib.parse import urlencode
 from uuid import UUID, uuid4
 
-from fastapi import APIRouter, Depends, HTTPException, Path, Request, Response
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import ValidationError
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from starlette import status
 
+from ctms.cache import CachedContact, contact_cache
 from ctms.crud import (
-    create_contact,
+    ContactBatch,
+    aiter_bulk_contacts,
+    create_contact_if_absent,
     create_or_update_contact,
     delete_contact,
-    get_bulk_contacts,
+    get_all_contacts_from_ids,
+    get_bulk_emails,
     get_contact_by_email_id,
+    get_contact_versions,
+    get_contact_versions_by_any_id,
     get_contacts_by_any_id,
     get_email,
+    get_emails_by_any_id,
+    iter_bulk_contacts,
+    lock_email,
+    lock_emails,
+    lookup_email_ids,
     update_contact,
 )
-from ctms.dependencies import get_db, get_enabled_api_client, get_json, get_settings
-from ctms.metrics import get_metrics
+from ctms.database import AsyncReplicaSessionLocals, AsyncSessionLocal, ReplicaSessionLocals, SessionLocal, run_db
+from ctms.dependencies import get_db, get_enabled_api_client, get_json, get_read_db, get_settings, read_session_factory
+from ctms.metrics import emit_cache_metrics, get_metrics
 from ctms.models import Email
+from ctms.replicas import replica_router
 from ctms.schemas import (
     ApiClientSchema,
     BadRequestResponse,
     BulkRequestSchema,
+    ContactBatchCreate,
+    ContactBatchPatch,
+    ContactBatchPut,
+    ContactBatchSchema,
+    ContactFieldset,
     ContactInSchema,
+    ContactLookupSchema,
     ContactPatchSchema,
     ContactPutSchema,
     ContactSchema,
+    CTMSBatchItemResponse,
+    CTMSBatchResponse,
+    CTMSBulkCursor,
     CTMSBulkResponse,
+    CTMSLookupResponse,
     CTMSResponse,
     CTMSSingleResponse,
     IdentityResponse,
     NotFoundResponse,
     UnauthorizedResponse,
 )
+from ctms.schemas.contact import (
+    sparse_bulk_response_schema,
+    sparse_response_list_adapter,
+    sparse_single_response_schema,
+)
+from ctms.serializers import (
+    bulk_response_json,
+    contact_json,
+    contacts_from_contact_json,
+    single_response_from_contact_json,
+)
 
 router = APIRouter()
 
@@ -80,6 +119,157 @@ def all_ids(
     }
 
 
+def contact_fieldset(
+    fields: Annotated[
+        str | None,
+        Query(description="Comma-separated email fields to return. The `email_id` and `update_timestamp` are always returned."),
+    ] = None,
+    include: Annotated[
+        str | None,
+        Query(description="Comma-separated related data to return, among amo, fxa, mofo, newsletters and waitlists. Empty for none."),
+    ] = None,
+) -> ContactFieldset | None:
+    """Sparse fieldset, injected as a dependency."""
+    try:
+        return ContactFieldset.from_query(fields, include)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+
+
+def json_response(content: str | bytes, etag: str | None = None) -> Response:
+    """Return JSON that is already serialized, bypassing the ``response_model`` of the endpoint."""
+    headers = {"ETag": etag} if etag else None
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def contact_etag(versions: Iterable[tuple]) -> str:
+    """
+    Return a strong ETag for contacts, given their versions.
+
+    The versions are ``(email_id, last update, number of rows)`` tuples, as
+    returned by ``get_contact_versions()`` or ``email_version()``. The ETag
+    does not depend on the fieldset, so that any of them can be sent in
+    ``If-Match``.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for email_id, last_update, count in sorted(versions, key=lambda version: str(version[0])):
+        digest.update(f"{email_id},{last_update.isoformat()},{count};".encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def email_version(email: Email) -> tuple:
+    """Return the version of a contact loaded with all its related data, like ``get_contact_versions()``."""
+    rows = [row for row in (email, email.amo, email.fxa, email.mofo, *email.newsletters, *email.waitlists) if row is not None]
+    return email.email_id, max(row.update_timestamp for row in rows), len(rows)
+
+
+def etag_matches(header: str | None, etag: str, weak: bool = True, exists: bool = True) -> bool:
+    """
+    Tell if an ``If-None-Match`` or ``If-Match`` header lists the ETag.
+
+    ``If-None-Match`` uses the weak comparison, ``If-Match`` the strong one.
+    ``*`` only matches a representation that ``exists``, unlike an empty list
+    of contacts.
+    """
+    if header is None:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    if weak:
+        tags = [tag.removeprefix("W/") for tag in tags]
+    return ("*" in tags and exists) or etag in tags
+
+
+def check_if_match_or_412(db: Session, email_id: UUID, if_match: str | None) -> None:
+    """Lock the contact, and raise a 412 exception unless it is the version of the ``If-Match`` ETag."""
+    if if_match is None:
+        return
+    # Hold the lock until the write is committed, so that the contact cannot change in between.
+    lock_email(db, email_id)
+    versions = get_contact_versions(db, [email_id])
+    if not versions or not etag_matches(if_match, contact_etag(versions), weak=False):
+        raise HTTPException(status_code=412, detail="Contact does not match If-Match")
+
+
+# The identifiers that match at most one contact, under which contacts are cached.
+CACHED_IDS = ("email_id", "primary_email", "basket_token", "fxa_id", "mofo_email_id")
+
+
+def contact_identifiers(email: Email) -> dict[str, str]:
+    """Return the unique alternate IDs of a contact, like they are looked up in the contact cache."""
+    identifiers = {"primary_email": email.primary_email.lower()}
+    if email.basket_token:
+        identifiers["basket_token"] = str(email.basket_token)
+    if email.fxa and email.fxa.fxa_id:
+        identifiers["fxa_id"] = email.fxa.fxa_id
+    if email.mofo and email.mofo.mofo_email_id:
+        identifiers["mofo_email_id"] = email.mofo.mofo_email_id
+    return identifiers
+
+
+def cache_contact(email: Email) -> CachedContact:
+    """Serialize a contact loaded with all its related data, and add it to the contact cache."""
+    contact = CachedContact(
+        email_id=str(email.email_id),
+        content=contact_json(email),
+        etag=contact_etag([email_version(email)]),
+        identifiers=contact_identifiers(email),
+    )
+    evictions = contact_cache.add(contact)
+    if evictions:
+        emit_cache_metrics("contact", evictions=evictions, metrics=get_metrics())
+    return contact
+
+
+def get_cached_contact(kind: str, value) -> CachedContact | None:
+    """Return the cached contact with this unique identifier, or None."""
+    if not contact_cache.enabled:
+        return None
+    value = value.lower() if kind == "primary_email" else str(value)
+    contact = contact_cache.get(value) if kind == "email_id" else contact_cache.get_by_alternate_id(kind, value)
+    if contact is None:
+        emit_cache_metrics("contact", misses=1, metrics=get_metrics())
+    else:
+        emit_cache_metrics("contact", hits=1, metrics=get_metrics())
+    return contact
+
+
+def get_sparse_response_or_404(db: Session, email_id: UUID, fieldset: ContactFieldset, if_none_match: str | None = None) -> Response:
+    """
+    Get the requested parts of a contact by email_ID, or raise a 404 exception.
+
+    Like ``get_ctms_response_or_404()``, only the version of the contact is
+    read if it is still at the version of the ``If-None-Match`` ETag.
+    Otherwise, the ETag is computed from the loaded rows.
+    """
+    if if_none_match is not None:
+        versions = get_contact_versions(db, [email_id])
+        etag = contact_etag(versions)
+        if versions and etag_matches(if_none_match, etag):
+            return not_modified_response(etag)
+    email = get_email(db, email_id, fieldset, versioned=True)
+    if email is None:
+        raise HTTPException(status_code=404, detail="Unknown email_id")
+    etag = contact_etag([email_version(email)])
+    return json_response(sparse_single_response_schema(fieldset).model_validate(email).model_dump_json(), etag=etag)
+
+
+def get_sparse_responses_by_any_id(db: Session, fieldset: ContactFieldset, if_none_match: str | None = None, **ids) -> Response:
+    """Get the requested parts of all contacts matching alternate IDs, unless they did not change since the ``If-None-Match`` ETag."""
+    if if_none_match is not None:
+        versions = get_contact_versions_by_any_id(db, **ids)
+        etag = contact_etag(versions)
+        if etag_matches(if_none_match, etag, exists=bool(versions)):
+            return not_modified_response(etag)
+    adapter = sparse_response_list_adapter(fieldset)
+    emails = get_emails_by_any_id(db, fieldset=fieldset, versioned=True, **ids)
+    etag = contact_etag(email_version(email) for email in emails)
+    return json_response(adapter.dump_json(adapter.validate_python(emails)), etag=etag)
+
+
 def get_bulk_contacts_by_timestamp_or_4xx(
     db: Session,
     start_time: datetime,
@@ -87,8 +277,9 @@ def get_bulk_contacts_by_timestamp_or_4xx(
     limit: int = 10,
     after: str = None,
     mofo_relevant: bool = None,
-) -> CTMSBulkResponse:
-    """Get bulk contacts by time range."""
+    fieldset: ContactFieldset | None = None,
+) -> CTMSBulkResponse | Response:
+    """Get bulk contacts by time range, or only the parts of the fieldset."""
     after_email_id = None
     after_start_time = start_time
     if after is not None:
@@ -97,65 +288,146 @@ def get_bulk_contacts_by_timestamp_or_4xx(
             after_start_time,
         ) = BulkRequestSchema.extractor_for_bulk_encoded_details(after)
 
-    results = get_bulk_contacts(
+    emails = get_bulk_emails(
         db=db,
         start_time=after_start_time,
         end_time=end_time,
         limit=limit,
         after_email_id=after_email_id,
         mofo_relevant=mofo_relevant,
+        fieldset=fieldset,
     )
-    page_length = len(results)
+    page_length = len(emails)
     last_page = page_length < limit
-    if page_length > 0:
-        results = [CTMSResponse(**contact.model_dump()) for contact in results]
 
     if last_page:
         # No results/end
         after_encoded = None
         next_url = None
     else:
-        last_result: CTMSResponse = results[-1]
+        last_email = emails[-1]
         after_encoded = BulkRequestSchema.compressor_for_bulk_encoded_details(
-            last_email_id=last_result.email.email_id,
-            last_update_time=last_result.email.update_timestamp,
+            last_email_id=last_email.email_id,
+            last_update_time=last_email.update_timestamp,
         )
 
         next_url = (
             f"{get_settings().server_prefix}/updates?start={start_time.isoformat()}&end={end_time.isoformat()}&limit={limit}&after={after_encoded} "
         )
+        if fieldset is not None:
+            next_url = next_url.rstrip() + f"&{urlencode(fieldset.as_query())} "
 
-    return CTMSBulkResponse(
-        start=start_time,
-        end=end_time,
-        after=after_encoded,
-        limit=limit,
-        items=results,
-        next=next_url,
+    if fieldset is not None:
+        response = sparse_bulk_response_schema(fieldset)(
+            start=start_time,
+            end=end_time,
+            after=after_encoded,
+            limit=limit,
+            items=sparse_response_list_adapter(fieldset).validate_python(emails),
+            next=next_url,
+        )
+        return json_response(response.model_dump_json())
+
+    return json_response(
+        bulk_response_json(
+            emails,
+            start=start_time,
+            end=end_time,
+            after=after_encoded,
+            limit=limit,
+            next=next_url,
+        )
     )
 
 
+def bulk_contact_line(contact: ContactSchema) -> bytes:
+    """Serialize a contact as a line of the bulk export stream."""
+    return contact_json(contact) + b"\n"
+
+
+def bulk_cursor_line(
+    start_time: datetime,
+    end_time: datetime,
+    after: str | None,
+    last_contact: ContactSchema | None,
+    count: int,
+) -> str:
+    """Serialize the last line of the bulk export stream, to resume after the last contact."""
+    if last_contact is not None:
+        after = BulkRequestSchema.compressor_for_bulk_encoded_details(
+            last_email_id=last_contact.email.email_id,
+            last_update_time=last_contact.email.update_timestamp,
+        )
+    return CTMSBulkCursor(start=start_time, end=end_time, after=after, count=count).model_dump_json() + "\n"
+
+
+def stream_bulk_contacts(
+    start_time: datetime,
+    end_time: datetime,
+    after: str | None,
+    after_start_time: datetime,
+    after_email_id: str | None,
+    mofo_relevant: bool | None,
+    session_factory=SessionLocal,
+) -> Iterator[str | bytes]:
+    """
+    Stream the contacts of a time range as newline-delimited JSON, followed by a cursor line.
+
+    The response outlives the dependencies of the endpoint, hence its own session.
+    """
+    contact = None
+    count = 0
+    with session_factory() as db:
+        for contact in iter_bulk_contacts(db, after_start_time, end_time, mofo_relevant, after_email_id):
+            count += 1
+            yield bulk_contact_line(contact)
+    yield bulk_cursor_line(start_time, end_time, after, contact, count)
+
+
+async def astream_bulk_contacts(
+    start_time: datetime,
+    end_time: datetime,
+    after: str | None,
+    after_start_time: datetime,
+    after_email_id: str | None,
+    mofo_relevant: bool | None,
+    session_factory=AsyncSessionLocal,
+) -> AsyncIterator[str | bytes]:
+    """Same as ``stream_bulk_contacts()``, with an async session."""
+    contact = None
+    count = 0
+    async with session_factory() as db:
+        async for contact in aiter_bulk_contacts(db, after_start_time, end_time, mofo_relevant, after_email_id):
+            count += 1
+            yield bulk_contact_line(contact)
+    yield bulk_cursor_line(start_time, end_time, after, contact, count)
+
+
 @router.get(
     "/ctms",
     summary="Get all contacts matching alternate IDs",
     response_model=list[CTMSResponse],
     responses={
+        304: {"description": "Not modified since the If-None-Match ETag"},
         400: {"model": BadRequestResponse},
         401: {"model": UnauthorizedResponse},
     },
     tags=["Public"],
 )
-def read_ctms_by_any_id(
+async def read_ctms_by_any_id(
     request: Request,
-    db: Annotated[Session, Depends(get_db)],
+    db: Annotated[Session | AsyncSession, Depends(get_read_db)],
     api_client: Annotated[ApiClientSchema, Depends(get_enabled_api_client)],
+    fieldset: Annotated[ContactFieldset | None, Depends(contact_fieldset)],
+    if_none_match: Annotated[str | None, Header()] = None,
     ids=Depends(all_ids),
 ):
     if not any(ids.values()):
         detail = f"No identifiers provided, at least one is needed: {', '.join(ids.keys())}"
         raise HTTPException(status_code=400, detail=detail)
-    contacts = get_contacts_by_any_id(db, **ids)
-    return [CTMSResponse(**contact.model_dump()) for contact in contacts]
+    if fieldset is not None:
+        return await run_db(db, get_sparse_responses_by_any_id, fieldset, if_none_match, **ids)
+    return await run_db(db, get_responses_by_any_id, if_none_match, **ids)
 
 
 @router.get(
@@ -163,24 +435,184 @@ def read_ctms_by_any_id(
     summary="Get a contact by email_id",
     response_model=CTMSSingleResponse,
     responses={
+        304: {"description": "Not modified since the If-None-Match ETag"},
         401: {"model": UnauthorizedResponse},
         404: {"model": NotFoundResponse},
     },
     tags=["Public"],
 )
-def read_ctms_by_email_id(
+async def read_ctms_by_email_id(
     request: Request,
     email_id: Annotated[UUID, Path(..., title="The Email ID")],
-    db: Annotated[Session, Depends(get_db)],
+    db: Annotated[Session | AsyncSession, Depends(get_read_db)],
     api_client: Annotated[ApiClientSchema, Depends(get_enabled_api_client)],
+    fieldset: Annotated[ContactFieldset | None, Depends(contact_fieldset)],
+    if_none_match: Annotated[str | None, Header()] = None,
 ):
-    resp = get_ctms_response_or_404(db, email_id)
+    if fieldset is not None:
+        return await run_db(db, get_sparse_response_or_404, email_id, fieldset, if_none_match)
+    resp = await run_db(db, get_ctms_response_or_404, email_id, if_none_match)
     return resp
 
 
-def get_ctms_response_or_404(db, email_id):
-    contact = get_contact_or_404(db, email_id)
-    return CTMSSingleResponse(**contact.model_dump(), status="ok")
+def get_ctms_response_or_404(db: Session, email_id: UUID, if_none_match: str | None = None) -> Response:
+    """
+    Get a contact by email_ID, serialized, or raise a 404 exception.
+
+    The contact is read from the contact cache if possible. Otherwise, if it
+    is still at the version of the ``If-None-Match`` ETag, only its version is
+    read, and nothing is serialized.
+    """
+    contact = get_cached_contact("email_id", email_id)
+    if contact is None:
+        if if_none_match is not None:
+            versions = get_contact_versions(db, [email_id])
+            etag = contact_etag(versions)
+            if versions and etag_matches(if_none_match, etag):
+                return not_modified_response(etag)
+        contact = cache_contact(get_email_or_404(db, email_id))
+    if etag_matches(if_none_match, contact.etag):
+        return not_modified_response(contact.etag)
+    return json_response(single_response_from_contact_json(contact.content), etag=contact.etag)
+
+
+def get_responses_by_any_id(db: Session, if_none_match: str | None = None, **ids) -> Response:
+    """Get all the contacts matching alternate IDs, serialized, unless they did not change since the ``If-None-Match`` ETag."""
+    given = [(kind, value) for kind, value in ids.items() if value is not None]
+    if len(given) == 1 and given[0][0] in CACHED_IDS and (contact := get_cached_contact(*given[0])) is not None:
+        if etag_matches(if_none_match, contact.etag):
+            return not_modified_response(contact.etag)
+        return json_response(contacts_from_contact_json([contact.content]), etag=contact.etag)
+
+    if if_none_match is not None:
+        versions = get_contact_versions_by_any_id(db, **ids)
+        etag = contact_etag(versions)
+        if etag_matches(if_none_match, etag, exists=bool(versions)):
+            return not_modified_response(etag)
+    emails = get_emails_by_any_id(db, **ids)
+    contacts = [cache_contact(email) for email in emails]
+    etag = contact_etag(email_version(email) for email in emails)
+    return json_response(contacts_from_contact_json([contact.content for contact in contacts]), etag=etag)
+
+
+def lookup_contacts(db: Session, lookup: ContactLookupSchema) -> CTMSLookupResponse:
+    """Get the contacts of all the identifiers, with a few set-based queries."""
+    found = lookup_email_ids(db, **lookup.model_dump())
+    email_ids = {email_id for ids in found.values() for email_id in ids.values()}
+    contacts = {email.email_id: CTMSResponse(**ContactSchema.from_email(email).model_dump()) for email in get_all_contacts_from_ids(db, email_ids)}
+
+    response = CTMSLookupResponse()
+    for kind, identifiers in lookup:
+        results = getattr(response, kind)
+        missing = getattr(response.missing, kind)
+        for identifier in dict.fromkeys(identifiers):
+            key = identifier.lower() if kind == "primary_emails" else str(identifier)
+            contact = contacts.get(found[kind].get(key))
+            if contact is None:
+                missing.append(identifier)
+            else:
+                results[str(identifier)] = contact
+    return response
+
+
+@router.post(
+    "/ctms/lookup",
+    summary="Get many contacts by their IDs",
+    response_model=CTMSLookupResponse,
+    responses={
+        400: {"model": BadRequestResponse},
+        401: {"model": UnauthorizedResponse},
+    },
+    tags=["Public"],
+)
+async def lookup_ctms_contacts(
+    lookup: ContactLookupSchema,
+    db: Annotated[Session | AsyncSession, Depends(get_read_db)],
+    api_client: Annotated[ApiClientSchema, Depends(get_enabled_api_client)],
+):
+    count = lookup.count()
+    if count == 0:
+        detail = f"No identifiers provided, at least one is needed: {', '.join(ContactLookupSchema.model_fields)}"
+        raise HTTPException(status_code=400, detail=detail)
+    max_count = get_settings().lookup_max_identifiers
+    if count > max_count:
+        raise HTTPException(status_code=400, detail=f"Too many identifiers, at most {max_count} are allowed")
+    return await run_db(db, lookup_contacts, lookup)
+
+
+def create_contact_or_409(db: Session, email_id: UUID, contact: ContactInSchema) -> tuple[CTMSSingleResponse, int]:
+    """Create a contact, unless an identical one exists, and return it with the response status code."""
+    try:
+        created = create_contact_if_absent(db, email_id, contact, get_metrics())
+        if created is not None:
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        if isinstance(e, IntegrityError):
+            raise HTTPException(status_code=409, detail="Contact already exists") from e
+        raise e from e
+    if created is not None:
+        return CTMSSingleResponse(**created.model_dump(), status="ok"), 201
+
+    # Only load the existing contact on conflict, to check if this is a retry.
+    existing = get_contact_by_email_id(db, email_id)
+    if existing and ContactInSchema(**existing.model_dump()).idempotent_equal(contact):
+        return CTMSSingleResponse(**existing.model_dump(), status="ok"), 200
+    raise HTTPException(status_code=409, detail="Contact already exists")
+
+
+def create_or_update_contact_or_409(db: Session, email_id: UUID, contact: ContactPutSchema, if_match: str | None = None) -> CTMSSingleResponse:
+    """Create or replace a contact, and return it."""
+    try:
+        check_if_match_or_412(db, email_id, if_match)
+        written = create_or_update_contact(db, email_id, contact, get_metrics())
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        if isinstance(e, IntegrityError):
+            raise HTTPException(
+                status_code=409,
+                detail="Contact with primary_email or basket_token already exists",
+            ) from e
+        raise e from e
+    return CTMSSingleResponse(**written.model_dump(), status="ok")
+
+
+def update_contact_or_4xx(db: Session, email_id: UUID, update_data: dict, if_match: str | None = None) -> CTMSSingleResponse:
+    """Partially update a contact, and return it."""
+    check_if_match_or_412(db, email_id, if_match)
+    current_email = get_email_or_404(db, email_id)
+    update_contact(db, current_email, update_data, get_metrics())
+
+    try:
+        # The timestamps are returned by the UPDATE and INSERT statements, build
+        # the response before they are expired by the commit.
+        db.flush()
+        resp = CTMSSingleResponse(**ContactSchema.from_email(current_email).model_dump(), status="ok")
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        if isinstance(e, IntegrityError):
+            raise HTTPException(
+                status_code=409,
+                detail="Contact with primary_email, basket_token, mofo_email_id, or fxa_id already exists",
+            ) from e
+        raise
+    return resp
+
+
+def delete_contacts_or_404(db: Session, primary_email: str) -> list[IdentityResponse]:
+    """Delete all the contacts with this primary email, and return their identities."""
+    ids = all_ids(primary_email=primary_email.lower())
+    contacts = get_contacts_by_any_id(db, **ids)
+
+    if not contacts:
+        raise HTTPException(status_code=404, detail=f"email {primary_email} not found!")
+
+    for contact in contacts:
+        delete_contact(db=db, email_id=contact.email.email_id)
+
+    return [contact.as_identity_response() for contact in contacts]
 
 
 @router.post(
@@ -190,34 +622,19 @@ def get_ctms_response_or_404(db, email_id):
     responses={409: {"model": BadRequestResponse}},
     tags=["Public"],
 )
-def create_ctms_contact(
+async def create_ctms_contact(
     contact: ContactInSchema,
     request: Request,
     response: Response,
-    db: Annotated[Session, Depends(get_db)],
+    db: Annotated[Session | AsyncSession, Depends(get_db)],
     api_client: Annotated[ApiClientSchema, Depends(get_enabled_api_client)],
     content_json: Annotated[dict | None, Depends(get_json)],
 ):
     contact.email.email_id = contact.email.email_id or uuid4()
     email_id = contact.email.email_id
-    existing = get_contact_by_email_id(db, email_id)
-    if existing:
-        if ContactInSchema(**existing.model_dump()).idempotent_equal(contact):
-            response.headers["Location"] = f"/ctms/{email_id}"
-            response.status_code = 200
-            return get_ctms_response_or_404(db=db, email_id=email_id)
-        raise HTTPException(status_code=409, detail="Contact already exists")
-    try:
-        create_contact(db, email_id, contact, get_metrics())
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        if isinstance(e, IntegrityError):
-            raise HTTPException(status_code=409, detail="Contact already exists") from e
-        raise e from e
+    resp_data, response.status_code = await run_db(db, create_contact_or_409, email_id, contact)
+    replica_router.record_write(api_client.client_id)
     response.headers["Location"] = f"/ctms/{email_id}"
-    response.status_code = 201
-    resp_data = get_ctms_response_or_404(db=db, email_id=email_id)
     return resp_data
 
 
@@ -228,17 +645,22 @@ def create_ctms_contact(
                This is intended to be used to send back a contact you have modified locally
                and therefore the input schema is a full Contact.""",
     response_model=CTMSSingleResponse,
-    responses={409: {"model": BadRequestResponse}, 422: {"model": BadRequestResponse}},
+    responses={
+        409: {"model": BadRequestResponse},
+        412: {"model": BadRequestResponse},
+        422: {"model": BadRequestResponse},
+    },
     tags=["Public"],
 )
-def create_or_update_ctms_contact(
+async def create_or_update_ctms_contact(
     contact: ContactPutSchema,
     request: Request,
     response: Response,
     email_id: Annotated[UUID, Path(..., title="The Email ID")],
-    db: Annotated[Session, Depends(get_db)],
+    db: Annotated[Session | AsyncSession, Depends(get_db)],
     api_client: Annotated[ApiClientSchema, Depends(get_enabled_api_client)],
     content_json: Annotated[dict | None, Depends(get_json)],
+    if_match: Annotated[str | None, Header()] = None,
 ):
     if contact.email.email_id:
         if contact.email.email_id != email_id:
@@ -249,19 +671,10 @@ def create_or_update_ctms_contact(
     else:
         contact.email.email_id = email_id
 
-    try:
-        create_or_update_contact(db, email_id, contact, get_metrics())
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        if isinstance(e, IntegrityError):
-            raise HTTPException(
-                status_code=409,
-                detail="Contact with primary_email or basket_token already exists",
-            ) from e
-        raise e from e
+    resp_data = await run_db(db, create_or_update_contact_or_409, email_id, contact, if_match)
+    replica_router.record_write(api_client.client_id)
     response.status_code = 201
-    return get_ctms_response_or_404(db=db, email_id=email_id)
+    return resp_data
 
 
 @router.patch(
@@ -272,28 +685,101 @@ def create_or_update_ctms_contact(
     responses={
         409: {"model": BadRequestResponse},
         404: {"model": NotFoundResponse},
+        412: {"model": BadRequestResponse},
     },
     tags=["Public"],
 )
-def partial_update_ctms_contact(
+async def partial_update_ctms_contact(
     contact: ContactPatchSchema,
     request: Request,
     response: Response,
     email_id: Annotated[UUID, Path(..., title="The Email ID")],
-    db: Annotated[Session, Depends(get_db)],
+    db: Annotated[Session | AsyncSession, Depends(get_db)],
     api_client: Annotated[ApiClientSchema, Depends(get_enabled_api_client)],
     content_json: Annotated[dict | None, Depends(get_json)],
+    if_match: Annotated[str | None, Header()] = None,
 ):
     if contact.email and contact.email.email_id and contact.email.email_id != email_id:
         raise HTTPException(
             status_code=422,
             detail="cannot change email_id",
         )
-    current_email = get_email_or_404(db, email_id)
     update_data = contact.model_dump(exclude_unset=True)
-    update_contact(db, current_email, update_data, get_metrics())
+    resp_data = await run_db(db, update_contact_or_4xx, email_id, update_data, if_match)
+    replica_router.record_write(api_client.client_id)
+    response.status_code = 200
+    return resp_data
+
+
+def claimed_identifiers(operation: ContactBatchCreate | ContactBatchPut | ContactBatchPatch, current: Email | None) -> dict[str, str]:
+    """Return the unique identifiers that the contact will have after the operation."""
+    if isinstance(operation, ContactBatchPatch):
+        email = {
+            "primary_email": current.primary_email,
+            "basket_token": current.basket_token,
+            **operation.contact.model_dump(exclude_unset=True).get("email", {}),
+        }
+        fxa = operation.contact.fxa if operation.contact.fxa != "DELETE" else None
+        fxa_id = fxa.fxa_id if fxa and "fxa_id" in fxa.model_fields_set else getattr(current.fxa, "fxa_id", None)
+        mofo = operation.contact.mofo if operation.contact.mofo != "DELETE" else None
+        mofo_email_id = mofo.mofo_email_id if mofo and "mofo_email_id" in mofo.model_fields_set else getattr(current.mofo, "mofo_email_id", None)
+    else:
+        email = operation.contact.email.model_dump()
+        fxa_id = getattr(operation.contact.fxa, "fxa_id", None)
+        mofo_email_id = getattr(operation.contact.mofo, "mofo_email_id", None)
+    claimed = {
+        "primary_emails": email["primary_email"].lower(),
+        "basket_tokens": email["basket_token"] and str(email["basket_token"]),
+        "fxa_ids": fxa_id,
+        "mofo_email_ids": mofo_email_id,
+    }
+    return {kind: key for kind, key in claimed.items() if key}
+
+
+def check_batch_operation(operation: ContactBatchCreate | ContactBatchPut | ContactBatchPatch, current: Email | None) -> CTMSBatchItemResponse | None:
+    """Return the outcome of an operation that must not be applied, like the equivalent single request would."""
+    if isinstance(operation, ContactBatchCreate) and current is not None:
+        contact = ContactSchema.from_email(current)
+        if ContactInSchema(**contact.model_dump()).idempotent_equal(operation.contact):
+            return CTMSBatchItemResponse(email_id=operation.email_id, status=200, contact=CTMSResponse(**contact.model_dump()))
+        return CTMSBatchItemResponse(email_id=operation.email_id, status=409, detail="Contact already exists")
+    if isinstance(operation, ContactBatchPatch):
+        if operation.contact.email and operation.contact.email.email_id and operation.contact.email.email_id != operation.email_id:
+            return CTMSBatchItemResponse(email_id=operation.email_id, status=422, detail="cannot change email_id")
+        if current is None:
+            return CTMSBatchItemResponse(email_id=operation.email_id, status=404, detail="Unknown email_id")
+    return None
+
+
+def find_identifier_conflicts(
+    db: Session,
+    operations: list[ContactBatchCreate | ContactBatchPut | ContactBatchPatch],
+    pending: list[tuple[int, dict[str, str]]],
+) -> set[int]:
+    """
+    Return the indexes of the operations whose unique identifiers belong to
+    other contacts, or were claimed by previous operations.
+
+    This is checked upfront, so that a conflict skips the operation instead
+    of failing the whole transaction.
+    """
+    claims: dict[str, list[str]] = {"basket_tokens": [], "fxa_ids": [], "primary_emails": [], "mofo_email_ids": []}
+    for _, claimed in pending:
+        for kind, key in claimed.items():
+            claims[kind].append(key)
+    owners = lookup_email_ids(db, **claims)
+    conflicts = set()
+    for index, claimed in pending:
+        email_id = operations[index].email_id
+        if any(owners[kind].setdefault(key, email_id) != email_id for kind, key in claimed.items()):
+            conflicts.add(index)
+    return conflicts
 
+
+def apply_contact_batch_or_409(db: Session, batch: ContactBatch) -> None:
+    """Apply and commit the batch, or roll it back entirely."""
     try:
+        batch.apply(db)
         db.commit()
     except Exception as e:
         db.rollback()
@@ -303,8 +789,124 @@ def partial_update_ctms_contact(
                 detail="Contact with primary_email, basket_token, mofo_email_id, or fxa_id already exists",
             ) from e
         raise
-    response.status_code = 200
-    return get_ctms_response_or_404(db=db, email_id=email_id)
+
+
+def check_batch_operations(
+    db: Session,
+    operations: list[ContactBatchCreate | ContactBatchPut | ContactBatchPatch],
+    items: list[CTMSBatchItemResponse | None],
+    existing: dict[UUID, Email],
+) -> list[int]:
+    """Set the outcome of the operations that must be skipped in ``items``, and return the indexes of the others."""
+    pending = []
+    for index, operation in enumerate(operations):
+        if items[index] is None:
+            current = existing.get(operation.email_id)
+            items[index] = check_batch_operation(operation, current)
+            if items[index] is None:
+                pending.append((index, claimed_identifiers(operation, current)))
+
+    conflicts = find_identifier_conflicts(db, operations, pending)
+    for index in conflicts:
+        items[index] = CTMSBatchItemResponse(
+            email_id=operations[index].email_id,
+            status=409,
+            detail="Contact with primary_email, basket_token, mofo_email_id, or fxa_id already exists",
+        )
+    return [index for index, _ in pending if index not in conflicts]
+
+
+def add_batch_operation(batch: ContactBatch, operation: ContactBatchCreate | ContactBatchPut | ContactBatchPatch, current: Email | None) -> None:
+    """Add the changes of an operation to the batch."""
+    if isinstance(operation, ContactBatchPatch):
+        batch.patch(current, operation.contact.model_dump(exclude_unset=True))
+    elif isinstance(operation, ContactBatchCreate):
+        batch.create(ContactPutSchema(**operation.contact.model_dump()))
+    else:
+        batch.put(ContactPutSchema(**operation.contact.model_dump()))
+
+
+def batch_item_responses(
+    db: Session,
+    operations: list[ContactBatchCreate | ContactBatchPut | ContactBatchPatch],
+    items: list[CTMSBatchItemResponse | None],
+    batch: ContactBatch,
+) -> list[CTMSBatchItemResponse]:
+    """Return the outcome of each operation, once the batch is applied."""
+    contacts = {email.email_id: CTMSResponse(**ContactSchema.from_email(email).model_dump()) for email in get_all_contacts_from_ids(db, batch.emails)}
+    for index, operation in enumerate(operations):
+        if items[index] is None and operation.email_id in batch.conflicts:
+            items[index] = CTMSBatchItemResponse(email_id=operation.email_id, status=409, detail="Contact already exists")
+        elif items[index] is None:
+            items[index] = CTMSBatchItemResponse(
+                email_id=operation.email_id,
+                status=200 if isinstance(operation, ContactBatchPatch) else 201,
+                contact=contacts[operation.email_id],
+            )
+    return items
+
+
+def write_contacts_batch_or_409(
+    db: Session, operations: list[ContactBatchCreate | ContactBatchPut | ContactBatchPatch]
+) -> list[CTMSBatchItemResponse]:
+    """
+    Apply the operations that can be, in one transaction, and return the outcome of each.
+
+    Operations that would fail on their own (unknown or duplicate contact,
+    conflicting identifiers) are skipped, with the status code of the
+    equivalent single request.
+
+    The existing contacts are locked before they are read, so that concurrent
+    writes to them wait for this transaction instead of being overwritten.
+    """
+    items: list[CTMSBatchItemResponse | None] = [None] * len(operations)
+    seen = set()
+    for index, operation in enumerate(operations):
+        if operation.email_id in seen:
+            items[index] = CTMSBatchItemResponse(email_id=operation.email_id, status=422, detail="Duplicate email_id in batch")
+        seen.add(operation.email_id)
+
+    lock_emails(db, seen)
+    existing = {email.email_id: email for email in get_all_contacts_from_ids(db, seen)}
+    batch = ContactBatch()
+    for index in check_batch_operations(db, operations, items, existing):
+        add_batch_operation(batch, operations[index], existing.get(operations[index].email_id))
+
+    if not batch:
+        return items
+
+    apply_contact_batch_or_409(db, batch)
+    return batch_item_responses(db, operations, items, batch)
+
+
+@router.post(
+    "/ctms/batch",
+    summary="Create, replace or update many contacts in one transaction",
+    response_model=CTMSBatchResponse,
+    responses={
+        400: {"model": BadRequestResponse},
+        401: {"model": UnauthorizedResponse},
+        409: {"model": BadRequestResponse},
+    },
+    tags=["Public"],
+)
+async def write_ctms_batch(
+    batch: ContactBatchSchema,
+    db: Annotated[Session | AsyncSession, Depends(get_db)],
+    api_client: Annotated[ApiClientSchema, Depends(get_enabled_api_client)],
+    content_json: Annotated[dict | None, Depends(get_json)],
+):
+    if not batch.operations:
+        raise HTTPException(status_code=400, detail="No operations provided")
+    max_count = get_settings().batch_max_operations
+    if len(batch.operations) > max_count:
+        raise HTTPException(status_code=400, detail=f"Too many operations, at most {max_count} are allowed")
+    for operation in batch.operations:
+        if isinstance(operation, ContactBatchCreate):
+            operation.contact.email.email_id = operation.contact.email.email_id or uuid4()
+    items = await run_db(db, write_contacts_batch_or_409, batch.operations)
+    replica_router.record_write(api_client.client_id)
+    return CTMSBatchResponse(items=items)
 
 
 @router.delete(
@@ -316,21 +918,14 @@ def partial_update_ctms_contact(
     },
     tags=["Public"],
 )
-def delete_contact_by_primary_email(
+async def delete_contact_by_primary_email(
     primary_email: str,
-    db: Annotated[Session, Depends(get_db)],
+    db: Annotated[Session | AsyncSession, Depends(get_db)],
     api_client: Annotated[ApiClientSchema, Depends(get_enabled_api_client)],
 ):
-    ids = all_ids(primary_email=primary_email.lower())
-    contacts = get_contacts_by_any_id(db, **ids)
-
-    if not contacts:
-        raise HTTPException(status_code=404, detail=f"email {primary_email} not found!")
-
-    for contact in contacts:
-        delete_contact(db=db, email_id=contact.email.email_id)
-
-    return [contact.as_identity_response() for contact in contacts]
+    identities = await run_db(db, delete_contacts_or_404, primary_email)
+    replica_router.record_write(api_client.client_id)
+    return identities
 
 
 @router.get(
@@ -343,14 +938,15 @@ def delete_contact_by_primary_email(
     },
     tags=["Public"],
 )
-def read_ctms_in_bulk_by_timestamps_and_limit(
+async def read_ctms_in_bulk_by_timestamps_and_limit(
     start: datetime,
     end: datetime | Literal[""] | None = None,
     limit: int | Literal[""] | None = None,
     after: str | None = None,
     mofo_relevant: bool | Literal[""] | None = None,
-    db: Session = Depends(get_db),  # noqa: FAST002, parameter without default
+    db: Session | AsyncSession = Depends(get_read_db),  # noqa: FAST002, parameter without default
     api_client: ApiClientSchema = Depends(get_enabled_api_client),  # noqa: FAST002, parameter without default
+    fieldset: ContactFieldset | None = Depends(contact_fieldset),  # noqa: FAST002, parameter without default
 ):
     try:
         bulk_request = BulkRequestSchema(
@@ -360,12 +956,70 @@ def read_ctms_in_bulk_by_timestamps_and_limit(
             after=after,
             mofo_relevant=mofo_relevant,
         )
-        return get_bulk_contacts_by_timestamp_or_4xx(db=db, **bulk_request.model_dump())
+        return await run_db(db, get_bulk_contacts_by_timestamp_or_4xx, fieldset=fieldset, **bulk_request.model_dump())
     except ValidationError as e:
         detail = {"errors": json.loads(e.json())}
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=detail) from e
 
 
+@router.get(
+    "/updates/stream",
+    summary="Stream all contacts within provided timeframe, as newline-delimited JSON",
+    description=(
+        "Each line is a contact, in update order. The last line gives the `after` cursor "
+        "to resume from the last contact, and the number of contacts streamed."
+    ),
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {"application/x-ndjson": {}}},
+        401: {"model": UnauthorizedResponse},
+        422: {"model": BadRequestResponse},
+    },
+    tags=["Public"],
+)
+async def stream_ctms_in_bulk_by_timestamps(
+    start: datetime,
+    end: datetime | Literal[""] | None = None,
+    after: str | None = None,
+    mofo_relevant: bool | Literal[""] | None = None,
+    api_client: ApiClientSchema = Depends(get_enabled_api_client),  # noqa: FAST002, parameter without default
+):
+    try:
+        bulk_request = BulkRequestSchema(
+            start_time=start,
+            end_time=end,
+            after=after,
+            mofo_relevant=mofo_relevant,
+        )
+    except ValidationError as e:
+        detail = {"errors": json.loads(e.json())}
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=detail) from e
+
+    after_email_id = None
+    after_start_time = bulk_request.start_time
+    if bulk_request.after is not None:
+        after_email_id, after_start_time = BulkRequestSchema.extractor_for_bulk_encoded_details(bulk_request.after)
+
+    if get_settings().db_async:
+        stream = astream_bulk_contacts
+        session_factory = read_session_factory(api_client.client_id, AsyncSessionLocal, AsyncReplicaSessionLocals)
+    else:
+        stream = stream_bulk_contacts
+        session_factory = read_session_factory(api_client.client_id, SessionLocal, ReplicaSessionLocals)
+    return StreamingResponse(
+        stream(
+            start_time=bulk_request.start_time,
+            end_time=bulk_request.end_time,
+            after=after or None,
+            after_start_time=after_start_time,
+            after_email_id=after_email_id,
+            mofo_relevant=bulk_request.mofo_relevant,
+            session_factory=session_factory,
+        ),
+        media_type="application/x-ndjson",
+    )
+
+
 @router.get(
     "/identities",
     summary="Get identities associated with alternate IDs",
@@ -376,15 +1030,15 @@ def read_ctms_in_bulk_by_timestamps_and_limit(
     },
     tags=["Private"],
 )
-def read_identities(
-    db: Annotated[Session, Depends(get_db)],
+async def read_identities(
+    db: Annotated[Session | AsyncSession, Depends(get_read_db)],
     api_client: Annotated[ApiClientSchema, Depends(get_enabled_api_client)],
     ids=Depends(all_ids),
 ):
     if not any(ids.values()):
         detail = f"No identifiers provided, at least one is needed: {', '.join(ids.keys())}"
         raise HTTPException(status_code=400, detail=detail)
-    contacts = get_contacts_by_any_id(db, **ids)
+    contacts = await run_db(db, get_contacts_by_any_id, **ids)
     return [contact.as_identity_response() for contact in contacts]
 
 
@@ -398,10 +1052,10 @@ def read_identities(
     },
     tags=["Private"],
 )
-def read_identity(
+async def read_identity(
     email_id: Annotated[UUID, Path(..., title="The Email ID")],
-    db: Annotated[Session, Depends(get_db)],
+    db: Annotated[Session | AsyncSession, Depends(get_read_db)],
     api_client: Annotated[ApiClientSchema, Depends(get_enabled_api_client)],
 ):
-    contact = get_contact_or_404(db, email_id)
+    contact = await run_db(db, get_contact_or_404, email_id)
     return contact.as_identity_response()
@@ -1,4 +1,7 @@
+import asyncio
+import hmac
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Annotated
 
 from dockerflow import checks as dockerflow_checks
@@ -6,18 +9,22 @@ from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from fastapi.responses import RedirectResponse
 from fastapi.security import HTTPBasicCredentials
 from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ctms.auth import (
     OAuth2ClientCredentialsRequestForm,
     auth_info_context,
     create_access_token,
+    credentials_digest,
     verify_password,
 )
-from ctms.crud import count_total_contacts, get_api_client_by_id, ping
-from ctms.database import SessionLocal
-from ctms.dependencies import get_db, get_enabled_api_client, get_token_settings
-from ctms.metrics import get_metrics, get_metrics_registry, token_scheme
+from ctms.cache import verified_credentials_cache
+from ctms.crud import get_api_client_by_id
+from ctms.database import run_db
+from ctms.db_stats import db_stats_collector
+from ctms.dependencies import get_db, get_enabled_api_client, get_settings, get_token_settings
+from ctms.metrics import emit_cache_metrics, emit_db_stats_age, get_exposition_registry, get_metrics, token_scheme
 from ctms.schemas.api_client import ApiClientSchema
 from ctms.schemas.web import BadRequestResponse, TokenResponse
 
@@ -26,9 +33,45 @@ router = APIRouter()
 
 logger = logging.getLogger(__name__)
 
+# Argon2 is deliberately CPU and memory intensive. Verifications run in their own
+# bounded pool, so that a burst of token requests does not starve the threadpool
+# serving the other endpoints.
+password_executor = ThreadPoolExecutor(
+    max_workers=get_settings().password_verification_max_workers,
+    thread_name_prefix="verify_password",
+)
+
+
+async def verify_password_in_executor(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password in the dedicated executor."""
+    appmetrics = get_metrics()
+    if appmetrics:
+        appmetrics["password_verifications_pending"].inc()
+    try:
+        return await asyncio.wrap_future(password_executor.submit(verify_password, plain_password, hashed_password))
+    finally:
+        if appmetrics:
+            appmetrics["password_verifications_pending"].dec()
+
+
+async def verify_client_secret(client_id: str, client_secret: str, hashed_secret: str, secret_key: str) -> bool:
+    """Verify the client secret, skipping argon2 for recently verified credentials."""
+    digest = credentials_digest(client_id, client_secret, secret_key)
+    verified = verified_credentials_cache.get(client_id)
+    # The stored hash is compared too, in case the secret was rotated by another process.
+    if verified and hmac.compare_digest(verified[0], digest) and verified[1] == hashed_secret:
+        emit_cache_metrics("verified_credentials", hits=1, metrics=get_metrics())
+        return True
+
+    if not await verify_password_in_executor(client_secret, hashed_secret):
+        return False
+    evictions = verified_credentials_cache.set(client_id, (digest, hashed_secret))
+    emit_cache_metrics("verified_credentials", misses=1, evictions=evictions, metrics=get_metrics())
+    return True
+
 
 @router.get("/", include_in_schema=False)
-def root():
+async def root():
     """GET via root redirects to /docs.
 
     - Args:
@@ -46,9 +89,9 @@ def root():
     response_model=TokenResponse,
     responses={400: {"model": BadRequestResponse}},
 )
-def login(
+async def login(
     request: Request,
-    db: Annotated[Session, Depends(get_db)],
+    db: Annotated[Session | AsyncSession, Depends(get_db)],
     form_data: Annotated[OAuth2ClientCredentialsRequestForm, Depends()],
     basic_credentials: Annotated[HTTPBasicCredentials | None, Depends(token_scheme)],
     token_settings=Depends(get_token_settings),
@@ -69,14 +112,14 @@ def login(
         raise failed_auth
 
     auth_info["client_id"] = client_id
-    api_client = get_api_client_by_id(db, client_id)
+    api_client = await run_db(db, get_api_client_by_id, client_id)
     if not api_client:
         auth_info["token_fail"] = "No client record"
         raise failed_auth
     if not api_client.enabled:
         auth_info["token_fail"] = "Client disabled"
         raise failed_auth
-    if not verify_password(client_secret, api_client.hashed_secret):
+    if not await verify_client_secret(client_id, client_secret, api_client.hashed_secret, token_settings["secret_key"]):
         auth_info["token_fail"] = "Bad credentials"
         raise failed_auth
 
@@ -92,29 +135,27 @@ def login(
 def database():
     result = []
 
-    with SessionLocal() as db:
-        alive = ping(db)
-        if not alive:
-            result.append(dockerflow_checks.Error("Database not reachable", id="db.0001"))
-            return result
-        # Report number of contacts in the database.
-        # Sending the metric in this heartbeat endpoint is simpler than reporting
-        # it in every write endpoint. Plus, performance does not matter much here
-        total_contacts = count_total_contacts(db)
-
-    contact_query_successful = total_contacts >= 0
-    if contact_query_successful:
-        appmetrics = get_metrics()
-        if appmetrics:
-            appmetrics["contacts"].set(total_contacts)
-    else:
+    # The statistics are collected in the background, so that heartbeat probes
+    # do not query the database. Collect them here until the first collection.
+    snapshot = db_stats_collector.snapshot or db_stats_collector.collect_in_session()
+    if not snapshot.alive:
+        result.append(dockerflow_checks.Error("Database not reachable", id="db.0001"))
+        return result
+
+    contact_query_successful = snapshot.contacts >= 0
+    if not contact_query_successful:
         result.append(dockerflow_checks.Error("Contacts table empty", id="db.0002"))
 
+    age = db_stats_collector.age()
+    max_age = get_settings().db_stats_max_age_in_seconds
+    if age is not None and age > max_age:
+        result.append(dockerflow_checks.Error(f"Database statistics are {age:.0f} seconds old", id="db.0003"))
+
     return result
 
 
 @router.get("/__crash__", tags=["Platform"], include_in_schema=False)
-def crash(api_client: Annotated[ApiClientSchema, Depends(get_enabled_api_client)]):
+async def crash(api_client: Annotated[ApiClientSchema, Depends(get_enabled_api_client)]):
     """Raise an exception to test Sentry integration."""
     raise RuntimeError("Test exception handling")
 
@@ -123,5 +164,6 @@ def crash(api_client: Annotated[ApiClientSchema, Depends(get_enabled_api_client)
 def metrics():
     """Return Prometheus metrics"""
     headers = {"Content-Type": CONTENT_TYPE_LATEST}
-    registry = get_metrics_registry()
+    emit_db_stats_age(db_stats_collector.age(), get_metrics())
+    registry = get_exposition_registry()
     return Response(generate_latest(registry), status_code=200, headers=headers)
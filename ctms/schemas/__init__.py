@@ -1,13 +1,23 @@
 # ruff: noqa: F401 -- Allow unused imports
 from .addons import AddOnsInSchema, AddOnsSchema, UpdatedAddOnsInSchema
-from .api_client import ApiClientSchema
+from .api_client import ApiClientPrincipal, ApiClientSchema
 from .bulk import BulkRequestSchema
 from .contact import (
+    ContactBatchCreate,
+    ContactBatchPatch,
+    ContactBatchPut,
+    ContactBatchSchema,
+    ContactFieldset,
     ContactInSchema,
+    ContactLookupSchema,
     ContactPatchSchema,
     ContactPutSchema,
     ContactSchema,
+    CTMSBatchItemResponse,
+    CTMSBatchResponse,
+    CTMSBulkCursor,
     CTMSBulkResponse,
+    CTMSLookupResponse,
     CTMSResponse,
     CTMSSingleResponse,
     IdentityResponse,
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 
 
 class ApiClientSchema(BaseModel):
@@ -7,3 +7,10 @@ class ApiClientSchema(BaseModel):
     client_id: str
     email: EmailStr
     enabled: bool
+
+
+class ApiClientPrincipal(ApiClientSchema):
+    """The fields of an OAuth2 Client needed to authorize requests, kept in cache."""
+
+    roles: frozenset[str] = frozenset()
+    model_config = ConfigDict(frozen=True)
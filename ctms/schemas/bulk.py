@@ -1,6 +1,9 @@
 import base64
-from datetime import UTC, datetime
+import binascii
+import struct
+from datetime import UTC, datetime, timedelta
 from typing import Literal
+from uuid import UUID
 
 import dateutil.parser
 from pydantic import Field, field_validator
@@ -9,6 +12,42 @@ from .base import ComparableBase
 
 BLANK_VALS = [None, ""]
 
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+# Cursor of the last contact of a page: version, email_id, update_timestamp
+# (in microseconds since epoch, the precision of PostgreSQL timestamps).
+BULK_CURSOR_VERSION = 2
+BULK_CURSOR_FORMAT = struct.Struct(">B16sq")
+
+
+def encode_bulk_cursor(email_id: UUID | str, update_timestamp: datetime) -> str:
+    """Encode the position of a contact in the bulk results, as a compact URL-safe string."""
+    if not isinstance(email_id, UUID):
+        email_id = UUID(email_id)
+    micros = (update_timestamp - EPOCH) // ONE_MICROSECOND
+    packed = BULK_CURSOR_FORMAT.pack(BULK_CURSOR_VERSION, email_id.bytes, micros)
+    return base64.urlsafe_b64encode(packed).rstrip(b"=").decode()
+
+
+def decode_bulk_cursor(cursor: str) -> tuple[str, datetime]:
+    """
+    Decode a cursor into the email_id and update_timestamp of a contact.
+
+    Cursors of the previous version, a base64 encoded ``{email_id},{update_timestamp}``
+    string, are still accepted. Raises ``ValueError`` if the cursor is invalid.
+    """
+    try:
+        decoded = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    except (binascii.Error, ValueError) as e:
+        raise ValueError("Invalid base64") from e
+    if len(decoded) == BULK_CURSOR_FORMAT.size and decoded[0] == BULK_CURSOR_VERSION:
+        _, email_id_bytes, micros = BULK_CURSOR_FORMAT.unpack(decoded)
+        return str(UUID(bytes=email_id_bytes)), EPOCH + micros * ONE_MICROSECOND
+    # Version 1 cursor.
+    email_id, _, update_timestamp = decoded.decode("utf-8").partition(",")
+    return str(UUID(email_id)), dateutil.parser.parse(update_timestamp)
+
 
 class BulkRequestSchema(ComparableBase):
     """A Bulk Read Request."""
@@ -53,19 +92,15 @@ class BulkRequestSchema(ComparableBase):
         if value in BLANK_VALS:
             return None  # Default
         try:
-            str_decode = base64.urlsafe_b64decode(value)
-            return str(str_decode.decode("utf-8"))  # 'after' should be decodable otherwise err and invalid
+            decode_bulk_cursor(value)  # 'after' should be decodable otherwise err and invalid
         except Exception as e:
             raise ValueError("'after' param validation error when decoding value.") from e
+        return value
 
     @staticmethod
     def extractor_for_bulk_encoded_details(after: str) -> tuple[str, datetime]:
-        result_after_list = after.split(",")
-        after_email_id = result_after_list[0]
-        after_start_time = dateutil.parser.parse(result_after_list[1])
-        return after_email_id, after_start_time
+        return decode_bulk_cursor(after)
 
     @staticmethod
     def compressor_for_bulk_encoded_details(last_email_id, last_update_time):
-        result_after_encoded = base64.urlsafe_b64encode(f"{last_email_id},{last_update_time}".encode())
-        return result_after_encoded.decode()
+        return encode_bulk_cursor(last_email_id, last_update_time)
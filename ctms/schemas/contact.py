@@ -1,13 +1,16 @@
 from datetime import datetime
-from typing import TYPE_CHECKING, Literal
+from functools import lru_cache
+from operator import attrgetter
+from typing import TYPE_CHECKING, Annotated, Literal, NamedTuple
 from uuid import UUID
 
-from pydantic import BaseModel, Field, field_validator, model_validator
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, create_model, field_validator, model_validator
 
 from .addons import AddOnsInSchema, AddOnsSchema
 from .base import ComparableBase
 from .common import AnyUrlString
 from .email import (
+    EMAIL_ID_DESCRIPTION,
     EMAIL_ID_EXAMPLE,
     EmailBase,
     EmailInSchema,
@@ -95,13 +98,15 @@ class ContactSchema(ComparableBase):
 
     @classmethod
     def from_email(cls, email: "Email") -> "ContactSchema":
+        # Loaded collections are ordered by name, but not the ones appended to
+        # before a flush (eg. on PATCH).
         return cls(
             amo=email.amo,
             email=email,
             fxa=email.fxa,
             mofo=email.mofo,
-            newsletters=email.newsletters,
-            waitlists=email.waitlists,
+            newsletters=sorted(email.newsletters, key=attrgetter("name")),
+            waitlists=sorted(email.waitlists, key=attrgetter("name")),
         )
 
     def as_identity_response(self) -> "IdentityResponse":
@@ -298,6 +303,19 @@ class CTMSBulkResponse(BaseModel):
     items: list[CTMSResponse]
 
 
+class CTMSBulkCursor(BaseModel):
+    """
+    Last line of GET /updates/stream
+
+    Pass ``after`` to resume the export after the last streamed contact.
+    """
+
+    start: datetime
+    end: datetime
+    after: str | None = None
+    count: int
+
+
 class IdentityResponse(BaseModel):
     """The identity keys for a contact."""
 
@@ -310,3 +328,203 @@ class IdentityResponse(BaseModel):
     amo_user_id: str | None = None
     fxa_id: str | None = None
     fxa_primary_email: str | None = None
+
+
+class ContactLookupSchema(BaseModel):
+    """Identifiers of the contacts to get with POST /ctms/lookup."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    email_ids: list[UUID] = Field(default_factory=list, examples=[["332de237-cab7-4461-bcc3-48e68f42bd5c"]])
+    basket_tokens: list[UUID] = Field(default_factory=list, examples=[["c4a7d759-bb52-457b-896b-90f1d3ef8433"]])
+    fxa_ids: list[str] = Field(default_factory=list, examples=[["6eb6ed6ac3b64259968aa7d9bd4e6b4b"]])
+    primary_emails: list[str] = Field(default_factory=list, examples=[["contact@example.com"]])
+
+    def count(self) -> int:
+        """Return the number of identifiers."""
+        return len(self.email_ids) + len(self.basket_tokens) + len(self.fxa_ids) + len(self.primary_emails)
+
+
+class CTMSLookupResponse(BaseModel):
+    """
+    Response for POST /ctms/lookup
+
+    Contacts are keyed by the requested identifiers, and the identifiers
+    without contact are listed in ``missing``.
+    """
+
+    email_ids: dict[str, CTMSResponse] = Field(default_factory=dict)
+    basket_tokens: dict[str, CTMSResponse] = Field(default_factory=dict)
+    fxa_ids: dict[str, CTMSResponse] = Field(default_factory=dict)
+    primary_emails: dict[str, CTMSResponse] = Field(default_factory=dict)
+    missing: ContactLookupSchema = Field(default_factory=ContactLookupSchema)
+
+
+class ContactBatchCreate(BaseModel):
+    """Create a contact, like POST /ctms."""
+
+    action: Literal["create"]
+    contact: ContactInSchema
+
+    @property
+    def email_id(self) -> UUID | None:
+        return self.contact.email.email_id
+
+
+class ContactBatchPut(BaseModel):
+    """Create or replace a contact, like PUT /ctms/{email_id}."""
+
+    action: Literal["put"]
+    contact: ContactPutSchema
+
+    @property
+    def email_id(self) -> UUID:
+        return self.contact.email.email_id
+
+
+class ContactBatchPatch(BaseModel):
+    """Partially update a contact, like PATCH /ctms/{email_id}."""
+
+    action: Literal["patch"]
+    email_id: UUID = Field(description=EMAIL_ID_DESCRIPTION, examples=[EMAIL_ID_EXAMPLE])
+    contact: ContactPatchSchema
+
+
+class ContactBatchSchema(BaseModel):
+    """Operations of POST /ctms/batch, applied in one transaction."""
+
+    operations: list[Annotated[ContactBatchCreate | ContactBatchPut | ContactBatchPatch, Field(discriminator="action")]]
+
+
+class CTMSBatchItemResponse(BaseModel):
+    """Outcome of an operation of POST /ctms/batch, with the status code of the equivalent single request."""
+
+    status: int = Field(examples=[201])
+    email_id: UUID | None = None
+    detail: str | None = None
+    contact: CTMSResponse | None = None
+
+
+class CTMSBatchResponse(BaseModel):
+    """
+    Response for POST /ctms/batch
+
+    Items are in the order of the operations.
+    """
+
+    items: list[CTMSBatchItemResponse]
+
+
+# Related data that can be selected with the ``include`` query parameter.
+CONTACT_GROUPS = ("amo", "fxa", "mofo", "newsletters", "waitlists")
+EMAIL_FIELDS = tuple(EmailSchema.model_fields)
+# Always read and returned, to identify contacts and paginate.
+REQUIRED_EMAIL_FIELDS = ("email_id", "update_timestamp")
+
+
+class ContactFieldset(NamedTuple):
+    """The parts of contacts requested with the ``fields`` and ``include`` query parameters."""
+
+    fields: frozenset[str] | None = None  # Email fields, all if None.
+    include: frozenset[str] = frozenset(CONTACT_GROUPS)
+
+    @classmethod
+    def from_query(cls, fields: str | None, include: str | None) -> "ContactFieldset | None":
+        """Parse the comma-separated query parameters, or return None if both are absent."""
+        if fields is None and include is None:
+            return None
+
+        def split(value: str) -> frozenset[str]:
+            return frozenset(name.strip() for name in value.split(",") if name.strip())
+
+        fieldset = cls(
+            fields=None if fields is None else split(fields),
+            include=frozenset(CONTACT_GROUPS) if include is None else split(include),
+        )
+        if unknown := (fieldset.fields or set()) - set(EMAIL_FIELDS):
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        if unknown := fieldset.include - set(CONTACT_GROUPS):
+            raise ValueError(f"Unknown include: {', '.join(sorted(unknown))}")
+        return fieldset
+
+    def as_query(self) -> dict[str, str]:
+        """Return the query parameters of this fieldset."""
+        query = {"include": ",".join(group for group in CONTACT_GROUPS if group in self.include)}
+        if self.fields is not None:
+            query["fields"] = ",".join(name for name in EMAIL_FIELDS if name in self.fields)
+        return query
+
+    @property
+    def email_fields(self) -> tuple[str, ...]:
+        """The email fields to read and return, in schema order."""
+        if self.fields is None:
+            return EMAIL_FIELDS
+        return tuple(name for name in EMAIL_FIELDS if name in self.fields or name in REQUIRED_EMAIL_FIELDS)
+
+
+class CTMSSparseResponseBase(BaseModel):
+    """
+    Base of the responses for contact reads with ``fields`` or ``include``.
+
+    Only the requested parts are present, read directly from the database
+    models. The retro-compat ``vpn_waitlist`` and ``relay_waitlist`` are omitted.
+    """
+
+    @model_validator(mode="before")
+    @classmethod
+    def from_email_model(cls, data):
+        """Read the parts from an ``Email`` database model, with defaults for missing related rows."""
+        if isinstance(data, dict):
+            return data
+        parts = {"email": data}
+        for group in CONTACT_GROUPS:
+            if group in cls.model_fields:
+                parts[group] = getattr(data, group) or cls.model_fields[group].annotation()
+        return parts
+
+
+SPARSE_GROUP_SCHEMAS = {
+    "amo": AddOnsSchema,
+    "fxa": FirefoxAccountsSchema,
+    "mofo": MozillaFoundationSchema,
+    "newsletters": list[NewsletterTimestampedSchema],
+    "waitlists": list[WaitlistTimestampedSchema],
+}
+
+
+@lru_cache(maxsize=256)
+def sparse_response_schema(fieldset: ContactFieldset) -> type[CTMSSparseResponseBase]:
+    """Return the response model with only the parts of the fieldset."""
+    email_schema = create_model(
+        "EmailSparseSchema",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (EmailSchema.model_fields[name].annotation, EmailSchema.model_fields[name]) for name in fieldset.email_fields},
+    )
+    groups = {group: (SPARSE_GROUP_SCHEMAS[group], ...) for group in CONTACT_GROUPS if group in fieldset.include}
+    return create_model("CTMSSparseResponse", __base__=CTMSSparseResponseBase, email=(email_schema, ...), **groups)
+
+
+@lru_cache(maxsize=256)
+def sparse_response_list_adapter(fieldset: ContactFieldset) -> TypeAdapter:
+    """Return an adapter to validate and serialize a list of database models."""
+    return TypeAdapter(list[sparse_response_schema(fieldset)])
+
+
+@lru_cache(maxsize=256)
+def sparse_single_response_schema(fieldset: ContactFieldset) -> type[CTMSSparseResponseBase]:
+    """Same as ``sparse_response_schema()``, for /ctms/<email_id>."""
+    return create_model(
+        "CTMSSparseSingleResponse",
+        __base__=sparse_response_schema(fieldset),
+        status=(Literal["ok"], Field(default="ok", description="Request was successful")),
+    )
+
+
+@lru_cache(maxsize=256)
+def sparse_bulk_response_schema(fieldset: ContactFieldset) -> type[CTMSBulkResponse]:
+    """Same as ``sparse_response_schema()``, for GET /updates."""
+    return create_model(
+        "CTMSSparseBulkResponse",
+        __base__=CTMSBulkResponse,
+        items=(list[sparse_response_schema(fieldset)], ...),
+    )
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from pydantic import UUID4, ConfigDict, Field, model_validator
+from functools import cache
+
+from pydantic import UUID4, ConfigDict, Field, create_model, model_validator
 
 from .base import ComparableBase
 from .common import AnyUrlString, ZeroOffsetDatetime
@@ -38,35 +40,7 @@ class WaitlistBase(ComparableBase):
         Once waitlists will have been migrated to a full N-N relationship,
         this will be the only remaining VPN specific piece of code.
         """
-        if self.name == "relay":
-
-            class RelayFieldsSchema(ComparableBase):
-                geo: str | None = CountryField()
-                model_config = ConfigDict(extra="forbid")
-
-            RelayFieldsSchema(**self.fields)
-
-        elif self.name == "vpn":
-
-            class VPNFieldsSchema(ComparableBase):
-                geo: str | None = CountryField()
-                platform: str | None = PlatformField()
-                model_config = ConfigDict(extra="forbid")
-
-            VPNFieldsSchema(**self.fields)
-
-        else:
-            # Default schema for any waitlist.
-            # Only the known fields are validated. Any extra field would
-            # be accepted as is.
-            # This should allow us to onboard most waitlists without specific
-            # code change and service redeployment.
-            class DefaultFieldsSchema(ComparableBase):
-                geo: str | None = CountryField()
-                platform: str | None = PlatformField()
-
-            DefaultFieldsSchema(**self.fields)
-
+        waitlist_fields_schemas().get(self.name, DefaultFieldsSchema).model_validate(self.fields)
         return self
 
     model_config = ConfigDict(from_attributes=True)
@@ -116,6 +90,68 @@ def PlatformField():
     )
 
 
+class DefaultFieldsSchema(ComparableBase):
+    """
+    Default schema for the fields of any waitlist.
+
+    Only the known fields are validated. Any extra field would be accepted
+    as is. This should allow us to onboard most waitlists without specific
+    code change and service redeployment.
+    """
+
+    geo: str | None = CountryField()
+    platform: str | None = PlatformField()
+
+
+class KnownFieldsSchema(ComparableBase):
+    """Base schema for the fields of specific waitlists, where other fields are rejected."""
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class RelayFieldsSchema(KnownFieldsSchema):
+    geo: str | None = CountryField()
+
+
+class VPNFieldsSchema(KnownFieldsSchema):
+    geo: str | None = CountryField()
+    platform: str | None = PlatformField()
+
+
+# The schemas of the fields of the built-in waitlists, by waitlist name.
+BUILTIN_WAITLIST_FIELDS_SCHEMAS: dict[str, type[ComparableBase]] = {
+    "relay": RelayFieldsSchema,
+    "vpn": VPNFieldsSchema,
+}
+
+
+def build_waitlist_fields_schemas(rules: dict[str, dict[str, int]]) -> dict[str, type[ComparableBase]]:
+    """
+    Return the schemas of the waitlist fields, built-in and from configuration.
+
+    ``rules`` maps waitlist names to their fields and maximum lengths, like
+    ``{"new-product": {"geo": 100, "platform": 100}}``. The fields are
+    optional strings, and other fields are rejected, like for VPN and Relay.
+    """
+    schemas = dict(BUILTIN_WAITLIST_FIELDS_SCHEMAS)
+    for name, max_lengths in rules.items():
+        fields = {field: (str | None, Field(default=None, max_length=max_length)) for field, max_length in max_lengths.items()}
+        schemas[name] = create_model("ConfiguredFieldsSchema", __base__=KnownFieldsSchema, **fields)
+    return schemas
+
+
+@cache
+def waitlist_fields_schemas() -> dict[str, type[ComparableBase]]:
+    """
+    Return the schemas of the waitlist fields, by waitlist name, built on first use
+    from ``CTMS_WAITLIST_FIELDS``. Other waitlists use ``DefaultFieldsSchema``.
+    """
+    # ctms.config imports the schemas.
+    from ctms.config import WaitlistFieldsSettings  # noqa: PLC0415
+
+    return build_waitlist_fields_schemas(WaitlistFieldsSettings().waitlist_fields)
+
+
 class RelayWaitlistSchema(ComparableBase):
     """
     The Mozilla Relay Waitlist schema for the read-only `relay_waitlist` field.
@@ -0,0 +1,118 @@
+"""
+Serialize contacts to JSON, straight from the database models.
+
+Contacts are validated when written, so building the ``CTMSResponse`` models
+again for every read is redundant. These functions produce the same JSON as
+the response models, without validation, for the read endpoints.
+"""
+
+from datetime import date
+from typing import Any
+from uuid import UUID
+
+from pydantic_core import to_json
+
+from ctms.schemas import (
+    AddOnsSchema,
+    CTMSBulkResponse,
+    EmailSchema,
+    FirefoxAccountsSchema,
+    MozillaFoundationSchema,
+)
+from ctms.schemas.newsletter import NewsletterTimestampedSchema
+from ctms.schemas.waitlist import RelayWaitlistSchema, VpnWaitlistSchema, WaitlistTimestampedSchema
+
+# The fields of each part, in the order of the response models.
+EMAIL_FIELDS = tuple(EmailSchema.model_fields)
+AMO_FIELDS = tuple(AddOnsSchema.model_fields)
+FXA_FIELDS = tuple(FirefoxAccountsSchema.model_fields)
+MOFO_FIELDS = tuple(MozillaFoundationSchema.model_fields)
+NEWSLETTER_FIELDS = tuple(NewsletterTimestampedSchema.model_fields)
+WAITLIST_FIELDS = tuple(WaitlistTimestampedSchema.model_fields)
+
+# Returned when the contact has no such related row.
+DEFAULT_AMO = AddOnsSchema().model_dump(mode="json")
+DEFAULT_FXA = FirefoxAccountsSchema().model_dump(mode="json")
+DEFAULT_MOFO = MozillaFoundationSchema().model_dump(mode="json")
+DEFAULT_VPN_WAITLIST = VpnWaitlistSchema().model_dump(mode="json")
+DEFAULT_RELAY_WAITLIST = RelayWaitlistSchema().model_dump(mode="json")
+
+
+def _json_value(value: Any) -> Any:
+    # Timestamps are serialized with ``isoformat()``, like ``ZeroOffsetDatetime``.
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def _part(obj: Any, fields: tuple[str, ...]) -> dict[str, Any]:
+    return {field: _json_value(getattr(obj, field)) for field in fields}
+
+
+def contact_dict(email: Any) -> dict[str, Any]:
+    """
+    Return the ``CTMSResponse`` of a contact, as JSON-compatible values.
+
+    ``email`` is an ``Email`` model with all its related data loaded, or a
+    ``ContactSchema``, since both have the same attributes.
+    """
+    # ``Email`` has its columns on itself, ``ContactSchema`` on ``.email``.
+    main = getattr(email, "email", email)
+    waitlists = [_part(waitlist, WAITLIST_FIELDS) for waitlist in email.waitlists]
+
+    # Read-only fields for retro-compatibility, see ``CTMSResponse.legacy_waitlists()``.
+    vpn_waitlist = DEFAULT_VPN_WAITLIST
+    relay_waitlist = DEFAULT_RELAY_WAITLIST
+    for waitlist in waitlists:
+        if not waitlist["subscribed"]:
+            continue
+        fields = waitlist["fields"]
+        if waitlist["name"] == "vpn":
+            vpn_waitlist = {"geo": fields.get("geo"), "platform": fields.get("platform")}
+        if waitlist["name"].startswith("relay") and relay_waitlist["geo"] is None:
+            relay_waitlist = {"geo": fields.get("geo")}
+
+    return {
+        "amo": _part(email.amo, AMO_FIELDS) if email.amo else DEFAULT_AMO,
+        "email": _part(main, EMAIL_FIELDS),
+        "fxa": _part(email.fxa, FXA_FIELDS) if email.fxa else DEFAULT_FXA,
+        "mofo": _part(email.mofo, MOFO_FIELDS) if email.mofo else DEFAULT_MOFO,
+        "newsletters": [_part(newsletter, NEWSLETTER_FIELDS) for newsletter in email.newsletters],
+        "waitlists": waitlists,
+        "vpn_waitlist": vpn_waitlist,
+        "relay_waitlist": relay_waitlist,
+    }
+
+
+def contact_json(email: Any) -> bytes:
+    """Return the ``CTMSResponse`` of a contact, serialized."""
+    return to_json(contact_dict(email))
+
+
+def single_response_json(email: Any) -> bytes:
+    """Return the ``CTMSSingleResponse`` of a contact, serialized."""
+    return to_json({**contact_dict(email), "status": "ok"})
+
+
+def single_response_from_contact_json(content: bytes) -> bytes:
+    """Same as ``single_response_json()``, from the output of ``contact_json()``."""
+    return content[:-1] + b',"status":"ok"}'
+
+
+def contacts_from_contact_json(contents: list[bytes]) -> bytes:
+    """Same as ``contacts_json()``, from the outputs of ``contact_json()``."""
+    return b"[" + b",".join(contents) + b"]"
+
+
+def contacts_json(emails: list[Any]) -> bytes:
+    """Return the list of ``CTMSResponse`` of contacts, serialized."""
+    return to_json([contact_dict(email) for email in emails])
+
+
+def bulk_response_json(emails: list[Any], **params: Any) -> bytes:
+    """Return the ``CTMSBulkResponse`` of a page of contacts, serialized."""
+    response = CTMSBulkResponse(items=[], **params).model_dump(mode="json")
+    response["items"] = [contact_dict(email) for email in emails]
+    return to_json(response)
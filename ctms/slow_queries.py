@@ -0,0 +1,130 @@
+"""Log the slow SQL statements, with a sample of their plans."""
+
+import contextvars
+import json
+import logging
+import random
+import re
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from sqlalchemy import URL, Connection, Engine, create_engine
+from sqlalchemy.pool import NullPool
+
+logger = logging.getLogger(__name__)
+
+WHITESPACE_RE = re.compile(r"\s+")
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r"(?<![\w$%])-?\d+(?:\.\d+)?\b")
+# Lists of placeholders, like the IN clauses of lookups.
+PLACEHOLDERS_RE = re.compile(r"\((?:\s*(?:%\(\w+\)s|%s|\$\d+)\s*,)+\s*(?:%\(\w+\)s|%s|\$\d+)\s*\)")
+
+
+def normalize_sql(statement: str) -> str:
+    """Return the statement on one line, without literal values, and with lists of placeholders collapsed."""
+    statement = WHITESPACE_RE.sub(" ", statement).strip()
+    statement = STRING_RE.sub("?", statement)
+    statement = NUMBER_RE.sub("?", statement)
+    return PLACEHOLDERS_RE.sub("(...)", statement)
+
+
+def redact_parameters(parameters: Any) -> Any:
+    """Return the types of the parameters, without their values."""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, list | tuple):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def is_explainable(statement: str) -> bool:
+    """Return whether the statement only reads, without locking rows, so that its plan can be captured."""
+    words = statement.lstrip().upper()
+    return words.startswith("SELECT") and " FOR UPDATE" not in words and " FOR SHARE" not in words
+
+
+class SlowQueryLog:
+    """
+    Log the statements slower than ``threshold_s``, and the plan of some of them.
+
+    The plan of a fraction ``explain_rate`` of the slow SELECT statements is
+    captured with ``EXPLAIN`` in a background thread, one at a time, on a
+    separate connection that is not instrumented (nor taken from the pool of the
+    application). Statements of async engines are logged without their plan,
+    since their parameters are in the asyncpg format.
+
+    With ``analyze``, the statements are run again under ``EXPLAIN (ANALYZE,
+    BUFFERS)``, in a transaction that is rolled back. A SELECT can still have
+    side effects that are not rolled back, like calls to ``nextval()``.
+    """
+
+    def __init__(
+        self,
+        threshold_s: float | None,
+        explain_rate: float = 0.0,
+        analyze: bool = False,
+        rand: Callable[[], float] = random.random,
+    ):
+        self.threshold_s = threshold_s
+        self.explain_rate = explain_rate
+        self.analyze = analyze
+        self.rand = rand
+        self._executor: ThreadPoolExecutor | None = None
+        self._explaining = threading.Lock()
+        self._explain_engines: dict[URL, Engine] = {}
+
+    def __bool__(self) -> bool:
+        return self.threshold_s is not None
+
+    def check(self, conn: Connection, statement: str, parameters: Any, duration_s: float, path_template: str | None) -> None:
+        """Log the statement if it was slow."""
+        if self.threshold_s is None or duration_s < self.threshold_s:
+            return
+        sql = normalize_sql(statement)
+        logger.warning(
+            "Slow SQL statement",
+            extra={
+                "sql": sql,
+                "params": redact_parameters(parameters),
+                "duration_ms": round(duration_s * 1000),
+                "path_template": path_template,
+            },
+        )
+        if self.explain_rate and self.rand() < self.explain_rate and is_explainable(statement) and not conn.dialect.is_async:
+            self.explain_in_background(conn, statement, parameters, sql, path_template)
+
+    def explain_in_background(self, conn: Connection, statement: str, parameters: Any, sql: str, path_template: str | None) -> None:
+        """Capture the plan of the statement in a background thread, unless one is being captured."""
+        if not self._explaining.acquire(blocking=False):
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+        # Keep the request ID of the logs.
+        context = contextvars.copy_context()
+        self._executor.submit(context.run, self.explain, conn.engine.url, statement, parameters, sql, path_template)
+
+    def explain(self, url: URL, statement: str, parameters: Any, sql: str, path_template: str | None) -> None:
+        """Log the plan of the statement, captured on a separate connection and rolled back."""
+        try:
+            engine = self._explain_engines.get(url)
+            if engine is None:
+                engine = self._explain_engines[url] = create_engine(url, poolclass=NullPool)
+            with engine.connect() as explain_conn:
+                options = "ANALYZE, BUFFERS, FORMAT JSON" if self.analyze else "FORMAT JSON"
+                rows = explain_conn.exec_driver_sql(f"EXPLAIN ({options}) {statement}", parameters).all()
+                explain_conn.rollback()
+            plan = rows[0][0]
+            logger.warning(
+                "Slow SQL statement plan",
+                extra={
+                    "sql": sql,
+                    "path_template": path_template,
+                    "plan": plan if isinstance(plan, str) else json.dumps(plan),
+                },
+            )
+        except Exception as exc:
+            logger.exception(exc)
+        finally:
+            self._explaining.release()
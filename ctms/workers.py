@@ -0,0 +1,201 @@
+"""
+Serve the application with several worker processes, forked from a preloaded parent.
+
+Import this module after the environment of the workers is set up, since it
+imports the database engines and the metrics.
+"""
+
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+import time
+
+import uvicorn
+
+from ctms.config import Settings
+from ctms.database import dispose_engines_after_fork
+from ctms.metrics import mark_process_dead
+
+logger = logging.getLogger(__name__)
+
+# How often the workers check their memory usage, in seconds.
+RSS_CHECK_INTERVAL = 5
+
+# The exit status of a worker that could not start serving. Like in gunicorn,
+# it stops the server instead of replacing the worker, since the others are
+# likely to fail the same way.
+WORKER_BOOT_ERROR = 3
+
+# The delay before replacing a worker that failed, doubled after each
+# consecutive failure, in seconds. It is reset by a worker that exits cleanly,
+# or that fails after serving for long enough.
+RESPAWN_BACKOFF_INITIAL = 0.5
+RESPAWN_BACKOFF_MAX = 10
+RESPAWN_BACKOFF_RESET = 60
+
+
+def respawn_delay(failures: int) -> float:
+    """Return how long to wait before replacing a worker, after consecutive failures."""
+    if failures == 0:
+        return 0
+    return min(RESPAWN_BACKOFF_MAX, RESPAWN_BACKOFF_INITIAL * 2 ** (failures - 1))
+
+
+def current_rss() -> int:
+    """Return the resident memory of this process, in bytes (Linux only, 0 elsewhere)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return 0
+
+
+def uvicorn_config(settings: Settings, app) -> uvicorn.Config:
+    """Return the configuration of the uvicorn servers."""
+    return uvicorn.Config(
+        app,
+        host=settings.host,
+        port=settings.port,
+        loop=settings.uvicorn_loop,
+        http=settings.uvicorn_http,
+        timeout_graceful_shutdown=settings.worker_shutdown_timeout_in_seconds,
+        log_config=None,
+    )
+
+
+class WorkerManager:
+    """
+    Fork the workers, replace the ones that exit, and stop them on SIGTERM.
+
+    The application is imported by the parent before forking, so that the
+    workers share its memory copy-on-write. Workers stop gracefully after
+    serving ``worker_max_requests`` requests (give or take the jitter), or when
+    their memory exceeds ``worker_max_rss_in_mb``, and are replaced. Workers
+    that fail are replaced with a backoff, and all of them are stopped if one
+    fails to boot.
+    """
+
+    def __init__(self, settings: Settings, app):
+        self.settings = settings
+        self.app = app
+        self.config = uvicorn_config(settings, app)
+        self.sockets: list[socket.socket] = []
+        # The start time of the workers, by pid.
+        self.workers: dict[int, float] = {}
+        self.failures = 0
+        self.stopping = False
+        self.exit_status = 0
+
+    def run(self) -> int:
+        """Serve until SIGTERM or SIGINT, then wait for the workers to finish, and return the exit status."""
+        self.sockets = [self.config.bind_socket()]
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+        logger.info("Starting %s workers", self.settings.workers)
+        for _ in range(self.settings.workers):
+            self.spawn()
+        while self.workers:
+            try:
+                pid, status = os.wait()
+            except InterruptedError:
+                continue
+            except ChildProcessError:
+                break
+            self.reap(pid, status)
+            if not self.stopping:
+                time.sleep(respawn_delay(self.failures))
+            if not self.stopping:
+                self.spawn()
+        return self.exit_status
+
+    def handle_stop(self, signum, frame) -> None:
+        self.stop()
+
+    def stop(self) -> None:
+        """Ask the workers to stop gracefully, and kill those still running after the timeout."""
+        if self.stopping:
+            return
+        self.stopping = True
+        logger.info("Stopping %s workers", len(self.workers))
+        for pid in list(self.workers):
+            self.signal_worker(pid, signal.SIGTERM)
+        timer = threading.Timer(self.settings.worker_shutdown_timeout_in_seconds + 5, self.kill_workers)
+        timer.daemon = True
+        timer.start()
+
+    def kill_workers(self) -> None:
+        for pid in list(self.workers):
+            logger.warning("Killing worker %s, still running after the shutdown timeout", pid)
+            self.signal_worker(pid, signal.SIGKILL)
+
+    def signal_worker(self, pid: int, signum: int) -> None:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            self.workers.pop(pid, None)
+
+    def reap(self, pid: int, status: int) -> None:
+        """Forget a worker that exited, and stop all of them if it failed to boot."""
+        started_at = self.workers.pop(pid, None)
+        mark_process_dead(pid)
+        if self.stopping:
+            return
+        exit_code = os.waitstatus_to_exitcode(status)
+        if exit_code == WORKER_BOOT_ERROR:
+            logger.error("Worker %s failed to boot, stopping", pid)
+            self.exit_status = WORKER_BOOT_ERROR
+            self.stop()
+            return
+        if exit_code == 0:
+            self.failures = 0
+        elif started_at is not None and time.monotonic() - started_at > RESPAWN_BACKOFF_RESET:
+            self.failures = 1
+        else:
+            self.failures += 1
+        logger.info("Worker %s exited with status %s, replacing it in %s seconds", pid, exit_code, respawn_delay(self.failures))
+
+    def spawn(self) -> None:
+        """Fork a worker."""
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = time.monotonic()
+            return
+        try:
+            exit_status = self.run_worker()
+        except BaseException as exc:
+            # A worker never returns to the loop of the parent.
+            logger.exception(exc)
+            os._exit(1)
+        os._exit(exit_status)
+
+    def run_worker(self) -> int:
+        """Serve requests in the forked worker, until stopped or recycled, and return its exit status."""
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        dispose_engines_after_fork()
+        random.seed()
+
+        max_requests = self.settings.worker_max_requests
+        if max_requests:
+            max_requests += random.randint(0, self.settings.worker_max_requests_jitter)
+        self.config.limit_max_requests = max_requests
+        server = uvicorn.Server(self.config)
+
+        if self.settings.worker_max_rss_in_mb:
+            threading.Thread(target=self.watch_memory, args=(server,), daemon=True).start()
+        server.run(sockets=self.sockets)
+        # The server returns without starting when the application startup fails.
+        return 0 if server.started else WORKER_BOOT_ERROR
+
+    def watch_memory(self, server: uvicorn.Server) -> None:
+        """Stop the server gracefully when the memory of the worker exceeds the threshold."""
+        max_rss = self.settings.worker_max_rss_in_mb * 1024 * 1024
+        while not server.should_exit:
+            time.sleep(RSS_CHECK_INTERVAL)
+            rss = current_rss()
+            if rss > max_rss:
+                logger.info("Worker %s uses %s MB, recycling it", os.getpid(), rss // (1024 * 1024))
+                server.should_exit = True
@@ -0,0 +1,62 @@
+"""Add auth generation, bumped on API client and permission changes
+
+Revision ID: 5d1c7e9a2b43
+Revises: 2b00e4069aea
+Create Date: 2026-10-16 10:12:41.218304
+
+"""
+# pylint: disable=no-member invalid-name
+# no-member is triggered by alembic.op, which has dynamically added functions
+# invalid-name is triggered by migration file names with a date prefix
+# invalid-name is triggered by top-level alembic constants like revision instead of REVISION
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5d1c7e9a2b43"  # pragma: allowlist secret
+down_revision = "2b00e4069aea"  # pragma: allowlist secret
+branch_labels = None
+depends_on = None
+
+# The events of each table that change who can access the API. Updates of
+# ``api_client.last_access`` (written in the background) do not.
+TRIGGERS = {
+    "api_client": "UPDATE OF client_id, email, enabled, hashed_secret OR DELETE OR TRUNCATE",
+    "api_client_roles": "INSERT OR UPDATE OR DELETE OR TRUNCATE",
+    "roles": "INSERT OR UPDATE OR DELETE OR TRUNCATE",
+    "permissions": "INSERT OR UPDATE OR DELETE OR TRUNCATE",
+    "role_permissions": "INSERT OR UPDATE OR DELETE OR TRUNCATE",
+}
+
+
+def upgrade():
+    op.create_table(
+        "auth_generation",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("generation", sa.BigInteger(), server_default="0", nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.execute("INSERT INTO auth_generation (id, generation) VALUES (1, 0)")
+    op.execute(
+        """
+        CREATE FUNCTION bump_auth_generation() RETURNS trigger AS $$
+        BEGIN
+            UPDATE auth_generation SET generation = generation + 1 WHERE id = 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table, events in TRIGGERS.items():
+        op.execute(
+            f"CREATE TRIGGER {table}_bump_auth_generation AFTER {events} ON {table} "
+            "FOR EACH STATEMENT EXECUTE FUNCTION bump_auth_generation()"
+        )
+
+
+def downgrade():
+    for table in TRIGGERS:
+        op.execute(f"DROP TRIGGER {table}_bump_auth_generation ON {table}")
+    op.execute("DROP FUNCTION bump_auth_generation()")
+    op.drop_table("auth_generation")
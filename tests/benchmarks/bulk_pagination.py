@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Measure the latency of ``GET /updates`` pages at increasing depths into a time range.
+
+Contacts are inserted in a transaction that is rolled back at the end, in the
+database configured by ``CTMS_DB_URL``. With keyset pagination, the latency of
+a page should not depend on how many pages were read before it.
+
+    python -m tests.benchmarks.bulk_pagination --contacts 200000 --limit 1000
+"""
+
+import statistics
+import time
+from datetime import UTC, datetime, timedelta
+
+import click
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from ctms.config import Settings
+from ctms.crud import get_bulk_contacts
+
+START_TIME = datetime(2020, 1, 1, tzinfo=UTC)
+
+
+def insert_contacts(connection, contacts: int, per_timestamp: int):
+    """Insert minimal contacts, ``per_timestamp`` of them sharing each update timestamp."""
+    connection.execute(
+        text(
+            """
+            INSERT INTO emails (email_id, primary_email, email_format, email_lang, double_opt_in, has_opted_out_of_email, update_timestamp)
+            SELECT gen_random_uuid(),
+                   'bench-' || i || '@example.com',
+                   'H', 'en', false, false,
+                   :start_time + (i / :per_timestamp) * interval '1 second'
+            FROM generate_series(0, :contacts - 1) AS i
+            """
+        ),
+        {"start_time": START_TIME, "contacts": contacts, "per_timestamp": per_timestamp},
+    )
+    connection.execute(text("ANALYZE emails"))
+
+
+@click.command()
+@click.option("--contacts", default=100_000, help="Number of contacts to insert.")
+@click.option("--per-timestamp", default=50, help="Number of contacts sharing the same update timestamp.")
+@click.option("--limit", default=1000, help="Page size.")
+@click.option("--buckets", default=10, help="Number of depth buckets to report.")
+def main(contacts: int, per_timestamp: int, limit: int, buckets: int):
+    engine = create_engine(Settings().db_url)
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            insert_contacts(connection, contacts, per_timestamp)
+            db = Session(bind=connection)
+            end_time = START_TIME + timedelta(days=365)
+
+            latencies = []
+            seen = 0
+            start_time, after_email_id = START_TIME, None
+            while True:
+                before = time.perf_counter()
+                page = get_bulk_contacts(db, start_time=start_time, end_time=end_time, limit=limit, after_email_id=after_email_id)
+                latencies.append(time.perf_counter() - before)
+                db.expunge_all()
+                if not page:
+                    break
+                seen += len(page)
+                start_time, after_email_id = page[-1].email.update_timestamp, str(page[-1].email.email_id)
+        finally:
+            transaction.rollback()
+
+    click.echo(f"Read {seen} contacts in {len(latencies)} pages of {limit}")
+    size = max(1, len(latencies) // buckets)
+    click.echo(f"{'pages':>15} {'median ms':>10} {'p95 ms':>10}")
+    for i in range(0, len(latencies), size):
+        chunk = sorted(latencies[i : i + size])
+        p95 = chunk[int(0.95 * (len(chunk) - 1))]
+        click.echo(f"{i:>7}-{i + len(chunk) - 1:<7} {statistics.median(chunk) * 1000:>10.2f} {p95 * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+#!/usr/bin/env python
+"""
+Measure the throughput, latency, and SQL statements per request of the CTMS API
+endpoints under concurrent load, end to end over HTTP.
+
+The application is served by uvicorn in a subprocess, on the database
+configured by ``CTMS_DB_URL``, so that the load generator does not compete with
+it for the GIL. Contacts (with all their alternate IDs) and an API client are
+created with ``tests.factories``, and deleted at the end, with the contacts
+created by the benchmark (and the admin role, if it did not exist). They still
+share the CPUs, so compare results measured on the same machine.
+
+Each scenario runs ``--concurrency`` clients for ``--duration`` seconds. The
+results are written as JSON with ``--output``, and compared to the results of
+another commit with ``--compare``, which exits with an error on regressions.
+
+    python -m tests.benchmarks.http_load --contacts 1000 --concurrency 10 --output before.json
+    python -m tests.benchmarks.http_load --contacts 1000 --concurrency 10 --output after.json --compare before.json
+"""
+
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime, timedelta
+from socket import socket
+from typing import Any
+from uuid import uuid4
+
+import click
+import factory
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+
+from ctms import models
+from ctms.crud import create_api_client, delete_contact
+from ctms.database import ScopedSessionLocal, SessionLocal
+from ctms.permissions import ADMIN_ROLE_NAME
+from ctms.schemas import ApiClientSchema
+from tests.factories.models import EmailFactory
+from tests.helpers import assign_role
+
+ALTERNATE_IDS = [
+    "primary_email",
+    "basket_token",
+    "sfdc_id",
+    "mofo_contact_id",
+    "mofo_email_id",
+    "amo_user_id",
+    "fxa_id",
+    "fxa_primary_email",
+]
+
+Scenario = Callable[[httpx.AsyncClient, dict[str, Any], dict[str, Any]], Awaitable[httpx.Response | None]]
+
+
+def seed(run_id: str, contacts: int) -> dict[str, Any]:
+    """Create the API client and the contacts of the benchmark, and return their IDs."""
+    client_id = f"ctms-bench-{run_id}"
+    secret = uuid4().hex
+    db = SessionLocal()
+    try:
+        # The role is only deleted at the end if the benchmark created it.
+        created_role = db.query(models.Roles).filter_by(name=ADMIN_ROLE_NAME).first() is None
+        create_api_client(db, ApiClientSchema(client_id=client_id, email=f"{client_id}@example.com", enabled=True), secret)
+        db.commit()
+        assign_role(db, client_id, ADMIN_ROLE_NAME)
+    finally:
+        db.close()
+
+    start = datetime.now(UTC) - timedelta(seconds=1)
+    emails = EmailFactory.create_batch(
+        contacts,
+        primary_email=factory.Sequence(lambda n: f"ctms-bench-{run_id}-{n}@example.com"),
+        sfdc_id=factory.LazyFunction(lambda: uuid4().hex[:18]),
+        newsletters=2,
+        with_fxa=True,
+        with_amo=True,
+        amo__user_id=factory.LazyFunction(lambda: uuid4().hex),
+        with_mofo=True,
+    )
+    seeded = [
+        {
+            "email_id": str(email.email_id),
+            "primary_email": email.primary_email,
+            "basket_token": str(email.basket_token),
+            "sfdc_id": email.sfdc_id,
+            "mofo_contact_id": email.mofo.mofo_contact_id,
+            "mofo_email_id": email.mofo.mofo_email_id,
+            "amo_user_id": email.amo.user_id,
+            "fxa_id": email.fxa.fxa_id,
+            "fxa_primary_email": email.fxa.primary_email,
+        }
+        for email in emails
+    ]
+    ScopedSessionLocal.remove()
+    return {
+        "client_id": client_id,
+        "secret": secret,
+        "created_role": created_role,
+        "contacts": seeded,
+        "created": [],
+        "start": start.isoformat(),
+    }
+
+
+def cleanup(run_id: str, created_role: bool) -> None:
+    """Delete the contacts and the API client of the benchmark, and the admin role if it created it."""
+    db = SessionLocal()
+    try:
+        email_ids = db.query(models.Email.email_id).filter(models.Email.primary_email.like(f"ctms-bench-{run_id}-%")).all()
+        for (email_id,) in email_ids:
+            delete_contact(db, email_id)
+        db.query(models.ApiClient).filter_by(client_id=f"ctms-bench-{run_id}").delete()
+        if created_role:
+            db.query(models.Roles).filter_by(name=ADMIN_ROLE_NAME).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def serve() -> tuple[subprocess.Popen, str]:
+    """Serve the application in a subprocess, and return it with its base URL once it accepts requests."""
+    with socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "ctms.app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"])
+    base_url = f"http://127.0.0.1:{port}"
+    while True:
+        if server.poll() is not None:
+            raise click.ClickException(f"The server exited with status {server.returncode}")
+        try:
+            httpx.get(f"{base_url}/metrics").raise_for_status()
+            return server, base_url
+        except httpx.TransportError:
+            time.sleep(0.1)
+
+
+async def token(client, data, state):
+    return await client.post(
+        "/token",
+        data={"grant_type": "client_credentials"},
+        auth=(data["client_id"], data["secret"]),
+    )
+
+
+async def get_by_email_id(client, data, state):
+    return await client.get(f"/ctms/{random.choice(data['contacts'])['email_id']}")
+
+
+def get_by_alternate_id(name: str) -> Scenario:
+    async def scenario(client, data, state):
+        return await client.get("/ctms", params={name: random.choice(data["contacts"])[name]})
+
+    return scenario
+
+
+async def updates(client, data, state):
+    """Read the pages of ``/updates`` one after the other, from the start of the seeded contacts."""
+    url = state.get("next") or httpx.URL("/updates", params={"start": data["start"], "limit": data["page_size"]})
+    response = await client.get(url)
+    next_url = response.json().get("next") if response.status_code == 200 else None
+    state["next"] = httpx.URL(next_url).raw_path.decode() if next_url else None
+    return response
+
+
+async def create(client, data, state):
+    primary_email = f"ctms-bench-{data['run_id']}-new-{uuid4().hex}@example.com"
+    response = await client.post("/ctms", json={"email": {"primary_email": primary_email}, "newsletters": [{"name": "mozilla-and-you"}]})
+    if response.status_code == 201:
+        data["created"].append({"email_id": response.json()["email"]["email_id"], "primary_email": primary_email})
+    return response
+
+
+async def replace(client, data, state):
+    if not data["created"]:
+        return None
+    contact = random.choice(data["created"])
+    return await client.put(
+        f"/ctms/{contact['email_id']}",
+        json={"email": {"email_id": contact["email_id"], "primary_email": contact["primary_email"], "first_name": uuid4().hex[:8]}},
+    )
+
+
+async def patch(client, data, state):
+    if not data["created"]:
+        return None
+    contact = random.choice(data["created"])
+    return await client.patch(f"/ctms/{contact['email_id']}", json={"email": {"last_name": uuid4().hex[:8]}})
+
+
+async def delete(client, data, state):
+    if not data["created"]:
+        return None
+    contact = data["created"].pop()
+    return await client.delete(f"/ctms/{contact['primary_email']}")
+
+
+# The scenarios, in the order they run, with the path template of their route.
+# Writes run last, and only on the contacts created by the ``create`` scenario.
+SCENARIOS: dict[str, tuple[Scenario, str]] = {
+    "token": (token, "/token"),
+    "get_by_email_id": (get_by_email_id, "/ctms/{email_id}"),
+    **{f"get_by_{name}": (get_by_alternate_id(name), "/ctms") for name in ALTERNATE_IDS},
+    "updates": (updates, "/updates"),
+    "create": (create, "/ctms"),
+    "replace": (replace, "/ctms/{email_id}"),
+    "patch": (patch, "/ctms/{email_id}"),
+    "delete": (delete, "/ctms/{primary_email}"),
+}
+
+
+def statements_count(base_url: str, path_template: str) -> float:
+    """Return the SQL statements executed by the requests of the route so far, from the metrics of the server."""
+    response = httpx.get(f"{base_url}/metrics")
+    response.raise_for_status()
+    for family in text_string_to_metric_families(response.text):
+        for sample in family.samples:
+            if sample.name == "ctms_request_db_statements_sum" and sample.labels.get("path_template") == path_template:
+                return sample.value
+    return 0
+
+
+async def run_scenario(base_url: str, access_token: str, scenario: Scenario, data: dict[str, Any], concurrency: int, duration: float):
+    """Send the requests of the scenario with concurrent clients, and return their latencies and errors."""
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal errors
+        state: dict[str, Any] = {}
+        while time.perf_counter() < deadline:
+            before = time.perf_counter()
+            response = await scenario(client, data, state)
+            if response is None:
+                return
+            latencies.append(time.perf_counter() - before)
+            if response.status_code >= 400:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    headers = {"Authorization": f"Bearer {access_token}"}
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float, statements: float) -> dict[str, Any]:
+    latencies = sorted(latencies)
+
+    def percentile(p: float) -> float | None:
+        return round(latencies[int(p * (len(latencies) - 1))] * 1000, 2) if latencies else None
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "queries_per_request": round(statements / len(latencies), 2) if latencies else None,
+    }
+
+
+def compare(before: dict[str, Any], after: dict[str, Any], tolerance: float) -> list[str]:
+    """Return the regressions of ``after``: more queries per request, or a lower throughput or higher p95 beyond the tolerance."""
+    regressions = []
+    for name, result in after["scenarios"].items():
+        previous = before["scenarios"].get(name)
+        if not previous or not previous["requests"] or not result["requests"]:
+            continue
+        if result["queries_per_request"] > previous["queries_per_request"]:
+            regressions.append(f"{name}: {previous['queries_per_request']} -> {result['queries_per_request']} queries per request")
+        if result["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']} -> {result['throughput_rps']} requests/s")
+        if result["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']} -> {result['p95_ms']} ms")
+    return regressions
+
+
+def current_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@click.command()
+@click.option("--contacts", default=1000, help="Number of contacts to create.")
+@click.option("--concurrency", default=10, help="Number of concurrent clients.")
+@click.option("--duration", default=10.0, help="Duration of each scenario, in seconds.")
+@click.option("--page-size", default=100, help="Page size of the /updates scenario.")
+@click.option("--scenario", "selected", multiple=True, type=click.Choice(list(SCENARIOS)), help="Scenarios to run (default: all).")
+@click.option("--output", type=click.Path(dir_okay=False), help="Write the results to this JSON file.")
+@click.option("--compare", "baseline", type=click.File(), help="Compare to the results in this JSON file.")
+@click.option("--tolerance", default=0.1, help="Relative change of throughput or p95 latency reported as a regression.")
+def main(contacts, concurrency, duration, page_size, selected, output, baseline, tolerance):
+    run_id = uuid4().hex[:8]
+    click.echo(f"Creating {contacts} contacts")
+    data = seed(run_id, contacts)
+    data.update(run_id=run_id, page_size=page_size)
+    server, base_url = serve()
+    try:
+        response = httpx.post(f"{base_url}/token", data={"grant_type": "client_credentials"}, auth=(data["client_id"], data["secret"]))
+        response.raise_for_status()
+        access_token = response.json()["access_token"]
+
+        results = {}
+        click.echo(f"{'scenario':>26} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}")
+        for name in selected or SCENARIOS:
+            scenario, path_template = SCENARIOS[name]
+            statements_before = statements_count(base_url, path_template)
+            latencies, errors, elapsed = asyncio.run(run_scenario(base_url, access_token, scenario, data, concurrency, duration))
+            statements_after = statements_count(base_url, path_template)
+            result = results[name] = summarize(latencies, errors, elapsed, statements_after - statements_before)
+            click.echo(
+                f"{name:>26} {result['requests']:>9} {result['errors']:>7} {result['throughput_rps']:>9}"
+                f" {result['p50_ms']!s:>9} {result['p95_ms']!s:>9} {result['p99_ms']!s:>9} {result['queries_per_request']!s:>8}"
+            )
+    finally:
+        server.terminate()
+        server.wait()
+        cleanup(run_id, data["created_role"])
+
+    report = {
+        "commit": current_commit(),
+        "created_at": datetime.now(UTC).isoformat(),
+        "parameters": {"contacts": contacts, "concurrency": concurrency, "duration": duration, "page_size": page_size},
+        "scenarios": results,
+    }
+    if output:
+        with open(output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    if baseline:
+        regressions = compare(json.load(baseline), report, tolerance)
+        for regression in regressions:
+            click.echo(f"Regression: {regression}")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
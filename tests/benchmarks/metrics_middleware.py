@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+"""
+Measure the per-request overhead of the metrics middleware, written with
+``@app.middleware("http")`` and a loop over the routes (as before) or as a
+pure ASGI middleware reading the matched route (as now).
+
+Requests are sent directly to the ASGI application, on routes shaped like the
+CTMS API, and compared to the same application without metrics.
+
+    python -m tests.benchmarks.metrics_middleware --number 20000
+"""
+
+import asyncio
+import time
+from uuid import uuid4
+
+import click
+from fastapi import FastAPI, Request
+from prometheus_client import CollectorRegistry
+from starlette.routing import Match
+
+from ctms.auth import auth_info_context
+from ctms.metrics import MetricsMiddleware, emit_response_metrics, get_metrics, init_metrics, set_metrics
+
+PATHS = [
+    "/",
+    "/token",
+    "/ctms",
+    "/ctms/lookup",
+    "/ctms/batch",
+    "/ctms/{email_id}",
+    "/updates",
+    "/updates/stream",
+    "/identities",
+    "/identity/{email_id}",
+    "/metrics",
+    "/__heartbeat__",
+    "/__lbheartbeat__",
+    "/__version__",
+]
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+    for path in PATHS:
+        app.add_api_route(path, endpoint=lambda: {"ok": True}, methods=["GET"])
+    return app
+
+
+def with_http_middleware(app: FastAPI) -> FastAPI:
+    """The previous implementation."""
+
+    @app.middleware("http")
+    async def send_metrics(request: Request, call_next):
+        path_template = None
+        for route in request.app.routes:
+            match, _ = route.matches(request.scope)
+            if match == Match.FULL:
+                path_template = str(route.path)
+                break
+
+        start_time = time.monotonic()
+        response = None
+        try:
+            response = await call_next(request)
+        finally:
+            duration_s = round(time.monotonic() - start_time, 3)
+            emit_response_metrics(
+                path_template=path_template,
+                method=request.method,
+                duration_s=duration_s,
+                status_code=response.status_code if response else 500,
+                client_id=auth_info_context.get().get("client_id"),
+                metrics=get_metrics(),
+            )
+
+        return response
+
+    return app
+
+
+def with_asgi_middleware(app: FastAPI) -> FastAPI:
+    app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def request(app: FastAPI, path: str) -> None:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("localhost", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def measure(app: FastAPI, path: str, number: int) -> float:
+    """Return the mean duration of a request, in seconds."""
+    for _ in range(100):
+        await request(app, path)
+    start = time.perf_counter()
+    for _ in range(number):
+        await request(app, path)
+    return (time.perf_counter() - start) / number
+
+
+@click.command()
+@click.option("--number", default=10_000, help="Number of requests per path and middleware.")
+def main(number: int):
+    set_metrics(init_metrics(CollectorRegistry()))
+    apps = {
+        "none": make_app(),
+        "before": with_http_middleware(make_app()),
+        "after": with_asgi_middleware(make_app()),
+    }
+    paths = {"first route": "/", f"route {PATHS.index('/ctms/{email_id}') + 1}": f"/ctms/{uuid4()}"}
+
+    click.echo(f"{'path':>12} {'none µs':>10} {'before µs':>10} {'after µs':>10} {'overhead before':>16} {'overhead after':>15}")
+    for label, path in paths.items():
+        durations = {name: asyncio.run(measure(app, path, number)) for name, app in apps.items()}
+        before = durations["before"] - durations["none"]
+        after = durations["after"] - durations["none"]
+        click.echo(
+            f"{label:>12} {durations['none'] * 1e6:>10.2f} {durations['before'] * 1e6:>10.2f} {durations['after'] * 1e6:>10.2f}"
+            f" {before * 1e6:>16.2f} {after * 1e6:>15.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
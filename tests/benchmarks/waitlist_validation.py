@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+Measure the cost of validating one waitlist, with the schemas of its fields
+built on every validation (as before) or once at import (as now).
+
+    python -m tests.benchmarks.waitlist_validation --number 20000
+"""
+
+import timeit
+
+import click
+from pydantic import ConfigDict, model_validator
+
+from ctms.schemas.base import ComparableBase
+from ctms.schemas.waitlist import CountryField, PlatformField, WaitlistBase, WaitlistInSchema
+
+WAITLISTS = {
+    "vpn": {"name": "vpn", "fields": {"geo": "fr", "platform": "linux"}},
+    "relay": {"name": "relay", "fields": {"geo": "fr"}},
+    "default": {"name": "new-product", "fields": {"geo": "fr", "platform": "linux", "extra": "value"}},
+}
+
+
+class PerValidationWaitlistSchema(WaitlistBase):
+    """The previous implementation, that defines the schema of the fields in the validator."""
+
+    @model_validator(mode="after")
+    def check_fields(self):
+        if self.name == "relay":
+
+            class RelayFieldsSchema(ComparableBase):
+                geo: str | None = CountryField()
+                model_config = ConfigDict(extra="forbid")
+
+            RelayFieldsSchema(**self.fields)
+
+        elif self.name == "vpn":
+
+            class VPNFieldsSchema(ComparableBase):
+                geo: str | None = CountryField()
+                platform: str | None = PlatformField()
+                model_config = ConfigDict(extra="forbid")
+
+            VPNFieldsSchema(**self.fields)
+
+        else:
+
+            class DefaultFieldsSchema(ComparableBase):
+                geo: str | None = CountryField()
+                platform: str | None = PlatformField()
+
+            DefaultFieldsSchema(**self.fields)
+
+        return self
+
+
+@click.command()
+@click.option("--number", default=10_000, help="Number of validations per waitlist.")
+def main(number: int):
+    click.echo(f"{'waitlist':>10} {'before µs':>10} {'after µs':>10} {'speedup':>8}")
+    for label, data in WAITLISTS.items():
+        before = timeit.timeit(lambda data=data: PerValidationWaitlistSchema(**data), number=number) / number
+        after = timeit.timeit(lambda data=data: WaitlistInSchema(**data), number=number) / number
+        click.echo(f"{label:>10} {before * 1e6:>10.2f} {after * 1e6:>10.2f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
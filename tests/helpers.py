@@ -1,3 +1,7 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
 from ctms import models
 
 
@@ -11,3 +15,54 @@ def assign_role(db, api_client_id, role_name):
     api_client_role = models.ApiClientRoles(api_client_id=api_client_id, role_id=role.id)
     db.add(api_client_role)
     db.commit()
+
+
+@contextmanager
+def recorded_statements(db):
+    """Record the SQL statements executed on the contact tables within the block, without authentication."""
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if "api_client" not in statement and "auth_generation" not in statement and not statement.startswith(("SAVEPOINT", "RELEASE")):
+            statements.append(statement)
+
+    engine = db.get_bind().engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def reads_after_writes(statements):
+    """Return the SELECT statements executed after the first write."""
+    first_write = next(i for i, statement in enumerate(statements) if statement.startswith(("INSERT", "UPDATE", "DELETE")))
+    return [statement for statement in statements[first_write:] if statement.startswith("SELECT")]
+
+
+class FakeRedis:
+    """In-memory stand-in for the subset of ``redis.Redis`` used by the contact cache."""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def get(self, name):
+        return self.data.get(name)
+
+    def set(self, name, value, ex=None, nx=False):
+        if nx and self.data.get(name) is not None:
+            return None
+        self.data[name] = value
+        self.ttls[name] = ex
+        return True
+
+
+class FakeAsyncRedis(FakeRedis):
+    """In-memory stand-in for the subset of ``redis.asyncio.Redis`` used by the contact cache."""
+
+    async def get(self, name):
+        return super().get(name)
+
+    async def set(self, name, value, ex=None, nx=False):
+        return super().set(name, value, ex=ex, nx=nx)
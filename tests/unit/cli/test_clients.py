@@ -1,5 +1,6 @@
 from ctms import models
 from ctms.cli.main import cli
+from ctms.crud import get_auth_generation
 from ctms.permissions import ADMIN_ROLE_NAME
 
 # Tests for `ctms-cli clients list`
@@ -343,6 +344,17 @@ def test_disable_client(dbsession, clirunner, api_client_factory):
     assert c1.enabled is False
 
 
+def test_disable_client_bumps_auth_generation(dbsession, clirunner, api_client_factory):
+    """Test `ctms-cli clients disable` command invalidates the API client in the caches of all processes."""
+    c1 = api_client_factory(client_id="id_client1", email="client1@example.com", enabled=True)
+    generation = get_auth_generation(dbsession)
+
+    result = clirunner.invoke(cli, ["clients", "disable", "--yes", c1.client_id])
+
+    assert result.exit_code == 0
+    assert get_auth_generation(dbsession) > generation
+
+
 def test_disable_client_with_confirmation_declined(dbsession, clirunner, api_client_factory):
     """Test `ctms-cli clients disable` command when confirmation is declined."""
     c1 = api_client_factory(client_id="id_client1", email="client1@example.com", enabled=True)
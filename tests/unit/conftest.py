@@ -18,9 +18,11 @@ from pytest_factoryboy import register
 from sqlalchemy import create_engine
 from sqlalchemy_utils.functions import create_database, database_exists, drop_database
 
+from ctms import cache as cache_module
 from ctms import metrics as metrics_module
 from ctms import models, schemas
 from ctms.app import app
+from ctms.auth_generation import auth_generation_watcher
 from ctms.config import Settings
 from ctms.crud import (
     create_api_client,
@@ -33,10 +35,13 @@ from ctms.crud import (
     get_newsletters_by_email_id,
     get_waitlists_by_email_id,
 )
-from ctms.database import ScopedSessionLocal, SessionLocal
-from ctms.dependencies import get_api_client, get_db
+from ctms.database import ScopedSessionLocal, SessionLocal, instrument_engine
+from ctms.db_stats import db_stats_collector
+from ctms.dependencies import get_api_client, get_db, get_read_db
+from ctms.last_access import last_access_tracker
 from ctms.metrics import get_metrics
 from ctms.permissions import ADMIN_ROLE_NAME
+from ctms.replicas import replica_router
 from ctms.schemas import ApiClientSchema, ContactSchema
 from ctms.schemas.contact import ContactInSchema
 from tests import factories
@@ -114,6 +119,8 @@ def engine(pytestconfig):
         connect_args={"options": "-c timezone=utc"},
     )
 
+    instrument_engine(test_engine)
+
     cfg = alembic_config.Config(os.path.join(APP_FOLDER, "alembic.ini"))
     cfg.attributes["unit-tests"] = True
     cfg.attributes["connection"] = test_engine
@@ -166,6 +173,20 @@ def setup_admin_role(session_dbsession):
         session_dbsession.commit()
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Start every test with empty in-process caches."""
+    cache_module.api_client_cache.clear()
+    cache_module.permissions_cache.clear()
+    cache_module.verified_credentials_cache.clear()
+    cache_module.token_cache.clear()
+    last_access_tracker.clear()
+    replica_router.clear()
+    db_stats_collector.clear()
+    auth_generation_watcher.clear()
+    yield
+
+
 # Database models
 register(factories.models.ApiClientFactory)
 register(factories.models.ApiClientRolesFactory)
@@ -482,8 +503,10 @@ def anon_client(dbsession):
         yield dbsession
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     yield TestClient(app)
     app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_read_db, None)
 
 
 @pytest.fixture
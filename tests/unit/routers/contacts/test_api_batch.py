@@ -0,0 +1,287 @@
+"""Unit tests for POST /ctms/batch"""
+
+from unittest import mock
+from uuid import uuid4
+
+from sqlalchemy import event
+
+from ctms import models
+from ctms.dependencies import get_settings
+
+
+def count_statements(client, dbsession, payload):
+    """Post the batch, and return the response with the executed statements."""
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = dbsession.get_bind().engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        resp = client.post("/ctms/batch", json=payload)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return resp, [
+        statement
+        for statement in statements
+        if "api_client" not in statement and "auth_generation" not in statement and not statement.startswith(("SAVEPOINT", "RELEASE"))
+    ]
+
+
+def test_batch_mixed_operations(client, dbsession, email_factory):
+    """Creates, replacements and partial updates are applied together."""
+    replaced = email_factory(newsletters=2, with_fxa=True)
+    patched = email_factory(newsletters=1)
+    patched_newsletter_name = patched.newsletters[0].name
+    patched_last_name = patched.last_name
+    new_email_id = str(uuid4())
+
+    resp = client.post(
+        "/ctms/batch",
+        json={
+            "operations": [
+                {
+                    "action": "create",
+                    "contact": {
+                        "email": {"email_id": new_email_id, "primary_email": "new@example.com"},
+                        "newsletters": [{"name": "mozilla-welcome"}],
+                    },
+                },
+                {
+                    "action": "put",
+                    "contact": {
+                        "email": {"email_id": str(replaced.email_id), "primary_email": replaced.primary_email, "first_name": "Put"},
+                        "waitlists": [{"name": "vpn", "fields": {"geo": "fr"}}],
+                    },
+                },
+                {
+                    "action": "patch",
+                    "email_id": str(patched.email_id),
+                    "contact": {
+                        "email": {"first_name": "Patch"},
+                        "fxa": {"fxa_id": "abc"},
+                        "newsletters": [{"name": "firefox-news"}],
+                    },
+                },
+            ]
+        },
+    )
+    assert resp.status_code == 200
+    items = resp.json()["items"]
+    assert [item["status"] for item in items] == [201, 201, 200]
+    assert [item["email_id"] for item in items] == [new_email_id, str(replaced.email_id), str(patched.email_id)]
+
+    created = items[0]["contact"]
+    assert created["email"]["primary_email"] == "new@example.com"
+    assert [newsletter["name"] for newsletter in created["newsletters"]] == ["mozilla-welcome"]
+
+    put = items[1]["contact"]
+    assert put["email"]["first_name"] == "Put"
+    assert put["newsletters"] == []
+    assert put["fxa"]["fxa_id"] is None
+    assert [waitlist["name"] for waitlist in put["waitlists"]] == ["vpn"]
+
+    patch = items[2]["contact"]
+    assert patch["email"]["first_name"] == "Patch"
+    assert patch["email"]["last_name"] == patched_last_name
+    assert patch["fxa"]["fxa_id"] == "abc"
+    assert sorted(newsletter["name"] for newsletter in patch["newsletters"]) == sorted([patched_newsletter_name, "firefox-news"])
+
+    assert dbsession.query(models.Newsletter).filter_by(email_id=replaced.email_id).count() == 0
+
+
+def test_batch_patch_actions(client, dbsession, email_factory):
+    """The "DELETE" and "UNSUBSCRIBE" actions of PATCH are supported."""
+    contact = email_factory(newsletters=2, waitlists=1, with_fxa=True, with_mofo=True)
+    unchanged_name = contact.newsletters[0].name
+    unchanged_create_timestamp = contact.newsletters[0].create_timestamp.isoformat()
+    update_timestamp = contact.update_timestamp.isoformat()
+
+    resp = client.post(
+        "/ctms/batch",
+        json={
+            "operations": [
+                {
+                    "action": "patch",
+                    "email_id": str(contact.email_id),
+                    "contact": {
+                        "fxa": "DELETE",
+                        "mofo": {"mofo_relevant": True},
+                        "newsletters": "UNSUBSCRIBE",
+                        "waitlists": [{"name": contact.waitlists[0].name, "subscribed": False}, {"name": "unknown", "subscribed": False}],
+                    },
+                }
+            ]
+        },
+    )
+    assert resp.status_code == 200
+    data = resp.json()["items"][0]["contact"]
+    assert data["fxa"]["fxa_id"] is None
+    assert data["mofo"]["mofo_relevant"] is True
+    assert data["mofo"]["mofo_email_id"] == contact.mofo.mofo_email_id
+    assert [newsletter["subscribed"] for newsletter in data["newsletters"]] == [False, False]
+    assert [(waitlist["name"], waitlist["subscribed"]) for waitlist in data["waitlists"]] == [(contact.waitlists[0].name, False)]
+    assert data["email"]["update_timestamp"] > update_timestamp
+    newsletter = next(newsletter for newsletter in data["newsletters"] if newsletter["name"] == unchanged_name)
+    assert newsletter["create_timestamp"] == unchanged_create_timestamp
+
+
+def test_batch_per_item_errors(client, dbsession, email_factory):
+    """Operations that cannot be applied are reported, and the others are applied."""
+    existing = email_factory()
+    other = email_factory()
+    third = email_factory()
+    unknown_email_id = str(uuid4())
+    new_email_id = str(uuid4())
+
+    resp = client.post(
+        "/ctms/batch",
+        json={
+            "operations": [
+                {"action": "patch", "email_id": unknown_email_id, "contact": {"email": {"first_name": "X"}}},
+                {
+                    "action": "create",
+                    "contact": {"email": {"email_id": str(existing.email_id), "primary_email": "changed@example.com"}},
+                },
+                {"action": "put", "contact": {"email": {"email_id": new_email_id, "primary_email": other.primary_email.upper()}}},
+                {"action": "patch", "email_id": str(other.email_id), "contact": {"email": {"first_name": "Y"}}},
+                {"action": "patch", "email_id": str(other.email_id), "contact": {"email": {"first_name": "Z"}}},
+                {"action": "patch", "email_id": str(third.email_id), "contact": {"email": {"email_id": str(uuid4())}}},
+            ]
+        },
+    )
+    assert resp.status_code == 200
+    items = resp.json()["items"]
+    assert [(item["status"], item["detail"]) for item in items] == [
+        (404, "Unknown email_id"),
+        (409, "Contact already exists"),
+        (409, "Contact with primary_email, basket_token, mofo_email_id, or fxa_id already exists"),
+        (200, None),
+        (422, "Duplicate email_id in batch"),
+        (422, "cannot change email_id"),
+    ]
+    assert items[3]["contact"]["email"]["first_name"] == "Y"
+    assert dbsession.get(models.Email, new_email_id) is None
+
+
+def test_batch_create_idempotent(client, email_factory):
+    """Creating an identical contact again is not an error, like POST."""
+    resp = client.post(
+        "/ctms/batch",
+        json={"operations": [{"action": "create", "contact": {"email": {"primary_email": "again@example.com"}}}]},
+    )
+    email_id = resp.json()["items"][0]["email_id"]
+
+    resp = client.post(
+        "/ctms/batch",
+        json={"operations": [{"action": "create", "contact": {"email": {"email_id": email_id, "primary_email": "again@example.com"}}}]},
+    )
+    assert resp.status_code == 200
+    assert resp.json()["items"][0]["status"] == 200
+
+
+def test_batch_mofo_email_id_conflicts(client, dbsession, email_factory):
+    """A conflicting mofo_email_id only skips its operation."""
+    existing = email_factory(with_mofo=True)
+    patched = email_factory()
+    new_email_id = str(uuid4())
+
+    resp = client.post(
+        "/ctms/batch",
+        json={
+            "operations": [
+                {"action": "put", "contact": {"email": {"email_id": new_email_id, "primary_email": "new@example.com"}}},
+                {
+                    "action": "put",
+                    "contact": {
+                        "email": {"email_id": str(uuid4()), "primary_email": "other@example.com"},
+                        "mofo": {"mofo_email_id": existing.mofo.mofo_email_id},
+                    },
+                },
+                {"action": "patch", "email_id": str(patched.email_id), "contact": {"mofo": {"mofo_email_id": existing.mofo.mofo_email_id}}},
+            ]
+        },
+    )
+    assert resp.status_code == 200
+    assert [item["status"] for item in resp.json()["items"]] == [201, 409, 409]
+    assert dbsession.get(models.Email, new_email_id) is not None
+
+
+def test_batch_integrity_error_rolls_back(client, dbsession, email_factory):
+    """Conflicts that are missed upfront fail the whole batch."""
+    existing = email_factory(with_mofo=True)
+    new_email_id = str(uuid4())
+
+    with mock.patch("ctms.routers.contacts.find_identifier_conflicts", return_value=set()):
+        resp = client.post(
+            "/ctms/batch",
+            json={
+                "operations": [
+                    {"action": "put", "contact": {"email": {"email_id": new_email_id, "primary_email": "new@example.com"}}},
+                    {
+                        "action": "put",
+                        "contact": {
+                            "email": {"email_id": str(uuid4()), "primary_email": "other@example.com"},
+                            "mofo": {"mofo_email_id": existing.mofo.mofo_email_id},
+                        },
+                    },
+                ]
+            },
+        )
+    assert resp.status_code == 409
+    assert dbsession.get(models.Email, new_email_id) is None
+
+
+def test_batch_statement_count_does_not_depend_on_contacts(client, dbsession, email_factory):
+    """Statements are grouped by table."""
+
+    def payload(contacts):
+        return {
+            "operations": [
+                {
+                    "action": "put",
+                    "contact": {
+                        "email": {"email_id": str(contact.email_id), "primary_email": contact.primary_email},
+                        "amo": {"user_id": "123"},
+                        "newsletters": [{"name": "mozilla-welcome"}],
+                    },
+                }
+                for contact in contacts[:-1]
+            ]
+            + [{"action": "patch", "email_id": str(contacts[-1].email_id), "contact": {"newsletters": "UNSUBSCRIBE"}}]
+        }
+
+    few = payload(email_factory.create_batch(2, newsletters=1))
+    many = payload(email_factory.create_batch(20, newsletters=1))
+
+    resp, few_statements = count_statements(client, dbsession, few)
+    assert resp.status_code == 200
+    resp, many_statements = count_statements(client, dbsession, many)
+    assert resp.status_code == 200
+    assert all(item["status"] == 201 for item in resp.json()["items"][:-1])
+    assert len(many_statements) == len(few_statements)
+
+
+def test_batch_requires_operations(client):
+    resp = client.post("/ctms/batch", json={"operations": []})
+    assert resp.status_code == 400
+    assert resp.json() == {"detail": "No operations provided"}
+
+
+def test_batch_rejects_too_many_operations(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "batch_max_operations", 1)
+    operation = {"action": "create", "contact": {"email": {"primary_email": "new@example.com"}}}
+    resp = client.post("/ctms/batch", json={"operations": [operation, operation]})
+    assert resp.status_code == 400
+    assert resp.json() == {"detail": "Too many operations, at most 1 are allowed"}
+
+
+def test_batch_rejects_unknown_actions(client):
+    resp = client.post("/ctms/batch", json={"operations": [{"action": "delete", "contact": {}}]})
+    assert resp.status_code == 422
+
+
+def test_batch_unauthorized(anon_client):
+    resp = anon_client.post("/ctms/batch", json={"operations": []})
+    assert resp.status_code == 401
@@ -0,0 +1,127 @@
+"""Unit tests for the contact cache on GET /ctms and /ctms/{email_id}"""
+
+import pytest
+
+from ctms.cache import LocalContactCacheBackend, RedisContactCacheBackend, contact_cache
+from tests.helpers import FakeRedis, recorded_statements
+
+
+@pytest.fixture(params=["local", "redis"])
+def cache_backend(request, monkeypatch):
+    if request.param == "local":
+        backend = LocalContactCacheBackend(maxsize=100, ttl=60)
+    else:
+        backend = RedisContactCacheBackend(FakeRedis(), ttl=60)
+    monkeypatch.setattr(contact_cache, "backend", backend)
+    return backend
+
+
+def test_get_is_served_from_cache(client, email_factory, dbsession, cache_backend):
+    contact = email_factory(newsletters=2, with_fxa=True)
+    first = client.get(f"/ctms/{contact.email_id}")
+    assert first.status_code == 200
+
+    with recorded_statements(dbsession) as statements:
+        resp = client.get(f"/ctms/{contact.email_id}")
+
+    assert statements == []
+    assert resp.status_code == 200
+    assert resp.content == first.content
+    assert resp.headers["ETag"] == first.headers["ETag"]
+
+
+def test_get_by_alt_id_is_served_from_cache(client, email_factory, dbsession, cache_backend):
+    contact = email_factory(with_fxa=True)
+    first = client.get(f"/ctms/{contact.email_id}")
+
+    with recorded_statements(dbsession) as statements:
+        by_email = client.get(f"/ctms?primary_email={contact.primary_email.upper()}")
+        by_fxa_id = client.get(f"/ctms?fxa_id={contact.fxa.fxa_id}")
+        by_token = client.get(f"/ctms?basket_token={contact.basket_token}")
+
+    assert statements == []
+    for resp in (by_email, by_fxa_id, by_token):
+        assert resp.status_code == 200
+        assert resp.json() == [{key: value for key, value in first.json().items() if key != "status"}]
+        assert resp.headers["ETag"] == first.headers["ETag"]
+
+
+def test_get_by_several_alt_ids_is_not_cached(client, email_factory, dbsession, cache_backend):
+    contact = email_factory(with_fxa=True)
+    client.get(f"/ctms/{contact.email_id}")
+
+    with recorded_statements(dbsession) as statements:
+        resp = client.get(f"/ctms?primary_email={contact.primary_email}&fxa_id={contact.fxa.fxa_id}")
+
+    assert resp.status_code == 200
+    assert len(resp.json()) == 1
+    assert statements
+
+
+def test_cached_get_if_none_match(client, email_factory, dbsession, cache_backend):
+    contact = email_factory()
+    etag = client.get(f"/ctms/{contact.email_id}").headers["ETag"]
+
+    with recorded_statements(dbsession) as statements:
+        resp = client.get(f"/ctms/{contact.email_id}", headers={"If-None-Match": etag})
+
+    assert resp.status_code == 304
+    assert statements == []
+
+
+@pytest.mark.parametrize(
+    "write",
+    [
+        lambda client, contact: client.patch(f"/ctms/{contact.email_id}", json={"email": {"first_name": "Changed"}}),
+        lambda client, contact: client.put(
+            f"/ctms/{contact.email_id}",
+            json={"email": {"email_id": str(contact.email_id), "primary_email": contact.primary_email, "first_name": "Changed"}},
+        ),
+        lambda client, contact: client.post(
+            "/ctms/batch",
+            json={"operations": [{"action": "patch", "email_id": str(contact.email_id), "contact": {"email": {"first_name": "Changed"}}}]},
+        ),
+    ],
+    ids=["patch", "put", "batch"],
+)
+def test_writes_invalidate_cache(client, email_factory, cache_backend, write):
+    contact = email_factory()
+    client.get(f"/ctms/{contact.email_id}")
+    client.get(f"/ctms?primary_email={contact.primary_email}")
+
+    resp = write(client, contact)
+    assert resp.status_code in (200, 201)
+
+    assert client.get(f"/ctms/{contact.email_id}").json()["email"]["first_name"] == "Changed"
+    assert client.get(f"/ctms?primary_email={contact.primary_email}").json()[0]["email"]["first_name"] == "Changed"
+
+
+def test_delete_invalidates_cache(client, email_factory, cache_backend):
+    contact = email_factory()
+    client.get(f"/ctms/{contact.email_id}")
+
+    resp = client.delete(f"/ctms/{contact.primary_email}")
+    assert resp.status_code == 200
+
+    assert client.get(f"/ctms/{contact.email_id}").status_code == 404
+    assert client.get(f"/ctms?primary_email={contact.primary_email}").json() == []
+
+
+def test_changed_alt_id_is_not_served(client, email_factory, cache_backend):
+    contact = email_factory()
+    old_email = contact.primary_email
+    client.get(f"/ctms?primary_email={old_email}")
+
+    client.patch(f"/ctms/{contact.email_id}", json={"email": {"primary_email": "new-address@example.com"}})
+
+    assert client.get(f"/ctms?primary_email={old_email}").json() == []
+    assert len(client.get("/ctms?primary_email=new-address@example.com").json()) == 1
+
+
+def test_cache_metrics(client, email_factory, cache_backend, registry):
+    contact = email_factory()
+    client.get(f"/ctms/{contact.email_id}")
+    client.get(f"/ctms/{contact.email_id}")
+
+    assert registry.get_sample_value("ctms_cache_events_total", {"cache": "contact", "event": "miss"}) == 1
+    assert registry.get_sample_value("ctms_cache_events_total", {"cache": "contact", "event": "hit"}) == 1
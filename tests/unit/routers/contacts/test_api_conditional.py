@@ -0,0 +1,170 @@
+"""Unit tests for ETags and conditional requests on /ctms"""
+
+from uuid import uuid4
+
+import pytest
+
+from tests.helpers import recorded_statements
+
+
+def test_get_returns_etag(client, email_factory):
+    """GET /ctms/{email_id} returns a strong ETag, stable while the contact does not change."""
+    contact = email_factory(newsletters=2, with_fxa=True)
+
+    resp = client.get(f"/ctms/{contact.email_id}")
+    assert resp.status_code == 200
+    etag = resp.headers["ETag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+    assert client.get(f"/ctms/{contact.email_id}").headers["ETag"] == etag
+
+
+def test_get_if_none_match_returns_304(client, email_factory, dbsession):
+    """A matching If-None-Match only reads the version of the contact."""
+    contact = email_factory(newsletters=2, waitlists=1, with_fxa=True, with_amo=True, with_mofo=True)
+    etag = client.get(f"/ctms/{contact.email_id}").headers["ETag"]
+
+    with recorded_statements(dbsession) as statements:
+        resp = client.get(f"/ctms/{contact.email_id}", headers={"If-None-Match": etag})
+
+    assert resp.status_code == 304
+    assert resp.headers["ETag"] == etag
+    assert resp.content == b""
+    assert len(statements) == 1
+
+
+def test_get_if_none_match_weak_and_list(client, email_factory):
+    """If-None-Match uses the weak comparison, and can list several ETags."""
+    contact = email_factory()
+    etag = client.get(f"/ctms/{contact.email_id}").headers["ETag"]
+
+    resp = client.get(f"/ctms/{contact.email_id}", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert resp.status_code == 304
+
+
+def test_get_if_none_match_after_patch(client, email_factory):
+    """The ETag changes when the contact is updated."""
+    contact = email_factory()
+    etag = client.get(f"/ctms/{contact.email_id}").headers["ETag"]
+
+    resp = client.patch(f"/ctms/{contact.email_id}", json={"email": {"first_name": "Changed"}})
+    assert resp.status_code == 200
+
+    resp = client.get(f"/ctms/{contact.email_id}", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+    assert resp.json()["email"]["first_name"] == "Changed"
+
+
+def test_get_etag_changes_when_related_row_is_deleted(client, email_factory, dbsession):
+    """Deleting a related row changes the ETag, even if no timestamp moved forward."""
+    contact = email_factory(newsletters=2)
+    etag = client.get(f"/ctms/{contact.email_id}").headers["ETag"]
+
+    dbsession.delete(contact.newsletters[0])
+    dbsession.flush()
+
+    resp = client.get(f"/ctms/{contact.email_id}", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert len(resp.json()["newsletters"]) == 1
+
+
+def test_get_if_none_match_unknown_contact(client):
+    resp = client.get(f"/ctms/{uuid4()}", headers={"If-None-Match": "*"})
+    assert resp.status_code == 404
+
+
+@pytest.mark.parametrize("query", ["", "&include=newsletters"])
+def test_get_by_alt_id_if_none_match_star_without_contacts(client, query):
+    """``If-None-Match: *`` does not match an empty list of contacts."""
+    resp = client.get(f"/ctms?primary_email=unknown@example.com{query}", headers={"If-None-Match": "*"})
+    assert resp.status_code == 200
+    assert resp.json() == []
+
+
+def test_sparse_get_shares_etag(client, email_factory):
+    """The ETag is the same for all fieldsets, and conditional sparse reads work."""
+    contact = email_factory(newsletters=1)
+    etag = client.get(f"/ctms/{contact.email_id}").headers["ETag"]
+
+    resp = client.get(f"/ctms/{contact.email_id}?include=newsletters")
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] == etag
+
+    resp = client.get(f"/ctms/{contact.email_id}?include=", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+
+
+def test_sparse_get_etag_without_version_query(client, email_factory, dbsession):
+    """Without If-None-Match, the ETag of sparse reads is computed from the loaded rows."""
+    contact = email_factory(newsletters=2, waitlists=1, with_fxa=True, with_amo=True)
+    etag = client.get(f"/ctms/{contact.email_id}").headers["ETag"]
+
+    for url in (f"/ctms/{contact.email_id}?include=fxa&fields=first_name", f"/ctms?fxa_id={contact.fxa.fxa_id}&include=newsletters"):
+        with recorded_statements(dbsession) as statements:
+            resp = client.get(url)
+        assert resp.status_code == 200
+        assert resp.headers["ETag"] == etag
+        assert not any("UNION ALL" in statement for statement in statements)
+
+
+def test_get_by_alt_id_if_none_match(client, email_factory, dbsession):
+    """GET /ctms returns an ETag for the list of contacts, and honours If-None-Match."""
+    contact = email_factory(newsletters=1, with_fxa=True)
+    url = f"/ctms?fxa_id={contact.fxa.fxa_id}"
+    resp = client.get(url)
+    assert resp.status_code == 200
+    etag = resp.headers["ETag"]
+
+    with recorded_statements(dbsession) as statements:
+        resp = client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert len(statements) == 1
+
+    client.patch(f"/ctms/{contact.email_id}", json={"fxa": {"lang": "fr"}})
+    resp = client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+
+
+def test_patch_if_match(client, email_factory):
+    """PATCH applies if the contact matches If-Match, and fails with 412 otherwise."""
+    contact = email_factory()
+    etag = client.get(f"/ctms/{contact.email_id}").headers["ETag"]
+
+    resp = client.patch(f"/ctms/{contact.email_id}", json={"email": {"first_name": "First"}}, headers={"If-Match": etag})
+    assert resp.status_code == 200
+
+    resp = client.patch(f"/ctms/{contact.email_id}", json={"email": {"first_name": "Second"}}, headers={"If-Match": etag})
+    assert resp.status_code == 412
+    assert client.get(f"/ctms/{contact.email_id}").json()["email"]["first_name"] == "First"
+
+
+def test_patch_if_match_is_strong(client, email_factory):
+    contact = email_factory()
+    etag = client.get(f"/ctms/{contact.email_id}").headers["ETag"]
+
+    resp = client.patch(f"/ctms/{contact.email_id}", json={"email": {"first_name": "First"}}, headers={"If-Match": f"W/{etag}"})
+    assert resp.status_code == 412
+
+
+def test_put_if_match(client, email_factory):
+    """PUT replaces the contact if it matches If-Match, and fails with 412 otherwise."""
+    contact = email_factory()
+    resp = client.get(f"/ctms/{contact.email_id}")
+    etag = resp.headers["ETag"]
+    data = resp.json()
+    data["email"]["first_name"] = "Replaced"
+
+    resp = client.put(f"/ctms/{contact.email_id}", json=data, headers={"If-Match": '"other"'})
+    assert resp.status_code == 412
+
+    resp = client.put(f"/ctms/{contact.email_id}", json=data, headers={"If-Match": etag})
+    assert resp.status_code == 201
+    assert resp.json()["email"]["first_name"] == "Replaced"
+
+
+def test_put_if_match_unknown_contact(client, minimal_contact_data):
+    """If-Match fails when there is no contact, even with *."""
+    email_id = minimal_contact_data.email.email_id
+    resp = client.put(f"/ctms/{email_id}", json=minimal_contact_data.model_dump(mode="json"), headers={"If-Match": "*"})
+    assert resp.status_code == 412
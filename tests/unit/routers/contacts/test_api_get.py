@@ -197,3 +197,63 @@ def test_get_ctms_without_geo_in_waitlist(waitlist_name, client, dbsession, wait
 
     resp = client.get(f"/ctms/{email_id}")
     assert resp.status_code == 200
+
+
+def test_get_ctms_sparse_fields(client, email_factory):
+    """GET /ctms/{email_id}?fields=... returns only the requested parts."""
+    contact = email_factory(newsletters=1, with_fxa=True)
+
+    resp = client.get(f"/ctms/{contact.email_id}", params={"fields": "primary_email", "include": "fxa"})
+    assert resp.status_code == 200
+    assert resp.json() == {
+        "email": {
+            "email_id": str(contact.email_id),
+            "primary_email": contact.primary_email,
+            "update_timestamp": contact.update_timestamp.isoformat(),
+        },
+        "fxa": {
+            "created_date": contact.fxa.created_date,
+            "account_deleted": contact.fxa.account_deleted,
+            "first_service": contact.fxa.first_service,
+            "fxa_id": contact.fxa.fxa_id,
+            "lang": contact.fxa.lang,
+            "primary_email": contact.fxa.primary_email,
+        },
+        "status": "ok",
+    }
+
+
+def test_get_ctms_sparse_include_defaults(client, email_factory):
+    """Missing related rows are returned with their defaults, like full responses."""
+    contact = email_factory()
+
+    resp = client.get(f"/ctms/{contact.email_id}", params={"include": "amo,newsletters"})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert set(data) == {"email", "amo", "newsletters", "status"}
+    assert len(data["email"]) == 14
+    assert data["amo"]["user"] is False
+    assert data["newsletters"] == []
+
+
+def test_get_ctms_sparse_not_found(client, dbsession):
+    """GET /ctms/{unknown email_id} returns a 404 with a fieldset too."""
+    email_id = "cad092ec-a71a-4df5-aa92-517959caeecb"
+    resp = client.get(f"/ctms/{email_id}", params={"fields": "primary_email"})
+    assert resp.status_code == 404
+    assert resp.json() == {"detail": "Unknown email_id"}
+
+
+@pytest.mark.parametrize(
+    "params,detail",
+    [
+        ({"fields": "primary_email,password"}, "Unknown fields: password"),
+        ({"include": "fxa,vpn"}, "Unknown include: vpn"),
+    ],
+)
+def test_get_ctms_sparse_unknown_names(client, email_factory, params, detail):
+    """Unknown field or include names are rejected."""
+    contact = email_factory()
+    resp = client.get(f"/ctms/{contact.email_id}", params=params)
+    assert resp.status_code == 422
+    assert resp.json() == {"detail": detail}
@@ -81,3 +81,23 @@ def test_get_ctms_by_alt_id_none_found(client, dbsession, alt_id_name, alt_id_va
     assert resp.status_code == 200
     data = resp.json()
     assert len(data) == 0
+
+
+def test_get_ctms_by_alt_id_sparse_fields(email_factory, client):
+    """The list of contacts can be restricted to some fields."""
+    contact = email_factory(with_fxa=True, newsletters=2)
+
+    resp = client.get(
+        "/ctms",
+        params={"primary_email": contact.primary_email, "fields": "basket_token", "include": ""},
+    )
+    assert resp.status_code == 200
+    assert resp.json() == [
+        {
+            "email": {
+                "basket_token": str(contact.basket_token),
+                "email_id": str(contact.email_id),
+                "update_timestamp": contact.update_timestamp.isoformat(),
+            }
+        }
+    ]
@@ -0,0 +1,111 @@
+"""Unit tests for POST /ctms/lookup"""
+
+from uuid import uuid4
+
+from sqlalchemy import event
+
+from ctms.dependencies import get_settings
+
+
+def test_lookup_by_all_kinds_of_ids(client, email_factory):
+    """Contacts are returned keyed by the requested identifiers."""
+    by_email_id = email_factory(newsletters=1)
+    by_basket_token = email_factory()
+    by_fxa_id = email_factory(with_fxa=True)
+    by_primary_email = email_factory(primary_email="Mozilla-Fan@example.com")
+
+    resp = client.post(
+        "/ctms/lookup",
+        json={
+            "email_ids": [str(by_email_id.email_id)],
+            "basket_tokens": [str(by_basket_token.basket_token)],
+            "fxa_ids": [by_fxa_id.fxa.fxa_id],
+            "primary_emails": ["mozilla-fan@example.com"],
+        },
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["missing"] == {"email_ids": [], "basket_tokens": [], "fxa_ids": [], "primary_emails": []}
+    assert data["email_ids"][str(by_email_id.email_id)]["email"]["email_id"] == str(by_email_id.email_id)
+    assert data["email_ids"][str(by_email_id.email_id)]["newsletters"][0]["name"] == by_email_id.newsletters[0].name
+    assert data["basket_tokens"][str(by_basket_token.basket_token)]["email"]["email_id"] == str(by_basket_token.email_id)
+    assert data["fxa_ids"][by_fxa_id.fxa.fxa_id]["email"]["email_id"] == str(by_fxa_id.email_id)
+    assert data["primary_emails"]["mozilla-fan@example.com"]["email"]["email_id"] == str(by_primary_email.email_id)
+
+
+def test_lookup_lists_missing_ids(client, email_factory):
+    """Identifiers without contact are listed explicitly."""
+    contact = email_factory()
+    unknown_email_id = str(uuid4())
+
+    resp = client.post(
+        "/ctms/lookup",
+        json={
+            "email_ids": [str(contact.email_id), unknown_email_id, str(contact.email_id)],
+            "fxa_ids": ["unknown"],
+        },
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert list(data["email_ids"]) == [str(contact.email_id)]
+    assert data["fxa_ids"] == {}
+    assert data["missing"] == {
+        "email_ids": [unknown_email_id],
+        "basket_tokens": [],
+        "fxa_ids": ["unknown"],
+        "primary_emails": [],
+    }
+
+
+def test_lookup_uses_set_based_queries(client, email_factory, dbsession):
+    """The number of queries does not depend on the number of contacts."""
+    contacts = email_factory.create_batch(20, newsletters=1, with_fxa=True)
+    payload = {
+        "email_ids": [str(contact.email_id) for contact in contacts[:10]],
+        "fxa_ids": [contact.fxa.fxa_id for contact in contacts[10:]],
+    }
+    statements = []
+
+    def count_statements(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = dbsession.get_bind().engine
+    event.listen(engine, "before_cursor_execute", count_statements)
+    try:
+        resp = client.post("/ctms/lookup", json=payload)
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statements)
+
+    assert resp.status_code == 200
+    assert len(resp.json()["email_ids"]) == 10
+    assert len(resp.json()["fxa_ids"]) == 10
+    # Two lookups, one load of the emails, and one per collection.
+    contact_statements = [
+        statement
+        for statement in statements
+        if statement.startswith("SELECT") and "api_client" not in statement and "auth_generation" not in statement
+    ]
+    assert len(contact_statements) == 5
+
+
+def test_lookup_requires_ids(client):
+    resp = client.post("/ctms/lookup", json={})
+    assert resp.status_code == 400
+    assert resp.json() == {"detail": "No identifiers provided, at least one is needed: email_ids, basket_tokens, fxa_ids, primary_emails"}
+
+
+def test_lookup_rejects_too_many_ids(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "lookup_max_identifiers", 2)
+    resp = client.post("/ctms/lookup", json={"email_ids": [str(uuid4())], "fxa_ids": ["a", "b"]})
+    assert resp.status_code == 400
+    assert resp.json() == {"detail": "Too many identifiers, at most 2 are allowed"}
+
+
+def test_lookup_rejects_unknown_kinds(client):
+    resp = client.post("/ctms/lookup", json={"email_id": [str(uuid4())]})
+    assert resp.status_code == 422
+
+
+def test_lookup_unauthorized(anon_client):
+    resp = anon_client.post("/ctms/lookup", json={"email_ids": [str(uuid4())]})
+    assert resp.status_code == 401
@@ -20,6 +20,7 @@ from ctms.schemas import (
 )
 from ctms.schemas.waitlist import WaitlistInSchema
 from tests.conftest import FuzzyAssert
+from tests.helpers import reads_after_writes, recorded_statements
 from tests.unit.conftest import create_full_contact
 
 
@@ -575,3 +576,23 @@ def test_subscribe_to_relay_newsletter_turned_into_relay_waitlist(client, email_
 
     resp = client.patch(f"/ctms/{email.email_id}", json=patch_data, follow_redirects=True)
     assert resp.status_code == 200  # Not 400
+
+
+def test_patch_response_is_built_from_returning(client, dbsession, email_factory):
+    """The patched contact is not read again after the writes."""
+    email = email_factory(newsletters=1, waitlists=1)
+    email_id = str(email.email_id)
+    patch_data = {
+        "email": {"first_name": "Patch"},
+        "fxa": {"fxa_id": "123"},
+        "newsletters": [{"name": "aaa-first"}, {"name": email.newsletters[0].name, "subscribed": False}],
+    }
+    with recorded_statements(dbsession) as statements:
+        resp = client.patch(f"/ctms/{email_id}", json=patch_data)
+    assert resp.status_code == 200
+    assert reads_after_writes(statements) == []
+
+    patched = resp.json()
+    assert patched["email"]["first_name"] == "Patch"
+    assert patched["newsletters"][0]["name"] == "aaa-first"
+    assert client.get(f"/ctms/{email_id}").json() == patched
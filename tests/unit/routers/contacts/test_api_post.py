@@ -6,6 +6,7 @@ from uuid import uuid4
 from fastapi.encoders import jsonable_encoder
 
 from ctms import models, schemas
+from tests.helpers import reads_after_writes, recorded_statements
 
 
 def test_create_basic_no_email_id(client, dbsession):
@@ -155,3 +156,42 @@ def test_create_with_non_json_is_error(client, caplog):
     assert resp.json()["detail"][0]["msg"] == "JSON decode error"
     assert len(caplog.records) == 1
     assert caplog.records[0].code == 422
+
+
+def test_create_response_is_built_from_returning(client, dbsession):
+    """The created contact is not read again after the writes."""
+    data = {
+        "email": {"primary_email": "returning@example.com"},
+        "fxa": {"fxa_id": "123"},
+        "newsletters": [{"name": "mozilla-welcome"}, {"name": "firefox-news"}],
+        "waitlists": [{"name": "vpn", "fields": {"geo": "fr"}}],
+    }
+    with recorded_statements(dbsession) as statements:
+        resp = client.post("/ctms", json=data)
+    assert resp.status_code == 201
+    assert reads_after_writes(statements) == []
+
+    created = resp.json()
+    assert created["email"]["create_timestamp"] is not None
+    assert [newsletter["name"] for newsletter in created["newsletters"]] == ["firefox-news", "mozilla-welcome"]
+    assert client.get(f"/ctms/{created['email']['email_id']}").json() == created
+
+
+def test_create_does_not_read_new_contacts(client, dbsession):
+    """New contacts are inserted directly, without checking for an existing one first."""
+    data = {"email": {"primary_email": "new@example.com"}, "amo": {"user_id": "123"}}
+    with recorded_statements(dbsession) as statements:
+        resp = client.post("/ctms", json=data)
+    assert resp.status_code == 201
+    assert [statement for statement in statements if statement.startswith("SELECT")] == []
+    assert "ON CONFLICT (email_id) DO NOTHING" in statements[0]
+
+
+def test_create_conflict_does_not_write(client, dbsession, email_factory):
+    """On conflict, the existing contact is compared and left untouched."""
+    email = email_factory(first_name="Existing")
+    data = {"email": {"email_id": str(email.email_id), "primary_email": email.primary_email, "first_name": "Other"}}
+    resp = client.post("/ctms", json=data)
+    assert resp.status_code == 409
+    dbsession.expire_all()
+    assert dbsession.get(models.Email, email.email_id).first_name == "Existing"
@@ -7,6 +7,7 @@ from fastapi.encoders import jsonable_encoder
 
 from ctms import models
 from ctms.schemas import ContactPutSchema, EmailInSchema
+from tests.helpers import reads_after_writes, recorded_statements
 
 
 def test_create_or_update_basic_id_is_different(client):
@@ -138,3 +139,24 @@ def test_put_with_not_json_is_error(client, caplog):
     assert resp.json()["detail"][0]["msg"] == "JSON decode error"
     assert len(caplog.records) == 1
     assert caplog.records[0].code == 422
+
+
+def test_create_or_update_response_is_built_from_returning(client, dbsession, email_factory):
+    """The replaced contact is not read again after the writes."""
+    email = email_factory(newsletters=1, with_amo=True)
+    email_id = str(email.email_id)
+    data = {
+        "email": {"email_id": email_id, "primary_email": email.primary_email, "first_name": "Put"},
+        "fxa": {"fxa_id": "123"},
+        "newsletters": [{"name": "mozilla-welcome"}, {"name": "firefox-news"}],
+    }
+    with recorded_statements(dbsession) as statements:
+        resp = client.put(f"/ctms/{email_id}", json=data)
+    assert resp.status_code == 201
+    assert reads_after_writes(statements) == []
+
+    written = resp.json()
+    assert written["email"]["first_name"] == "Put"
+    assert written["amo"]["user_id"] is None
+    assert [newsletter["name"] for newsletter in written["newsletters"]] == ["firefox-news", "mozilla-welcome"]
+    assert client.get(f"/ctms/{email_id}").json() == written
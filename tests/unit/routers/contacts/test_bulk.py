@@ -1,5 +1,6 @@
 """pytest tests for API functionality"""
 
+import json
 import urllib.parse
 from datetime import timedelta
 
@@ -123,3 +124,100 @@ def test_get_ctms_bulk_by_timerange_no_results(client, email_factory):
     assert "items" in results
     assert len(results["items"]) == 0
     assert results["next"] is None
+
+
+def test_stream_ctms_bulk_by_timerange(client, email_factory):
+    emails = sorted(email_factory.create_batch(3, newsletters=1), key=lambda email: (email.update_timestamp, email.email_id))
+    start = emails[0].update_timestamp - timedelta(hours=12)
+    end = emails[-1].update_timestamp + timedelta(hours=12)
+
+    resp = client.get("/updates/stream", params={"start": start.isoformat(), "end": end.isoformat()})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/x-ndjson"
+    *items, cursor = [json.loads(line) for line in resp.text.splitlines()]
+
+    assert [item["email"]["email_id"] for item in items] == [str(email.email_id) for email in emails]
+    expected = CTMSResponse(**ContactSchema.from_email(emails[0]).model_dump())
+    assert items[0] == json.loads(expected.model_dump_json())
+    assert cursor["count"] == 3
+    assert cursor["after"] == BulkRequestSchema.compressor_for_bulk_encoded_details(emails[-1].email_id, emails[-1].update_timestamp)
+
+
+def test_stream_ctms_bulk_resumes_after_cursor(client, email_factory):
+    emails = sorted(email_factory.create_batch(3), key=lambda email: (email.update_timestamp, email.email_id))
+    start = emails[0].update_timestamp - timedelta(hours=12)
+    after = BulkRequestSchema.compressor_for_bulk_encoded_details(emails[0].email_id, emails[0].update_timestamp)
+
+    resp = client.get("/updates/stream", params={"start": start.isoformat(), "after": after})
+    assert resp.status_code == 200
+    *items, cursor = [json.loads(line) for line in resp.text.splitlines()]
+
+    assert [item["email"]["email_id"] for item in items] == [str(email.email_id) for email in emails[1:]]
+    assert cursor["count"] == 2
+
+
+def test_stream_ctms_bulk_no_results(client):
+    resp = client.get("/updates/stream", params={"start": "2020-01-22T03:24:00+00:00", "end": "2020-01-23T03:24:00+00:00", "after": ""})
+    assert resp.status_code == 200
+    assert [json.loads(line) for line in resp.text.splitlines()] == [
+        {"start": "2020-01-22T03:24:00Z", "end": "2020-01-23T03:24:00Z", "after": None, "count": 0},
+    ]
+
+
+def test_stream_ctms_bulk_errs_on_validation(client):
+    resp = client.get("/updates/stream", params={"start": "2020-01-22T03:24:00+00:00", "after": "hello"})
+    assert resp.status_code == 422
+
+
+def test_get_ctms_bulk_sparse_fields(client, email_factory):
+    """The bulk pages can be restricted to some fields, and the next URL keeps them."""
+    emails = email_factory.create_batch(3, newsletters=1)
+    first_email = min(emails, key=lambda email: (email.update_timestamp, email.email_id))
+    start = first_email.update_timestamp - timedelta(hours=12)
+
+    resp = client.get(
+        "/updates",
+        params={"start": start.isoformat(), "limit": 2, "fields": "primary_email", "include": "newsletters"},
+    )
+    assert resp.status_code == 200
+    results = resp.json()
+    assert len(results["items"]) == 2
+    assert results["items"][0] == {
+        "email": {
+            "email_id": str(first_email.email_id),
+            "primary_email": first_email.primary_email,
+            "update_timestamp": first_email.update_timestamp.isoformat(),
+        },
+        "newsletters": [
+            {
+                "format": newsletter.format,
+                "lang": newsletter.lang,
+                "name": newsletter.name,
+                "source": newsletter.source,
+                "subscribed": newsletter.subscribed,
+                "unsub_reason": newsletter.unsub_reason,
+                "create_timestamp": newsletter.create_timestamp.isoformat(),
+                "update_timestamp": newsletter.update_timestamp.isoformat(),
+            }
+            for newsletter in first_email.newsletters
+        ],
+    }
+
+    next_query = urllib.parse.parse_qs(urllib.parse.urlsplit(results["next"].strip()).query)
+    assert next_query["fields"] == ["primary_email"]
+    assert next_query["include"] == ["newsletters"]
+
+    resp = client.get(
+        "/updates", params={"start": start.isoformat(), "limit": 2, **{k: v[0] for k, v in next_query.items() if k in {"after", "fields", "include"}}}
+    )
+    assert resp.status_code == 200
+    results = resp.json()
+    assert len(results["items"]) == 1
+    assert set(results["items"][0]) == {"email", "newsletters"}
+    assert results["next"] is None
+
+
+def test_get_ctms_bulk_sparse_unknown_names(client):
+    """Unknown field names are rejected."""
+    resp = client.get("/updates", params={"start": "2020-01-22T03:24:00+00:00", "fields": "nope"})
+    assert resp.status_code == 422
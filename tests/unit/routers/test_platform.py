@@ -7,6 +7,7 @@ import pytest
 from sqlalchemy.exc import TimeoutError as SQATimeoutError
 
 from ctms.app import app
+from ctms.db_stats import DatabaseStats, db_stats_collector
 
 
 def test_read_root(anon_client, caplog):
@@ -67,7 +68,7 @@ def test_read_heartbeat(anon_client, caplog):
     assert len(caplog.messages) == 1
 
 
-@mock.patch("ctms.routers.platform.SessionLocal")
+@mock.patch("ctms.db_stats.SessionLocal")
 def test_read_heartbeat_db_fails(mock_db, anon_client):
     """/__heartbeat__ returns 503 when the database is unavailable."""
     mocked_session = mock.MagicMock()
@@ -93,6 +94,28 @@ def test_read_heartbeat_db_fails(mock_db, anon_client):
     }
 
 
+def test_read_heartbeat_serves_last_snapshot(anon_client):
+    """Once collected, the database statistics are served without querying the database."""
+    assert anon_client.get("/__heartbeat__").status_code == 200
+
+    with mock.patch("ctms.db_stats.SessionLocal") as mock_db:
+        resp = anon_client.get("/__heartbeat__")
+
+    assert resp.status_code == 200
+    mock_db.assert_not_called()
+
+
+def test_read_heartbeat_stale_snapshot(anon_client, settings):
+    """/__heartbeat__ fails when the database statistics were not refreshed for too long."""
+    collected_at = db_stats_collector.timer() - settings.db_stats_max_age_in_seconds - 10
+    db_stats_collector.snapshot = DatabaseStats(True, 1, {}, {}, collected_at)
+
+    resp = anon_client.get("/__heartbeat__")
+
+    assert resp.status_code == 500
+    assert "db.0003" in resp.json()["details"]["database"]["messages"]
+
+
 def test_read_health(anon_client):
     """The platform calls /__lbheartbeat__ to see when the app is running."""
     resp = anon_client.get("/__lbheartbeat__")
@@ -105,3 +128,13 @@ def test_get_metrics(anon_client, setup_metrics, caplog):
         resp = anon_client.get("/metrics")
     assert resp.status_code == 200
     assert len(caplog.messages) == 1
+
+
+def test_get_metrics_db_stats_age(anon_client, registry):
+    """The metrics report the age of the database statistics."""
+    anon_client.get("/metrics")
+    assert registry.get_sample_value("ctms_db_stats_age_seconds") == -1
+
+    anon_client.get("/__heartbeat__")
+    anon_client.get("/metrics")
+    assert 0 <= registry.get_sample_value("ctms_db_stats_age_seconds") < 60
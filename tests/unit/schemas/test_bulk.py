@@ -0,0 +1,35 @@
+import base64
+from datetime import UTC, datetime
+from uuid import UUID
+
+import pytest
+from pydantic import ValidationError
+
+from ctms.schemas import BulkRequestSchema
+from ctms.schemas.bulk import decode_bulk_cursor, encode_bulk_cursor
+
+EMAIL_ID = UUID("93db83d4-4119-4e0c-af87-a713786fa81d")
+
+
+def test_bulk_cursor_round_trip():
+    update_timestamp = datetime(2020, 1, 22, 15, 24, 0, 123456, tzinfo=UTC)
+
+    cursor = encode_bulk_cursor(EMAIL_ID, update_timestamp)
+
+    assert len(cursor) < 40
+    assert decode_bulk_cursor(cursor) == (str(EMAIL_ID), update_timestamp)
+
+
+def test_bulk_cursor_decodes_previous_version():
+    cursor = base64.urlsafe_b64encode(f"{EMAIL_ID},2020-01-22 15:24:00.123456+00:00".encode()).decode()
+
+    assert decode_bulk_cursor(cursor) == (
+        str(EMAIL_ID),
+        datetime(2020, 1, 22, 15, 24, 0, 123456, tzinfo=UTC),
+    )
+
+
+@pytest.mark.parametrize("cursor", ["hello", base64.urlsafe_b64encode(b"not,a cursor").decode()])
+def test_bulk_request_rejects_invalid_cursor(cursor):
+    with pytest.raises(ValidationError):
+        BulkRequestSchema(start_time=datetime.now(UTC), after=cursor)
@@ -1,6 +1,9 @@
 import pytest
+from pydantic import ValidationError
 
-from ctms.schemas.waitlist import WaitlistInSchema
+from ctms.config import Settings
+from ctms.schemas import waitlist
+from ctms.schemas.waitlist import VPNFieldsSchema, WaitlistInSchema, build_waitlist_fields_schemas
 
 
 @pytest.mark.parametrize(
@@ -85,3 +88,37 @@ def test_relay_and_vpn_waitlist_invalid_data(data):
 )
 def test_relay_and_vpn_waitlist_valid_data(data):
     WaitlistInSchema(**data)
+
+
+def test_configured_waitlist_fields(monkeypatch):
+    schemas = build_waitlist_fields_schemas({"new-product": {"geo": 2, "os": 10}})
+    monkeypatch.setattr(waitlist, "waitlist_fields_schemas", lambda: schemas)
+
+    WaitlistInSchema(name="new-product", fields={"geo": "fr", "os": "linux"})
+    with pytest.raises(ValueError):
+        WaitlistInSchema(name="new-product", fields={"geo": "fra"})
+    with pytest.raises(ValueError):
+        WaitlistInSchema(name="new-product", fields={"platform": "linux"})
+    # Other waitlists are unaffected.
+    WaitlistInSchema(name="other-product", fields={"os": "linux", "platform": "linux"})
+
+
+def test_waitlist_fields_schemas_without_app_settings(monkeypatch):
+    """The schemas only read ``CTMS_WAITLIST_FIELDS``, so that scripts can use them without the rest of the settings."""
+    monkeypatch.delenv("CTMS_DB_URL", raising=False)
+    monkeypatch.delenv("CTMS_SECRET_KEY", raising=False)
+    monkeypatch.setenv("CTMS_WAITLIST_FIELDS", '{"new-product": {"geo": 2}}')
+    waitlist.waitlist_fields_schemas.cache_clear()
+    try:
+        assert set(waitlist.waitlist_fields_schemas()) == {"relay", "vpn", "new-product"}
+    finally:
+        waitlist.waitlist_fields_schemas.cache_clear()
+
+
+def test_configured_waitlist_fields_keep_builtin():
+    assert build_waitlist_fields_schemas({"new-product": {"geo": 2}})["vpn"] is VPNFieldsSchema
+
+
+def test_configured_waitlist_fields_cannot_replace_builtin():
+    with pytest.raises(ValidationError, match="built-in waitlists cannot be configured: relay, vpn"):
+        Settings(waitlist_fields={"vpn": {"geo": 100, "version": 10}, "relay": {"geo": 100}, "new-product": {"geo": 100}})
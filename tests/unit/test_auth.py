@@ -2,15 +2,20 @@
 
 import logging
 from datetime import UTC, datetime, timedelta
+from unittest import mock
 
 import jwt
 import pytest
 from requests.auth import HTTPBasicAuth
 
 from ctms.app import app
-from ctms.auth import create_access_token, hash_password, verify_password
-from ctms.crud import get_api_client_by_id
+from ctms.auth import create_access_token, hash_password, token_digest, verify_password
+from ctms.auth_generation import auth_generation_watcher
+from ctms.cache import token_cache
+from ctms.crud import get_api_client_by_id, update_api_client_secret
 from ctms.dependencies import get_token_settings
+from ctms.last_access import last_access_tracker
+from ctms.models import ApiClient
 
 
 @pytest.fixture
@@ -153,6 +158,48 @@ def test_post_token_fails_disabled_client(dbsession, anon_client, client_id_and_
     assert caplog.records[0].token_fail == "Client disabled"
 
 
+def test_post_token_verifies_secret_once(anon_client, client_id_and_secret, registry):
+    """Token renewals with the same credentials skip the argon2 verification."""
+    with mock.patch("ctms.routers.platform.verify_password", wraps=verify_password) as spy:
+        for _ in range(3):
+            resp = anon_client.post("/token", auth=HTTPBasicAuth(*client_id_and_secret))
+            assert resp.status_code == 200
+
+    assert spy.call_count == 1
+    assert registry.get_sample_value("ctms_cache_events_total", {"cache": "verified_credentials", "event": "hit"}) == 2
+    assert registry.get_sample_value("ctms_password_verifications_pending") == 0
+
+
+def test_post_token_bad_secret_not_cached(anon_client, client_id_and_secret):
+    """A wrong secret is verified, and rejected, every time."""
+    client_id, client_secret = client_id_and_secret
+    resp = anon_client.post("/token", auth=HTTPBasicAuth(client_id, client_secret))
+    assert resp.status_code == 200
+
+    with mock.patch("ctms.routers.platform.verify_password", wraps=verify_password) as spy:
+        for _ in range(2):
+            resp = anon_client.post("/token", auth=HTTPBasicAuth(client_id, client_secret + "x"))
+            assert resp.status_code == 400
+
+    assert spy.call_count == 2
+
+
+def test_post_token_fails_after_secret_rotation(dbsession, anon_client, client_id_and_secret):
+    """Verified credentials are forgotten when the secret is rotated."""
+    client_id, client_secret = client_id_and_secret
+    resp = anon_client.post("/token", auth=HTTPBasicAuth(client_id, client_secret))
+    assert resp.status_code == 200
+
+    api_client = get_api_client_by_id(dbsession, client_id)
+    update_api_client_secret(dbsession, api_client, "secret_new")
+    dbsession.flush()
+
+    resp = anon_client.post("/token", auth=HTTPBasicAuth(client_id, client_secret))
+    assert resp.status_code == 400
+    resp = anon_client.post("/token", auth=HTTPBasicAuth(client_id, "secret_new"))
+    assert resp.status_code == 200
+
+
 def test_get_ctms_with_token(email_factory, anon_client, test_token_settings, client_id_and_secret):
     """An authenticated API can be fetched with a valid token"""
     email = email_factory()
@@ -183,8 +230,13 @@ def test_successful_login_tracks_last_access(dbsession, email_factory, anon_clie
         f"/ctms/{email.email_id}",
         headers={"Authorization": f"Bearer {token}"},
     )
+    # The request does not write the access time...
+    dbsession.expire_all()
+    assert get_api_client_by_id(dbsession, client_id).last_access == before
 
-    dbsession.flush()
+    # ...it is written when pending access times are flushed.
+    assert last_access_tracker.flush(dbsession) == 1
+    dbsession.expire_all()
     after = get_api_client_by_id(dbsession, client_id).last_access
     assert before != after
 
@@ -285,6 +337,112 @@ def test_get_ctms_with_disabled_client_fails(
     assert caplog.records[0].auth_fail == "Client disabled"
 
 
+def test_get_ctms_caches_api_client(
+    dbsession,
+    email_factory,
+    anon_client,
+    test_token_settings,
+    client_id_and_secret,
+    registry,
+):
+    """The API client is read from the database once, then served from cache until API clients change."""
+    email = email_factory()
+    auth_generation_watcher.refresh(dbsession)
+
+    client_id = client_id_and_secret[0]
+    token = create_access_token({"sub": f"api_client:{client_id}"}, **test_token_settings)
+    headers = {"Authorization": f"Bearer {token}"}
+    for _ in range(2):
+        resp = anon_client.get(f"/ctms/{email.email_id}", headers=headers)
+        assert resp.status_code == 200
+    assert registry.get_sample_value("ctms_cache_events_total", {"cache": "api_client", "event": "miss"}) == 1
+    assert registry.get_sample_value("ctms_cache_events_total", {"cache": "api_client", "event": "hit"}) == 1
+
+    # Like ``ctms-cli clients disable``, in another process.
+    api_client = get_api_client_by_id(dbsession, client_id)
+    api_client.enabled = False
+    dbsession.commit()
+    # Like the background check of the auth generation.
+    auth_generation_watcher.refresh(dbsession)
+
+    resp = anon_client.get(f"/ctms/{email.email_id}", headers=headers)
+    assert resp.status_code == 400
+    assert resp.json() == {"detail": "API Client has been disabled"}
+    assert registry.get_sample_value("ctms_cache_events_total", {"cache": "api_client", "event": "miss"}) == 2
+
+
+def test_get_ctms_skips_api_client_cache_without_auth_generation(
+    email_factory,
+    anon_client,
+    test_token_settings,
+    client_id_and_secret,
+    registry,
+):
+    """The API client is read from the database on each request until the auth generation is known."""
+    email = email_factory()
+
+    client_id = client_id_and_secret[0]
+    token = create_access_token({"sub": f"api_client:{client_id}"}, **test_token_settings)
+    headers = {"Authorization": f"Bearer {token}"}
+    for _ in range(2):
+        resp = anon_client.get(f"/ctms/{email.email_id}", headers=headers)
+        assert resp.status_code == 200
+    assert registry.get_sample_value("ctms_cache_events_total", {"cache": "api_client", "event": "miss"}) == 2
+    assert not registry.get_sample_value("ctms_cache_events_total", {"cache": "api_client", "event": "hit"})
+
+
+def test_get_ctms_decodes_token_once(email_factory, anon_client, test_token_settings, client_id_and_secret, registry):
+    """A bearer token is verified and decoded once, then served from cache."""
+    email = email_factory()
+
+    client_id = client_id_and_secret[0]
+    token = create_access_token({"sub": f"api_client:{client_id}"}, **test_token_settings)
+    headers = {"Authorization": f"Bearer {token}"}
+    with mock.patch("ctms.auth.jwt.decode", wraps=jwt.decode) as spy:
+        for _ in range(3):
+            resp = anon_client.get(f"/ctms/{email.email_id}", headers=headers)
+            assert resp.status_code == 200
+
+    assert spy.call_count == 1
+    assert registry.get_sample_value("ctms_cache_events_total", {"cache": "token", "event": "hit"}) == 2
+    assert registry.get_sample_value("ctms_cache_events_total", {"cache": "token", "event": "miss"}) == 1
+
+
+def test_token_cache_expires_with_token(email_factory, anon_client, test_token_settings, client_id_and_secret):
+    """Decoded tokens are not kept after their expiration."""
+    email = email_factory()
+
+    client_id = client_id_and_secret[0]
+    almost_expired = datetime.now(UTC) - test_token_settings["expires_delta"] + timedelta(seconds=30)
+    token = create_access_token({"sub": f"api_client:{client_id}"}, **test_token_settings, now=almost_expired)
+    resp = anon_client.get(f"/ctms/{email.email_id}", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 200
+
+    assert len(token_cache) == 1
+    assert token_cache.get(token_digest(token)) is not None
+    with mock.patch.object(token_cache, "timer", return_value=token_cache.timer() + 31):
+        assert token_cache.get(token_digest(token)) is None
+    assert len(token_cache) == 0
+
+
+def test_cached_token_of_deleted_client(dbsession, email_factory, anon_client, test_token_settings, client_id_and_secret):
+    """A decoded token stays cached, but its API client is checked again once deleted, even by another process."""
+    email = email_factory()
+
+    client_id = client_id_and_secret[0]
+    token = create_access_token({"sub": f"api_client:{client_id}"}, **test_token_settings)
+    headers = {"Authorization": f"Bearer {token}"}
+    resp = anon_client.get(f"/ctms/{email.email_id}", headers=headers)
+    assert resp.status_code == 200
+
+    dbsession.query(ApiClient).filter_by(client_id=client_id).delete()
+    dbsession.commit()
+
+    resp = anon_client.get(f"/ctms/{email.email_id}", headers=headers)
+    assert resp.status_code == 401
+    assert token_cache.get(token_digest(token)) is not None
+
+
 def test_hashed_passwords():
     """Hashed passwords have unique salts"""
     hashed1 = hash_password("password")
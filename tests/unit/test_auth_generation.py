@@ -0,0 +1,32 @@
+from ctms.auth_generation import AuthGenerationWatcher
+from ctms.crud import get_auth_generation
+
+
+def test_refresh_reads_generation(dbsession):
+    watcher = AuthGenerationWatcher(max_age=10)
+    assert watcher.current() is None
+
+    assert watcher.refresh(dbsession) == get_auth_generation(dbsession)
+    assert watcher.current() == get_auth_generation(dbsession)
+
+
+def test_generation_is_unknown_when_too_old(dbsession):
+    now = 100.0
+    watcher = AuthGenerationWatcher(max_age=10, timer=lambda: now)
+    generation = watcher.refresh(dbsession)
+
+    now = 110.0
+    assert watcher.current() == generation
+    now = 110.5
+    assert watcher.current() is None
+
+
+def test_generation_follows_changes(dbsession, role_factory):
+    watcher = AuthGenerationWatcher(max_age=10)
+    generation = watcher.refresh(dbsession)
+
+    role_factory()
+    dbsession.commit()
+
+    assert watcher.current() == generation
+    assert watcher.refresh(dbsession) > generation
@@ -0,0 +1,223 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy.util import greenlet_spawn
+
+from ctms.cache import (
+    CachedContact,
+    ContactCache,
+    LocalContactCacheBackend,
+    RedisContactCacheBackend,
+    TTLCache,
+    VersionedTTLCache,
+)
+from ctms.config import Settings
+from tests.helpers import FakeAsyncRedis, FakeRedis
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_get_and_set():
+    cache = TTLCache(maxsize=10, ttl=60)
+    assert cache.get("a") is None
+
+    cache.set("a", 1)
+
+    assert cache.get("a") == 1
+    assert len(cache) == 1
+
+
+def test_ttl_cache_entries_expire():
+    timer = FakeTimer()
+    cache = TTLCache(maxsize=10, ttl=60, timer=timer)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=120)
+
+    timer.now = 60
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert len(cache) == 1
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    assert cache.set("a", 1) == 0
+    assert cache.set("b", 2) == 0
+    cache.get("a")
+
+    assert cache.set("c", 3) == 1
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_disabled_with_zero_size():
+    cache = TTLCache(maxsize=0, ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_ttl_cache_invalidation():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    cache.pop("a")
+    cache.pop("unknown")
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_ttl_cache_add_keeps_unexpired_entries():
+    timer = FakeTimer()
+    cache = TTLCache(maxsize=10, ttl=60, timer=timer)
+    cache.set("a", 1)
+
+    cache.add("a", 2)
+    cache.add("b", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") == 3
+
+    timer.now = 60
+    cache.add("a", 4)
+    assert cache.get("a") == 4
+
+
+def test_versioned_ttl_cache_new_version_invalidates_all():
+    cache = VersionedTTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1, version=1)
+    cache.set("b", 2, version=1)
+    assert cache.get("a", version=1) == 1
+
+    assert cache.get("a", version=2) is None
+    assert cache.get("b", version=2) is None
+    cache.set("a", 3, version=2)
+    assert cache.get("a", version=2) == 3
+
+
+def test_versioned_ttl_cache_discards_stale_version():
+    cache = VersionedTTLCache(maxsize=10, ttl=60)
+    # Changed while the value was being computed.
+    cache.set("a", 1, version=1)
+
+    assert cache.get("a", version=2) is None
+
+
+@pytest.fixture(params=["local", "redis"])
+def contact_cache(request):
+    if request.param == "local":
+        return ContactCache(LocalContactCacheBackend(maxsize=100, ttl=60))
+    return ContactCache(RedisContactCacheBackend(FakeRedis(), ttl=60))
+
+
+def make_cached_contact(email_id="id-1", **identifiers):
+    return CachedContact(
+        email_id=email_id,
+        content=b'{"email":{"email_id":"' + email_id.encode() + b'"}}',
+        etag='"etag"',
+        identifiers={"primary_email": "a@example.com", **identifiers},
+    )
+
+
+def test_contact_cache_disabled():
+    cache = ContactCache()
+    assert not cache.enabled
+    cache.add(make_cached_contact())
+    assert cache.get("id-1") is None
+    assert cache.get_by_alternate_id("primary_email", "a@example.com") is None
+
+
+def test_contact_cache_get_by_email_id(contact_cache):
+    contact = make_cached_contact()
+    assert contact_cache.get("id-1") is None
+
+    contact_cache.add(contact)
+
+    assert contact_cache.get("id-1") == contact
+
+
+def test_contact_cache_get_by_alternate_id(contact_cache):
+    contact = make_cached_contact(fxa_id="fxa-1")
+    contact_cache.add(contact)
+
+    assert contact_cache.get_by_alternate_id("primary_email", "a@example.com") == contact
+    assert contact_cache.get_by_alternate_id("fxa_id", "fxa-1") == contact
+    assert contact_cache.get_by_alternate_id("fxa_id", "fxa-2") is None
+
+
+def test_contact_cache_alternate_id_checked_against_contact(contact_cache):
+    """An alternate ID that moved to another value is not served from the cache."""
+    contact_cache.add(make_cached_contact(fxa_id="fxa-1"))
+    contact_cache.invalidate(["id-1"])
+    # Hypothetically cached again, once the marker expired, without its old fxa_id.
+    contact_cache.backend.set("email_id:id-1", make_cached_contact(fxa_id="fxa-2").encode())
+
+    assert contact_cache.get_by_alternate_id("fxa_id", "fxa-1") is None
+    assert contact_cache.get_by_alternate_id("fxa_id", "fxa-2") is None
+    assert contact_cache.get("id-1").identifiers["fxa_id"] == "fxa-2"
+
+
+def test_contact_cache_invalidation_blocks_stale_reads(contact_cache):
+    """A contact read before a write is not cached after its invalidation."""
+    stale = make_cached_contact()
+    contact_cache.add(stale)
+
+    contact_cache.invalidate(["id-1"])
+    contact_cache.add(stale)
+
+    assert contact_cache.get("id-1") is None
+    assert contact_cache.get_by_alternate_id("primary_email", "a@example.com") is None
+
+
+def test_contact_cache_invalidation_expires():
+    timer = FakeTimer()
+    contact_cache = ContactCache(LocalContactCacheBackend(maxsize=100, ttl=60, timer=timer))
+    contact_cache.invalidate(["id-1"])
+
+    timer.now = ContactCache.INVALIDATION_TTL
+    contact_cache.add(make_cached_contact())
+    assert contact_cache.get("id-1") is not None
+
+
+def test_redis_contact_cache_backend_keys_and_ttl():
+    client = FakeRedis()
+    contact_cache = ContactCache(RedisContactCacheBackend(client, ttl=30))
+    contact_cache.add(make_cached_contact())
+
+    assert client.ttls == {"ctms:contact:email_id:id-1": 30, "ctms:contact:primary_email:a@example.com": 30}
+    contact_cache.invalidate(["id-1"])
+    assert client.data["ctms:contact:email_id:id-1"] == b""
+    assert client.ttls["ctms:contact:email_id:id-1"] == ContactCache.INVALIDATION_TTL
+
+
+def test_redis_contact_cache_backend_awaits_async_client_in_run_sync():
+    client, async_client = FakeRedis(), FakeAsyncRedis()
+    contact_cache = ContactCache(RedisContactCacheBackend(client, ttl=30, async_client=async_client))
+
+    # Like the calls made by ``AsyncSession.run_sync()``, on the event loop.
+    asyncio.run(greenlet_spawn(contact_cache.add, make_cached_contact()))
+    assert asyncio.run(greenlet_spawn(contact_cache.get, "id-1")) == make_cached_contact()
+    assert client.data == {}
+    assert "ctms:contact:email_id:id-1" in async_client.data
+
+    # Sync sessions run in the threadpool, and use the sync client.
+    contact_cache.invalidate(["id-1"])
+    assert client.data == {"ctms:contact:email_id:id-1": b""}
+
+
+def test_local_contact_cache_rejected_with_several_workers():
+    Settings(contact_cache_backend="local", workers=1)
+    Settings(contact_cache_backend="redis", contact_cache_url="redis://cache:6379/0", workers=4)
+    with pytest.raises(ValidationError, match="local contact cache cannot be used with several workers"):
+        Settings(contact_cache_backend="local", workers=4)
@@ -7,22 +7,28 @@ import pytest
 import sqlalchemy
 
 from ctms.crud import (
+    ContactBatch,
     count_total_contacts,
+    create_contact_if_absent,
     create_or_update_contact,
+    get_auth_generation,
     get_bulk_contacts,
     get_contact_by_email_id,
     get_contacts_by_any_id,
     get_contacts_from_newsletter,
     get_contacts_from_waitlist,
     get_email,
+    get_newsletter_estimates,
+    get_table_estimates,
 )
 from ctms.database import ScopedSessionLocal
-from ctms.models import Email
+from ctms.models import Email, Roles
 from ctms.schemas import (
+    ContactFieldset,
     EmailInSchema,
     NewsletterInSchema,
 )
-from ctms.schemas.contact import ContactPutSchema
+from ctms.schemas.contact import ContactInSchema, ContactPutSchema
 from ctms.schemas.waitlist import WaitlistInSchema
 
 # Treat all SQLAlchemy warnings as errors
@@ -65,6 +71,18 @@ def test_get_email(dbsession, email_factory):
     assert fetched_email.email_id == email.email_id
 
 
+def test_get_email_with_fieldset(dbsession, email_factory):
+    email = email_factory(with_fxa=True, newsletters=1)
+    email_id = email.email_id
+    dbsession.expunge_all()
+
+    fieldset = ContactFieldset(fields=frozenset({"primary_email"}), include=frozenset({"fxa"}))
+    fetched_email = get_email(dbsession, email_id, fieldset)
+    state = sqlalchemy.inspect(fetched_email)
+    assert {"email_id", "primary_email", "update_timestamp", "fxa"} <= state.dict.keys()
+    assert {"first_name", "newsletters", "waitlists"}.isdisjoint(state.dict.keys())
+
+
 def test_get_email_miss(dbsession):
     email = get_email(dbsession, str(uuid4()))
     assert email is None
@@ -149,7 +167,7 @@ def test_get_bulk_contacts_after_email_id(dbsession, email_factory):
 
     [contact] = get_bulk_contacts(
         dbsession,
-        start_time=datetime.now(UTC) - timedelta(minutes=1),
+        start_time=first_email.update_timestamp,
         end_time=datetime.now(UTC) + timedelta(minutes=1),
         limit=1,
         after_email_id=str(first_email.email_id),
@@ -158,6 +176,29 @@ def test_get_bulk_contacts_after_email_id(dbsession, email_factory):
     assert contact.email.email_id == second_email.email_id
 
 
+def test_get_bulk_contacts_pages_through_same_timestamp(dbsession, email_factory):
+    update_timestamp = datetime.now(UTC) - timedelta(seconds=10)
+    emails = email_factory.create_batch(5, update_timestamp=update_timestamp)
+    expected = sorted(email.email_id for email in emails)
+
+    seen = []
+    start_time, after_email_id = update_timestamp, None
+    for _ in range(len(emails) + 1):
+        page = get_bulk_contacts(
+            dbsession,
+            start_time=start_time,
+            end_time=datetime.now(UTC),
+            limit=2,
+            after_email_id=after_email_id,
+        )
+        if not page:
+            break
+        seen.extend(contact.email.email_id for contact in page)
+        start_time, after_email_id = page[-1].email.update_timestamp, str(page[-1].email.email_id)
+
+    assert seen == expected
+
+
 def test_get_bulk_contacts_one(dbsession, email_factory):
     email = email_factory()
 
@@ -303,6 +344,59 @@ def test_create_or_update_contact_timestamps(dbsession, email_factory):
     assert updated_email.waitlists[0].update_timestamp > before_wl
 
 
+def test_create_contact_if_absent(dbsession):
+    email_id = uuid4()
+    contact = ContactInSchema(
+        email=EmailInSchema(email_id=email_id, primary_email="new@example.com"),
+        newsletters=[NewsletterInSchema(name="mozilla-welcome"), NewsletterInSchema(name="firefox-news")],
+    )
+
+    created = create_contact_if_absent(dbsession, email_id, contact, None)
+    assert created.email.email_id == email_id
+    assert created.email.create_timestamp is not None
+    assert [newsletter.name for newsletter in created.newsletters] == ["firefox-news", "mozilla-welcome"]
+    assert all(newsletter.create_timestamp is not None for newsletter in created.newsletters)
+
+
+def test_create_contact_if_absent_existing(dbsession, email_factory):
+    email = email_factory(newsletters=1)
+    dbsession.flush()
+    contact = ContactInSchema(
+        email=EmailInSchema(email_id=email.email_id, primary_email="other@example.com"),
+        newsletters=[NewsletterInSchema(name="other")],
+    )
+
+    assert create_contact_if_absent(dbsession, email.email_id, contact, None) is None
+    dbsession.expire_all()
+    assert get_contact_by_email_id(dbsession, email.email_id).email.primary_email == email.primary_email
+
+
+def test_contact_batch_create_does_not_replace_existing(dbsession, email_factory):
+    """A contact created since the batch was checked is left untouched."""
+    existing = email_factory(first_name="Existing", newsletters=1)
+    dbsession.flush()
+    new_email_id = uuid4()
+    batch = ContactBatch()
+    batch.create(
+        ContactPutSchema(
+            email=EmailInSchema(email_id=existing.email_id, primary_email="created@example.com"),
+            newsletters=[NewsletterInSchema(name="firefox-news")],
+        )
+    )
+    batch.create(ContactPutSchema(email=EmailInSchema(email_id=new_email_id, primary_email="new@example.com")))
+
+    batch.apply(dbsession)
+
+    assert batch.conflicts == {existing.email_id}
+    assert set(batch.emails) == {new_email_id}
+    dbsession.expire_all()
+    email = get_email(dbsession, existing.email_id)
+    assert email.first_name == "Existing"
+    assert len(email.newsletters) == 1
+    assert email.newsletters[0].name != "firefox-news"
+    assert get_email(dbsession, new_email_id) is not None
+
+
 def test_get_contacts_from_newsletter(dbsession, newsletter_factory):
     existing_newsletter = newsletter_factory()
     dbsession.flush()
@@ -317,3 +411,34 @@ def test_get_contacts_from_waitlist(dbsession, waitlist_factory):
     contacts = get_contacts_from_waitlist(dbsession, existing_waitlist.name)
     assert len(contacts) == 1
     assert contacts[0].email.email_id == existing_waitlist.email.email_id
+
+
+def test_table_and_newsletter_estimates(dbsession, newsletter_factory):
+    newsletter_factory.create_batch(30, name="common")
+    newsletter_factory.create_batch(10)
+    dbsession.flush()
+    # ANALYZE counts the rows inserted by the current transaction.
+    dbsession.execute(sqlalchemy.text("ANALYZE newsletters"))
+
+    estimates = get_table_estimates(dbsession, ["newsletters", "unknown"])
+    assert estimates == {"newsletters": 40, "unknown": None}
+    assert get_newsletter_estimates(dbsession)["common"] == 30
+
+
+def test_auth_generation_bumped_by_api_client_changes(dbsession, api_client_factory, role_factory, api_client_roles_factory):
+    api_client = api_client_factory()
+    role = role_factory()
+    generation = get_auth_generation(dbsession)
+
+    api_client_roles_factory(api_client=api_client, role=role)
+    assert get_auth_generation(dbsession) > generation
+    generation = get_auth_generation(dbsession)
+
+    api_client.enabled = False
+    dbsession.commit()
+    assert get_auth_generation(dbsession) > generation
+    generation = get_auth_generation(dbsession)
+
+    dbsession.query(Roles).filter_by(id=role.id).delete()
+    dbsession.commit()
+    assert get_auth_generation(dbsession) > generation
@@ -0,0 +1,83 @@
+import asyncio
+from uuid import uuid4
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from ctms.crud import count_total_contacts, ping
+from ctms.database import QueryStats, async_engine_factory, run_db
+from ctms.models import Email
+
+
+def test_run_db_with_session(dbsession, email_factory):
+    email_factory()
+    dbsession.commit()
+
+    assert asyncio.run(run_db(dbsession, count_total_contacts)) >= 1
+
+
+def test_async_engine_factory_uses_asyncpg(settings):
+    async_engine = async_engine_factory(settings)
+
+    assert async_engine.url.drivername == "postgresql+asyncpg"
+    assert async_engine.url.database == settings.db_url.rsplit("/", 1)[-1]
+
+
+def test_run_db_with_async_session(engine):
+    async def check():
+        async_engine = create_async_engine(engine.url.set(drivername="postgresql+asyncpg"))
+        try:
+            async with AsyncSession(async_engine) as db:
+                return await run_db(db, ping)
+        finally:
+            await async_engine.dispose()
+
+    assert asyncio.run(check()) is True
+
+
+def test_async_session_binds_uuid_strings(engine):
+    """asyncpg only accepts strings for text columns, like ``basket_token``."""
+
+    async def check():
+        async_engine = create_async_engine(engine.url.set(drivername="postgresql+asyncpg"))
+        try:
+            async with AsyncSession(async_engine) as db:
+                return (await db.execute(select(Email).where(Email.basket_token == uuid4()))).all()
+        finally:
+            await async_engine.dispose()
+
+    assert asyncio.run(check()) == []
+
+
+def test_async_session_binds_timestamp_strings(engine):
+    """Schemas dump timestamps as strings, and asyncpg only accepts datetimes."""
+
+    async def check():
+        async_engine = create_async_engine(engine.url.set(drivername="postgresql+asyncpg"))
+        try:
+            async with AsyncSession(async_engine) as db:
+                return (await db.execute(select(Email).where(Email.update_timestamp < "2000-01-01T00:00:00+00:00"))).all()
+        finally:
+            await async_engine.dispose()
+
+    assert asyncio.run(check()) == []
+
+
+def test_query_stats(dbsession, email_factory):
+    email_factory.create_batch(3)
+    dbsession.flush()
+
+    with QueryStats() as outer:
+        dbsession.execute(select(Email)).all()
+        with QueryStats() as inner:
+            dbsession.execute(select(Email.email_id).limit(1)).all()
+
+    assert (inner.statements, inner.rows) == (1, 1)
+    assert (outer.statements, outer.rows) == (2, 4)
+    assert outer.duration_s >= inner.duration_s > 0
+
+
+def test_query_stats_outside_context(dbsession):
+    stats = QueryStats()
+    dbsession.execute(select(1))
+    assert stats.statements == 0
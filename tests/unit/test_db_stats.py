@@ -0,0 +1,41 @@
+from unittest import mock
+
+from ctms.db_stats import ESTIMATED_TABLES, DatabaseStatsCollector
+
+
+def test_collect_stores_snapshot_and_emits_metrics(dbsession, registry):
+    collector = DatabaseStatsCollector(timer=lambda: 100.0)
+    with (
+        mock.patch("ctms.db_stats.count_total_contacts", return_value=3),
+        mock.patch("ctms.db_stats.get_table_estimates", return_value={"emails": 3, "amo": None}),
+        mock.patch("ctms.db_stats.get_newsletter_estimates", return_value={"mozilla-and-you": 2}),
+    ):
+        snapshot = collector.collect(dbsession)
+
+    assert snapshot.alive
+    assert collector.snapshot is snapshot
+    assert collector.age() == 0
+    assert registry.get_sample_value("ctms_contacts_total") == 3
+    assert registry.get_sample_value("ctms_db_table_rows_estimate", {"table": "emails"}) == 3
+    assert registry.get_sample_value("ctms_db_table_rows_estimate", {"table": "amo"}) is None
+    assert registry.get_sample_value("ctms_newsletter_subscriptions_estimate", {"newsletter": "mozilla-and-you"}) == 2
+
+
+def test_collect_all_tables(dbsession):
+    snapshot = DatabaseStatsCollector().collect(dbsession)
+
+    assert snapshot.alive
+    assert set(snapshot.table_estimates) == set(ESTIMATED_TABLES)
+
+
+def test_collect_unreachable_database(dbsession):
+    collector = DatabaseStatsCollector()
+    with mock.patch.object(dbsession, "execute", side_effect=RuntimeError("db down")):
+        snapshot = collector.collect(dbsession)
+
+    assert not snapshot.alive
+    assert snapshot.contacts is None
+
+
+def test_age_without_snapshot():
+    assert DatabaseStatsCollector().age() is None
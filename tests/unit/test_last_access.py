@@ -0,0 +1,95 @@
+import asyncio
+import logging
+from datetime import UTC, datetime, timedelta
+from unittest import mock
+
+import pytest
+
+from ctms.crud import get_api_client_by_id, get_auth_generation
+from ctms.last_access import LastAccessTracker
+
+
+def test_touch_keeps_most_recent_access():
+    tracker = LastAccessTracker()
+    now = datetime.now(UTC)
+
+    tracker.touch("id_client", now)
+    tracker.touch("id_client", now - timedelta(minutes=1))
+    tracker.touch("id_other", now)
+
+    assert len(tracker) == 2
+
+
+def test_flush_writes_all_clients_in_one_statement(dbsession, api_client_factory):
+    client1 = api_client_factory(last_access=None)
+    client2 = api_client_factory(last_access=None)
+    tracker = LastAccessTracker()
+    first = datetime(2024, 5, 1, 12, 0, tzinfo=UTC)
+    second = datetime(2024, 5, 1, 12, 5, tzinfo=UTC)
+    tracker.touch(client1.client_id, first)
+    tracker.touch(client1.client_id, second)
+    tracker.touch(client2.client_id, first)
+
+    with mock.patch.object(dbsession, "execute", wraps=dbsession.execute) as spy:
+        assert tracker.flush(dbsession) == 2
+    assert spy.call_count == 1
+    assert len(tracker) == 0
+
+    dbsession.expire_all()
+    assert get_api_client_by_id(dbsession, client1.client_id).last_access == second
+    assert get_api_client_by_id(dbsession, client2.client_id).last_access == first
+
+
+def test_flush_keeps_auth_generation(dbsession, api_client_factory):
+    """Writing the last access times does not invalidate the cached API clients."""
+    client = api_client_factory(last_access=None)
+    generation = get_auth_generation(dbsession)
+    tracker = LastAccessTracker()
+    tracker.touch(client.client_id)
+
+    assert tracker.flush(dbsession) == 1
+    assert get_auth_generation(dbsession) == generation
+
+
+def test_flush_never_moves_access_time_backward(dbsession, api_client_factory):
+    recent = datetime(2024, 5, 1, 12, 5, tzinfo=UTC)
+    api_client = api_client_factory(last_access=recent)
+    tracker = LastAccessTracker()
+    tracker.touch(api_client.client_id, recent - timedelta(minutes=5))
+
+    tracker.flush(dbsession)
+
+    dbsession.expire_all()
+    assert get_api_client_by_id(dbsession, api_client.client_id).last_access == recent
+
+
+def test_flush_nothing_pending(dbsession):
+    tracker = LastAccessTracker()
+    with mock.patch.object(dbsession, "execute") as spy:
+        assert tracker.flush(dbsession) == 0
+    spy.assert_not_called()
+
+
+def test_flush_failure_keeps_pending_accesses(dbsession):
+    tracker = LastAccessTracker()
+    tracker.touch("id_client")
+
+    with mock.patch.object(dbsession, "execute", side_effect=RuntimeError("db down")):
+        with pytest.raises(RuntimeError):
+            tracker.flush(dbsession)
+
+    assert len(tracker) == 1
+
+
+def test_flush_in_thread_logs_failures(caplog):
+    tracker = LastAccessTracker()
+    tracker.touch("id_client")
+
+    with (
+        mock.patch.object(tracker, "flush_in_session", side_effect=RuntimeError("db down")),
+        caplog.at_level(logging.ERROR, logger="ctms.last_access"),
+    ):
+        asyncio.run(tracker.flush_in_thread())
+
+    assert caplog.records[0].exc_info[0] is RuntimeError
+    assert len(tracker) == 1
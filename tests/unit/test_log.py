@@ -37,6 +37,9 @@ def test_request_log(client, email_factory, caplog):
         "lang": None,
         "rid": "foo-bar",
         "t": FuzzyAssert(lambda x: x > 0, name="uint"),
+        "db_statements": FuzzyAssert(lambda x: x > 0, name="uint"),
+        "db_time": FuzzyAssert(lambda x: x >= 0, name="uint"),
+        "db_rows": FuzzyAssert(lambda x: x > 0, name="uint"),
     }
     fmtr = JsonLogFormatter()
     assert fmtr.convert_record(log)["Fields"] == expected_log
@@ -2,7 +2,7 @@
 from unittest import mock
 
 import pytest
-from prometheus_client import CollectorRegistry, generate_latest
+from prometheus_client import CollectorRegistry, generate_latest, values
 from prometheus_client.parser import text_string_to_metric_families
 
 from ctms import metrics as metrics_module
@@ -13,16 +13,16 @@ from ctms.app import app
 # Higher numbers = more ways to slice data, more storage, more processing time for summaries
 
 # Cardinality of ctms_requests_total counter
-METHOD_PATH_CODE_COMBINATIONS = 50
+METHOD_PATH_CODE_COMBINATIONS = 66
 
 # Cardinality of ctms_requests_duration_seconds histogram
-METHOD_PATH_CODEFAM_COMBOS = 35
+METHOD_PATH_CODEFAM_COMBOS = 43
 DURATION_BUCKETS = 8
 DURATION_COMBINATIONS = METHOD_PATH_CODEFAM_COMBOS * (DURATION_BUCKETS + 2)
 
 # Base cardinatility of ctms_api_requests_total
 # Actual is multiplied by the number of API clients
-METHOD_API_PATH_COMBINATIONS = 18
+METHOD_API_PATH_COMBINATIONS = 26
 
 
 def test_init_metrics_labels(dbsession, client_id_and_secret, registry, metrics):
@@ -157,7 +157,7 @@ def test_homepage_request(anon_client, registry):
 
 def test_contacts_total(anon_client, dbsession, registry):
     """Total number of contacts is reported in heartbeat."""
-    with mock.patch("ctms.routers.platform.count_total_contacts", return_value=3):
+    with mock.patch("ctms.db_stats.count_total_contacts", return_value=3):
         anon_client.get("/__heartbeat__")
 
     assert registry.get_sample_value("ctms_contacts_total") == 3
@@ -208,10 +208,10 @@ def test_unknown_path(anon_client, registry):
     assert resp.status_code == 404
 
     without_labels = []
-    for name, (_, params) in metrics_module.METRICS_PARAMS.items():
+    for _, params in metrics_module.METRICS_PARAMS.values():
         if "labelnames" not in params:
-            without_labels.append(f"ctms_{name}_total")
-            without_labels.append(f"ctms_{name}_created")
+            without_labels.append(params["name"])
+            without_labels.append(params["name"].removesuffix("_total") + "_created")
 
     metrics_text = generate_latest(registry).decode()
     for family in text_string_to_metric_families(metrics_text):
@@ -222,3 +222,56 @@ def test_unknown_path(anon_client, registry):
             assert sample.labels == {}
         else:
             assert len(family.samples) == 0
+
+
+def test_label_children_are_bound_once(registry, metrics):
+    """The children of the response metrics are bound once, and shared with labels()."""
+    children = metrics["requests_children"]
+    child = children.bind("GET", "/ctms/{email_id}", 200, "2xx")
+
+    assert children[("GET", "/ctms/{email_id}", 200, "2xx")] is child
+    assert metrics["requests"].labels("GET", "/ctms/{email_id}", 200, "2xx") is child
+    with mock.patch.object(metrics["requests"], "labels") as labels:
+        metrics_module.emit_response_metrics("/ctms/{email_id}", "GET", 0.1, 200, None, metrics)
+    labels.assert_not_called()
+    assert_request_metric_inc(registry, "GET", "/ctms/{email_id}", 200)
+
+
+def test_multiprocess_metrics_are_aggregated(tmp_path, monkeypatch):
+    """In multiprocess mode, /metrics aggregates the values written by each worker."""
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    workers = []
+    for pid in (101, 102):
+        monkeypatch.setattr(values, "ValueClass", values.MultiProcessValue(lambda pid=pid: pid))
+        workers.append(metrics_module.init_metrics(CollectorRegistry()))
+
+    for contacts, worker_metrics in enumerate(workers, start=3):
+        metrics_module.emit_response_metrics("/ctms/{email_id}", "GET", 0.1, 200, "test_client", worker_metrics)
+        worker_metrics["contacts"].set(contacts)
+
+    registry = metrics_module.get_exposition_registry()
+    assert_request_metric_inc(registry, "GET", "/ctms/{email_id}", 200, count=2)
+    assert_api_request_metric_inc(registry, "GET", "/ctms/{email_id}", "test_client", "2xx", count=2)
+    assert registry.get_sample_value("ctms_contacts_total") == 4
+
+
+def test_prepare_multiprocess_dir(tmp_path):
+    (tmp_path / "counter_101.db").write_bytes(b"")
+    (tmp_path / "other.txt").write_bytes(b"")
+
+    metrics_module.prepare_multiprocess_dir(str(tmp_path))
+
+    assert [path.name for path in tmp_path.iterdir()] == ["other.txt"]
+
+
+def test_api_request_query_metrics(client, email_factory, registry):
+    """An API request emits the count, duration, and rows of its SQL statements."""
+    email = email_factory()
+
+    client.get(f"/ctms/{email.email_id}")
+
+    labels = {"path_template": "/ctms/{email_id}"}
+    assert registry.get_sample_value("ctms_request_db_statements_count", labels) == 1
+    assert registry.get_sample_value("ctms_request_db_statements_sum", labels) > 0
+    assert registry.get_sample_value("ctms_request_db_duration_seconds_sum", labels) > 0
+    assert registry.get_sample_value("ctms_request_db_rows_sum", labels) > 0
@@ -1,5 +1,19 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from fastapi import HTTPException
+
 from ctms import models
-from ctms.permissions import ADMIN_ROLE_NAME, has_any_permission
+from ctms.crud import get_auth_generation
+from ctms.permissions import (
+    ADMIN_ROLE_NAME,
+    ClientPermissions,
+    get_client_permissions,
+    has_any_permission,
+    with_permission,
+)
+from ctms.schemas import ApiClientSchema
 
 
 def test_has_permission_granted(
@@ -44,3 +58,90 @@ def test_admin_role_grants_all_permissions(
     dbsession.commit()
 
     assert has_any_permission(dbsession, api_client.client_id, ["any_perm", "other_perm"]) is True
+
+
+def test_permissions_are_cached(
+    dbsession,
+    api_client_factory,
+    api_client_roles_factory,
+    permission_factory,
+    role_factory,
+    role_permissions_factory,
+):
+    """Test that the permissions are loaded once, until roles or permissions change."""
+    role = role_factory(name="editor")
+    permission = permission_factory(name="edit_contact")
+    role_permissions_factory(role=role, permission=permission)
+    api_client = api_client_factory()
+    api_client_roles_factory(api_client=api_client, role=role)
+    dbsession.commit()
+
+    with mock.patch("ctms.permissions.get_client_permissions", wraps=get_client_permissions) as loader:
+        assert has_any_permission(dbsession, api_client.client_id, ["edit_contact"]) is True
+        assert has_any_permission(dbsession, api_client.client_id, ["edit_contact"]) is True
+        assert loader.call_count == 1
+
+        # Bumps the auth generation, in the database.
+        dbsession.query(models.RolePermissions).delete()
+        dbsession.commit()
+
+        assert has_any_permission(dbsession, api_client.client_id, ["edit_contact"]) is False
+        assert loader.call_count == 2
+
+
+def test_with_permission_uses_cache_without_threadpool(
+    dbsession,
+    api_client_factory,
+    api_client_roles_factory,
+    permission_factory,
+    role_factory,
+    role_permissions_factory,
+):
+    """Test that the dependency only goes through run_db on a cache miss."""
+    role = role_factory(name="editor")
+    role_permissions_factory(role=role, permission=permission_factory(name="edit_contact"))
+    api_client = api_client_factory()
+    api_client_roles_factory(api_client=api_client, role=role)
+    dbsession.commit()
+    schema = ApiClientSchema(client_id=api_client.client_id, email=api_client.email, enabled=True)
+    auth_generation = get_auth_generation(dbsession)
+    dependency = with_permission("edit_contact")
+
+    with mock.patch("ctms.permissions.run_db", wraps=run_db_sync) as run_db:
+        assert asyncio.run(dependency(db=dbsession, api_client=schema, auth_generation=auth_generation)) is True
+        assert asyncio.run(dependency(db=dbsession, api_client=schema, auth_generation=auth_generation)) is True
+        assert run_db.call_count == 1
+
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(with_permission("delete_contact")(db=dbsession, api_client=schema, auth_generation=auth_generation))
+        assert exc_info.value.status_code == 403
+        assert run_db.call_count == 1
+
+
+async def run_db_sync(db, fn, *args):
+    return fn(db, *args)
+
+
+def test_get_client_permissions(
+    dbsession,
+    api_client_factory,
+    api_client_roles_factory,
+    permission_factory,
+    role_factory,
+    role_permissions_factory,
+):
+    """Test that permissions of all roles are combined, and roles without permissions are included."""
+    editor = role_factory(name="editor")
+    viewer = role_factory(name="viewer")
+    empty = role_factory(name="empty")
+    role_permissions_factory(role=editor, permission=permission_factory(name="edit_contact"))
+    role_permissions_factory(role=viewer, permission=permission_factory(name="view_contact"))
+    api_client = api_client_factory()
+    for role in (editor, viewer, empty):
+        api_client_roles_factory(api_client=api_client, role=role)
+    dbsession.commit()
+
+    assert get_client_permissions(dbsession, api_client.client_id) == ClientPermissions(
+        permissions=frozenset({"edit_contact", "view_contact"}),
+        is_admin=False,
+    )
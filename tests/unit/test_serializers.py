@@ -0,0 +1,144 @@
+"""Golden tests of the direct serialization of contacts, against the response models."""
+
+import pytest
+from starlette.responses import JSONResponse
+
+from ctms.crud import get_email
+from ctms.schemas import ContactSchema, CTMSBulkResponse, CTMSResponse, CTMSSingleResponse
+from ctms.serializers import (
+    bulk_response_json,
+    contact_json,
+    contacts_from_contact_json,
+    contacts_json,
+    single_response_from_contact_json,
+    single_response_json,
+)
+from tests.unit.conftest import create_full_contact
+
+
+def rendered(model) -> bytes:
+    """Render a response model like FastAPI does with ``response_model``."""
+    return JSONResponse(model.model_dump(mode="json")).body
+
+
+def response_model(email, model=CTMSResponse, **extra):
+    return model(**ContactSchema.from_email(email).model_dump(), **extra)
+
+
+@pytest.mark.parametrize(
+    "contact_name",
+    [
+        "minimal_contact_data",
+        "maximal_contact_data",
+        "example_contact_data",
+        "to_add_contact_data",
+    ],
+)
+def test_same_as_response_model(dbsession, request, contact_name):
+    contact = request.getfixturevalue(contact_name)
+    create_full_contact(dbsession, contact)
+    email = get_email(dbsession, contact.email.email_id)
+
+    assert single_response_json(email) == rendered(response_model(email, CTMSSingleResponse, status="ok"))
+    assert contacts_json([email]) == JSONResponse([response_model(email).model_dump(mode="json")]).body
+    # The bulk export serializes validated contacts.
+    assert contact_json(ContactSchema.from_email(email)) == response_model(email).model_dump_json().encode()
+
+
+@pytest.mark.parametrize(
+    "waitlists",
+    [
+        [],
+        [("vpn", {"geo": "fr", "platform": "linux"}, True)],
+        [("vpn", {"geo": "fr"}, False)],
+        [("relay", {"geo": "fr"}, True), ("relay-phone", {"geo": "es"}, True)],
+        [("relay", {}, True), ("relay-phone", {"geo": "es"}, True)],
+        [("relay", {"geo": "fr"}, False), ("relay-phone", {"geo": "es"}, True)],
+    ],
+)
+def test_same_legacy_waitlists(dbsession, email_factory, waitlist_factory, waitlists):
+    email = email_factory()
+    for name, fields, subscribed in waitlists:
+        waitlist_factory(email=email, name=name, fields=fields, subscribed=subscribed)
+    dbsession.commit()
+    email = get_email(dbsession, email.email_id)
+
+    assert contact_json(email) == rendered(response_model(email))
+
+
+def test_same_with_special_characters(dbsession, email_factory):
+    email = email_factory(first_name='Zoë "quoted" \\ \n', last_name="日本   😀", with_amo=True, with_fxa=True, with_mofo=True)
+    dbsession.commit()
+    email = get_email(dbsession, email.email_id)
+
+    assert contact_json(email) == rendered(response_model(email))
+
+
+def test_same_bulk_response(dbsession, email_factory):
+    emails = email_factory.create_batch(3, newsletters=2, waitlists=1, with_fxa=True)
+    dbsession.commit()
+    emails = [get_email(dbsession, email.email_id) for email in emails]
+    params = {
+        "start": "2020-01-01T00:00:00Z",
+        "end": "2030-01-01T00:00:00+01:00",
+        "limit": 3,
+        "after": "abc",
+        "next": "/updates?start=2020-01-01T00:00:00Z&after=abc ",
+    }
+
+    expected = CTMSBulkResponse(items=[response_model(email) for email in emails], **params)
+    assert bulk_response_json(emails, **params) == rendered(expected)
+
+
+def test_same_from_contact_json(dbsession, email_factory):
+    """Responses built from serialized contacts, as stored in the contact cache, are identical."""
+    emails = email_factory.create_batch(2, newsletters=1, with_fxa=True)
+    dbsession.commit()
+    emails = [get_email(dbsession, email.email_id) for email in emails]
+
+    assert single_response_from_contact_json(contact_json(emails[0])) == single_response_json(emails[0])
+    assert contacts_from_contact_json([contact_json(email) for email in emails]) == contacts_json(emails)
+    assert contacts_from_contact_json([]) == contacts_json([])
+
+
+def test_golden_contact(minimal_contact_data):
+    """The serialization of a contact is stable."""
+    assert contact_json(minimal_contact_data) == (
+        b'{"amo":{"add_on_ids":null,"display_name":null,"email_opt_in":false,"language":null,'
+        b'"last_login":null,"location":null,"profile_url":null,"user":false,"user_id":null,'
+        b'"username":null,"create_timestamp":null,"update_timestamp":null},'
+        b'"email":{"primary_email":"ctms-user@example.com","basket_token":"142e20b6-1ef5-43d8-b5f4-597430e956d7",'
+        b'"double_opt_in":false,"sfdc_id":"001A000001aABcDEFG","first_name":null,"last_name":null,'
+        b'"mailing_country":"us","email_format":"H","email_lang":"en","has_opted_out_of_email":false,'
+        b'"unsubscribe_reason":null,"email_id":"93db83d4-4119-4e0c-af87-a713786fa81d",'
+        b'"create_timestamp":"2014-01-22T15:24:00+00:00","update_timestamp":"2020-01-22T15:24:00+00:00"},'
+        b'"fxa":{"fxa_id":null,"primary_email":null,"created_date":null,"lang":null,"first_service":null,'
+        b'"account_deleted":false},'
+        b'"mofo":{"mofo_email_id":null,"mofo_contact_id":null,"mofo_relevant":false},'
+        b'"newsletters":['
+        b'{"name":"app-dev","subscribed":true,"format":"H","lang":"en","source":null,"unsub_reason":null,'
+        b'"create_timestamp":"2014-01-22T15:24:00+00:00","update_timestamp":"2020-01-22T15:24:00+00:00"},'
+        b'{"name":"maker-party","subscribed":true,"format":"H","lang":"en","source":null,"unsub_reason":null,'
+        b'"create_timestamp":"2014-01-22T15:24:00+00:00","update_timestamp":"2020-01-22T15:24:00+00:00"},'
+        b'{"name":"mozilla-foundation","subscribed":true,"format":"H","lang":"en","source":null,"unsub_reason":null,'
+        b'"create_timestamp":"2014-01-22T15:24:00+00:00","update_timestamp":"2020-01-22T15:24:00+00:00"},'
+        b'{"name":"mozilla-learning-network","subscribed":true,"format":"H","lang":"en","source":null,"unsub_reason":null,'
+        b'"create_timestamp":"2014-01-22T15:24:00+00:00","update_timestamp":"2020-01-22T15:24:00+00:00"}],'
+        b'"waitlists":[],"vpn_waitlist":{"geo":null,"platform":null},"relay_waitlist":{"geo":null}}'
+    )
+
+
+def test_read_endpoints(client, dbsession, maximal_contact_data):
+    create_full_contact(dbsession, maximal_contact_data)
+    email = get_email(dbsession, maximal_contact_data.email.email_id)
+
+    resp = client.get(f"/ctms/{email.email_id}")
+    assert resp.content == rendered(response_model(email, CTMSSingleResponse, status="ok"))
+
+    resp = client.get("/ctms", params={"primary_email": email.primary_email})
+    assert resp.content == JSONResponse([response_model(email).model_dump(mode="json")]).body
+
+    resp = client.get("/updates", params={"start": "2020-01-01T00:00:00Z", "end": "2021-01-01T00:00:00Z"})
+    data = resp.json()
+    expected = CTMSBulkResponse(items=[response_model(email)], start=data["start"], end=data["end"], limit=data["limit"])
+    assert resp.content == rendered(expected)
@@ -0,0 +1,112 @@
+import json
+import logging
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import func, select, text
+
+from ctms.database import QueryStats, application_name
+from ctms.models import Email
+from ctms.slow_queries import SlowQueryLog, is_explainable, normalize_sql, redact_parameters
+
+
+@pytest.mark.parametrize(
+    "statement,expected",
+    [
+        ("SELECT *\n  FROM emails\n  WHERE email_id = %(email_id_1)s", "SELECT * FROM emails WHERE email_id = %(email_id_1)s"),
+        ("SELECT * FROM emails WHERE primary_email = 'a@example.com' LIMIT 10", "SELECT * FROM emails WHERE primary_email = ? LIMIT ?"),
+        ("SELECT 'it''s', -1.5", "SELECT ?, ?"),
+        (
+            "SELECT * FROM emails WHERE email_id IN (%(email_id_1_1)s, %(email_id_1_2)s, %(email_id_1_3)s)",
+            "SELECT * FROM emails WHERE email_id IN (...)",
+        ),
+        ("SELECT * FROM emails WHERE email_id IN ($1, $2) AND anon_1.x = $3", "SELECT * FROM emails WHERE email_id IN (...) AND anon_1.x = $3"),
+    ],
+)
+def test_normalize_sql(statement, expected):
+    assert normalize_sql(statement) == expected
+
+
+def test_redact_parameters():
+    assert redact_parameters({"email": "a@example.com", "limit": 10}) == {"email": "str", "limit": "int"}
+    assert redact_parameters(("a@example.com", None)) == ["str", "NoneType"]
+
+
+@pytest.mark.parametrize(
+    "statement,expected",
+    [
+        ("SELECT * FROM emails", True),
+        ("  select * from emails", True),
+        ("SELECT * FROM emails FOR UPDATE", False),
+        ("UPDATE emails SET update_timestamp = now()", False),
+        ("WITH deleted AS (DELETE FROM emails RETURNING *) SELECT * FROM deleted", False),
+    ],
+)
+def test_is_explainable(statement, expected):
+    assert is_explainable(statement) is expected
+
+
+def test_fast_statements_are_not_logged(caplog):
+    slow_query_log = SlowQueryLog(threshold_s=0.1)
+
+    with caplog.at_level(logging.WARNING, logger="ctms.slow_queries"):
+        slow_query_log.check(None, "SELECT 1", {}, 0.05, None)
+
+    assert not caplog.records
+
+
+def test_slow_statements_are_logged(dbsession, monkeypatch, caplog):
+    monkeypatch.setattr("ctms.database.slow_query_log", SlowQueryLog(threshold_s=0))
+    scope = {"route": SimpleNamespace(path_format="/ctms/{email_id}")}
+
+    with caplog.at_level(logging.WARNING, logger="ctms.slow_queries"), QueryStats(scope):
+        dbsession.execute(select(Email).where(Email.primary_email == "slow@example.com")).all()
+
+    (record,) = [record for record in caplog.records if record.msg == "Slow SQL statement"]
+    assert record.sql.startswith("SELECT emails.")
+    assert "slow@example.com" not in record.sql
+    assert record.params == {"primary_email_1": "str"}
+    assert record.duration_ms >= 0
+    assert record.path_template == "/ctms/{email_id}"
+
+
+@pytest.mark.parametrize("analyze,rows_key", [(False, "Plan Rows"), (True, "Actual Rows")])
+def test_slow_statements_plans_are_sampled(engine, caplog, analyze, rows_key):
+    slow_query_log = SlowQueryLog(threshold_s=0, explain_rate=0.5, analyze=analyze, rand=lambda: 0.4)
+
+    with caplog.at_level(logging.WARNING, logger="ctms.slow_queries"), engine.connect() as conn:
+        slow_query_log.check(conn, "SELECT %(value)s::int AS value", {"value": 1}, 0.2, "/ctms")
+        slow_query_log.check(conn, "UPDATE emails SET update_timestamp = now() WHERE false", {}, 0.2, "/ctms")
+    slow_query_log._executor.shutdown(wait=True)
+
+    (record,) = [record for record in caplog.records if record.msg == "Slow SQL statement plan"]
+    assert record.path_template == "/ctms"
+    plan = json.loads(record.plan)
+    assert plan[0]["Plan"][rows_key] == 1
+    assert ("Actual Rows" in plan[0]["Plan"]) is analyze
+
+
+def test_slow_statements_plans_not_sampled(caplog):
+    slow_query_log = SlowQueryLog(threshold_s=0, explain_rate=0.5, rand=lambda: 0.6)
+
+    with caplog.at_level(logging.WARNING, logger="ctms.slow_queries"):
+        slow_query_log.check(None, "SELECT 1", {}, 0.2, None)
+
+    assert [record.msg for record in caplog.records] == ["Slow SQL statement"]
+    assert slow_query_log._executor is None
+
+
+def test_application_name_per_route(dbsession, monkeypatch):
+    monkeypatch.setattr("ctms.database.settings.db_application_name_per_route", True)
+    scope = {"route": SimpleNamespace(path_format="/ctms/{email_id}")}
+    current_name = select(func.current_setting("application_name"))
+
+    assert dbsession.execute(current_name).scalar() == "ctms"
+    with QueryStats(scope), QueryStats():
+        assert dbsession.execute(current_name).scalar() == "ctms /ctms/{email_id}"
+    assert dbsession.execute(text("SELECT current_setting('application_name')")).scalar() == "ctms"
+
+
+def test_application_name_is_truncated():
+    assert application_name(None) == "ctms"
+    assert application_name("/" + "a" * 100) == "ctms /" + "a" * 57
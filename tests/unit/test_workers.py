@@ -0,0 +1,136 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import textwrap
+import time
+import urllib.request
+
+import pytest
+
+from ctms.config import Settings, pool_sizes_per_worker
+from ctms.workers import WORKER_BOOT_ERROR, current_rss, respawn_delay
+
+# A manager serving a trivial application, which answers with the pid of the worker.
+SERVER = textwrap.dedent(
+    """
+    import os
+    import sys
+
+    from ctms.config import Settings
+    from ctms.workers import WorkerManager
+
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    failed = os.environ.get("FAIL_STARTUP")
+                    await send({"type": "lifespan.startup.failed" if failed else "lifespan.startup.complete"})
+                else:
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"connection", b"close")]})
+        await send({"type": "http.response.body", "body": str(os.getpid()).encode()})
+
+
+    sys.exit(WorkerManager(Settings(), app).run())
+    """
+)
+
+
+@pytest.mark.parametrize(
+    "overrides,expected",
+    [
+        ({}, (5, 10)),
+        ({"db_connection_budget": 100, "workers": 4}, (5, 20)),
+        ({"db_connection_budget": 100, "workers": 4, "db_async": True}, (5, 7)),
+        ({"db_connection_budget": 12, "workers": 4}, (3, 0)),
+    ],
+)
+def test_pool_sizes_per_worker(overrides, expected):
+    settings = Settings(db_pool_size=5, db_max_overflow=10, **overrides)
+    assert pool_sizes_per_worker(settings) == expected
+
+
+def test_pool_sizes_per_worker_budget_too_small():
+    settings = Settings(db_connection_budget=3, workers=4)
+    with pytest.raises(ValueError, match="too small"):
+        pool_sizes_per_worker(settings)
+
+
+def test_current_rss():
+    assert current_rss() >= 0
+
+
+def test_respawn_delay():
+    assert [respawn_delay(failures) for failures in range(7)] == [0, 0.5, 1, 2, 4, 8, 10]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def start_server():
+    processes = []
+
+    def start(**env):
+        port = free_port()
+        environ = {**os.environ, "HOST": "127.0.0.1", "PORT": str(port), "CTMS_WORKER_SHUTDOWN_TIMEOUT_IN_SECONDS": "2", **env}
+        process = subprocess.Popen([sys.executable, "-c", SERVER], env=environ)
+        processes.append(process)
+        return process, port
+
+    yield start
+    for process in processes:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+
+def get_worker_pid(port, timeout=10):
+    """Return the pid of the worker serving a request, once the server is up."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                return int(response.read())
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def test_workers_are_spawned_and_stopped_on_sigterm(start_server):
+    process, port = start_server(CTMS_WORKERS="2")
+
+    pids = {get_worker_pid(port) for _ in range(20)}
+    assert 1 <= len(pids) <= 2
+    assert process.pid not in pids
+
+    process.send_signal(signal.SIGTERM)
+    assert process.wait(timeout=10) == 0
+    for pid in pids:
+        with pytest.raises(ProcessLookupError):
+            os.kill(pid, 0)
+
+
+def test_workers_are_replaced_after_max_requests(start_server):
+    process, port = start_server(CTMS_WORKERS="2", CTMS_WORKER_MAX_REQUESTS="1")
+
+    pids = [get_worker_pid(port) for _ in range(4)]
+
+    # Each worker serves a single request, and is replaced by a new one.
+    assert len(set(pids)) == 4
+    assert process.poll() is None
+
+
+def test_manager_stops_when_workers_fail_to_boot(start_server):
+    process, _ = start_server(CTMS_WORKERS="2", FAIL_STARTUP="1")
+
+    assert process.wait(timeout=10) == WORKER_BOOT_ERROR